@@ -1,12 +1,20 @@
 """
 app/api/deps.py - API dependencies
 """
-from typing import Generator
-from fastapi import Depends
+import hmac
+import re
+from typing import Generator, Optional
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.requests import HTTPConnection
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.config import get_settings, Settings
+from app.models.task import DEFAULT_TENANT
+
+TENANT_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+# Printable ASCII without spaces, as long as the idempotency_keys.key column
+IDEMPOTENCY_KEY_PATTERN = re.compile(r"[!-~]{1,255}")
 
 
 def get_current_settings() -> Settings:
@@ -15,3 +23,47 @@ def get_current_settings() -> Settings:
 
 def get_database_session() -> Generator[Session, None, None]:
     yield from get_db()
+
+
+def require_admin(
+    x_admin_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_current_settings),
+) -> None:
+    """Allow the request only with the configured ``X-Admin-Token``"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+def is_admin(
+    x_admin_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_current_settings),
+) -> bool:
+    """Whether the request carries the configured ``X-Admin-Token``, for endpoints open to everyone"""
+    return bool(settings.ADMIN_TOKEN and x_admin_token and hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN))
+
+
+def get_tenant_id(connection: HTTPConnection, settings: Settings = Depends(get_current_settings)) -> str:
+    """The tenant a request acts for, from the ``TENANT_HEADER`` header.
+    
+    Requests without the header belong to the default tenant unless
+    ``TENANT_REQUIRED`` is set. Works for WebSocket connections too.
+    """
+    tenant_id = connection.headers.get(settings.TENANT_HEADER)
+    if tenant_id is None:
+        if settings.TENANT_REQUIRED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing {settings.TENANT_HEADER} header"
+            )
+        return DEFAULT_TENANT
+    if not TENANT_ID_PATTERN.fullmatch(tenant_id):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {settings.TENANT_HEADER} header")
+    return tenant_id
+
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None)) -> Optional[str]:
+    """The client's ``Idempotency-Key`` for a write, or None if it sent none"""
+    if idempotency_key is not None and not IDEMPOTENCY_KEY_PATTERN.fullmatch(idempotency_key):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Idempotency-Key header")
+    return idempotency_key
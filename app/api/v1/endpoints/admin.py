@@ -0,0 +1,100 @@
+"""
+app/api/v1/endpoints/admin.py - Operator endpoints (require X-Admin-Token)
+"""
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_database_session, get_tenant_id, require_admin
+from app.core.exceptions import DatabaseError
+from app.core.memory import memory_tracker
+from app.core.profiling import profile_store, to_speedscope
+from app.core.tracing import InMemorySpanExporter, to_otlp, tracer
+from app.core.serialization import negotiated_response
+from app.schemas.job import JobCreate
+from app.services.backup import database_backup
+from app.services.jobs import job_runner
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles", summary="List stored request profiles")
+def list_profiles(request: Request) -> Response:
+    return negotiated_response(request, {"profiles": profile_store.list()})
+
+
+@router.get("/profiles/{name}", summary="Download a request profile")
+def get_profile(
+    name: str,
+    format: Literal["collapsed", "speedscope"] = Query("collapsed", description="Collapsed stacks or speedscope JSON"),
+) -> Response:
+    collapsed = profile_store.load(name)
+    if collapsed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profile {name} not found")
+    if format == "speedscope":
+        filename = name.replace(".folded", ".speedscope.json")
+        return JSONResponse(
+            to_speedscope(name, collapsed),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+@router.get("/traces", summary="Recent request traces as OTLP/JSON")
+def list_traces(
+    request: Request,
+    limit: int = Query(20, ge=1, le=1000, description="Maximum number of traces, newest first"),
+    min_duration_ms: float = Query(0.0, ge=0, description="Only traces whose root span took at least this long"),
+) -> Response:
+    if not isinstance(tracer.exporter, InMemorySpanExporter):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Traces are not kept in memory")
+    traces = [
+        spans for spans in reversed(tracer.exporter.traces())
+        if spans and spans[0].duration_ms >= min_duration_ms
+    ][:limit]
+    return negotiated_response(request, to_otlp([span for spans in traces for span in spans], tracer.service_name))
+
+
+@router.get("/memory", summary="Per-route peak allocations and snapshot diffs")
+def get_memory_report(request: Request) -> Response:
+    if not memory_tracker.tracing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memory diagnostics are not enabled")
+    return negotiated_response(request, {
+        "routes": memory_tracker.route_stats(),
+        "snapshot_diffs": dict(memory_tracker.diffs),
+    })
+
+
+@router.get("/memory/top", summary="Largest live allocation sites")
+def get_top_allocations(
+    request: Request,
+    limit: int = Query(20, ge=1, le=500, description="Number of allocation sites"),
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno", description="How to group allocations"),
+) -> Response:
+    if not memory_tracker.tracing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memory diagnostics are not enabled")
+    return negotiated_response(request, {"allocations": memory_tracker.top(limit, group_by)})
+
+
+@router.get("/backups", summary="List database backups, newest first")
+def list_backups(request: Request) -> Response:
+    return negotiated_response(request, {
+        "directory": database_backup.directory,
+        "backups": database_backup.list_backups(),
+    })
+
+
+@router.post("/backups", status_code=status.HTTP_202_ACCEPTED, summary="Start an online database backup job")
+def start_backup(
+    request: Request,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+) -> Response:
+    if not database_backup.supported:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Online backups need a SQLite database")
+    try:
+        job = job_runner.submit(db, JobCreate(type="backup_database"), tenant_id, admin=True)
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+    return negotiated_response(request, job, status.HTTP_202_ACCEPTED)
@@ -0,0 +1,36 @@
+"""
+app/api/v1/endpoints/batch.py - Batch operation endpoint
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_database_session, get_idempotency_key, get_tenant_id
+from app.schemas.batch import BatchRequest, BatchResponse
+from app.services.batch import batch_service
+from app.services.idempotency import idempotency_service
+from app.core.exceptions import DatabaseError, IdempotencyKeyReusedError, IdempotencyKeyInProgressError
+from app.core.serialization import negotiated_response
+
+router = APIRouter()
+
+
+@router.post("", response_model=BatchResponse, summary="Execute several task operations in one call")
+def execute_batch(
+    request: Request,
+    batch: BatchRequest,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+) -> Response:
+    try:
+        return idempotency_service.run(
+            db, tenant_id, idempotency_key, request, batch,
+            lambda: negotiated_response(request, batch_service.execute(db, batch, tenant_id)),
+        )
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
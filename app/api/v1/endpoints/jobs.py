@@ -0,0 +1,99 @@
+"""
+app/api/v1/endpoints/jobs.py - Background job endpoints
+"""
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_database_session, get_idempotency_key, get_tenant_id, is_admin
+from app.schemas.job import JobCreate, JobResponse, JobList
+from app.services.idempotency import idempotency_service
+from app.services.jobs import job_runner
+from app.core.serialization import negotiated_response
+from app.core.exceptions import (
+    JobNotFoundError, JobForbiddenError, TaskValidationError, DatabaseError, IdempotencyKeyReusedError,
+    IdempotencyKeyInProgressError
+)
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED, summary="Submit a background job")
+def submit_job(
+    request: Request,
+    job_in: JobCreate,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    admin: bool = Depends(is_admin)
+) -> Response:
+    try:
+        return idempotency_service.run(
+            db, tenant_id, idempotency_key, request, job_in,
+            lambda: negotiated_response(
+                request, job_runner.submit(db, job_in, tenant_id, admin=admin), status.HTTP_202_ACCEPTED
+            ),
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except JobForbiddenError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("", response_model=JobList, summary="List recent jobs")
+def list_jobs(
+    request: Request,
+    job_status: Optional[Literal["queued", "running", "succeeded", "failed", "cancelled"]] = Query(
+        None, alias="status", description="Only jobs in this status"
+    ),
+    job_type: Optional[str] = Query(None, alias="type", description="Only jobs of this type"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of jobs to return"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    admin: bool = Depends(is_admin)
+) -> Response:
+    try:
+        jobs = job_runner.list_jobs(
+            db, status=job_status, job_type=job_type, limit=limit, tenant_id=tenant_id, admin=admin
+        )
+        return negotiated_response(request, jobs)
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/{job_id}", response_model=JobResponse, summary="Get a job and its progress")
+def get_job(
+    request: Request,
+    job_id: str,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    admin: bool = Depends(is_admin)
+) -> Response:
+    try:
+        return negotiated_response(request, job_runner.get_job(db, job_id, tenant_id, admin=admin))
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse, summary="Cancel a queued or running job")
+def cancel_job(
+    request: Request,
+    job_id: str,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    admin: bool = Depends(is_admin)
+) -> Response:
+    try:
+        return negotiated_response(request, job_runner.cancel(db, job_id, tenant_id, admin=admin))
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
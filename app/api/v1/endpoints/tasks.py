@@ -1,53 +1,167 @@
 """
 app/api/v1/endpoints/tasks.py - Task endpoints
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_database_session
+from app.api.deps import get_database_session, get_idempotency_key, get_tenant_id
 from app.schemas.task import (
-    TaskCreate, TaskUpdate, TaskResponse, TaskList, TaskStats,
-    TaskToggleResponse, TaskDeleteResponse
+    TaskCreate, TaskUpdate, TaskResponse, TaskList, TaskMultiGet, TaskStats,
+    TaskToggleResponse, TaskDeleteResponse, TaskChangeFeed, TaskAnalytics
 )
+from app.services.idempotency import idempotency_service
 from app.services.task import task_service
-from app.core.exceptions import TaskNotFoundError, TaskValidationError, DatabaseError
+from app.core.events import event_hub
+from app.core.serialization import negotiated_response
+from app.core.exceptions import (
+    TaskNotFoundError, TaskValidationError, DatabaseError, IdempotencyKeyReusedError, IdempotencyKeyInProgressError
+)
 
 router = APIRouter()
 
 
-@router.get("/", response_model=TaskList, summary="Get all tasks")
+@router.get("/", response_model=Union[TaskList, TaskMultiGet], summary="Get all tasks, or specific tasks by ID")
 def get_all_tasks(
+    request: Request,
     skip: int = Query(0, ge=0, description="Number of tasks to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of tasks to return"),
-    db: Session = Depends(get_database_session)
-) -> TaskList:
+    include_archived: bool = Query(False, description="Also include archived tasks"),
+    ids: Optional[str] = Query(
+        None, description="Comma-separated task IDs to fetch instead of a page; archived tasks are included"
+    ),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.get_all_tasks(db, skip=skip, limit=limit)
+        if ids is not None:
+            return negotiated_response(request, task_service.get_tasks_by_ids(db, ids.split(","), tenant_id))
+        return negotiated_response(
+            request, task_service.get_all_tasks(
+                db, skip=skip, limit=limit, include_archived=include_archived, tenant_id=tenant_id
+            )
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED, summary="Create a new task")
 def create_task(
+    request: Request,
     task_data: TaskCreate,
-    db: Session = Depends(get_database_session)
-) -> TaskResponse:
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+) -> Response:
+    try:
+        return idempotency_service.run(
+            db, tenant_id, idempotency_key, request, task_data,
+            lambda: negotiated_response(
+                request, task_service.create_task(db, task_data, tenant_id), status.HTTP_201_CREATED
+            ),
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/changes", response_model=TaskChangeFeed, summary="Get tasks changed since a cursor")
+def get_task_changes(
+    request: Request,
+    since: Optional[str] = Query(None, description="Cursor from the previous call; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.create_task(db, task_data)
+        return negotiated_response(
+            request, task_service.get_task_changes(db, since=since, limit=limit, tenant_id=tenant_id)
+        )
     except TaskValidationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/analytics", response_model=TaskAnalytics, summary="Get created/completed counts over time")
+def get_task_analytics(
+    request: Request,
+    start: Optional[date] = Query(None, description="First UTC day (default: 29 days before end)"),
+    end: Optional[date] = Query(None, description="Last UTC day (default: today)"),
+    granularity: Literal["day", "week"] = Query("day", description="Bucket by day or ISO week"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
+    try:
+        return negotiated_response(
+            request, task_service.get_task_analytics(
+                db, start=start, end=end, granularity=granularity, tenant_id=tenant_id
+            )
+        )
+    except TaskValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/stream", summary="Stream task change events (Server-Sent Events)")
+async def stream_task_events(tenant_id: str = Depends(get_tenant_id)) -> StreamingResponse:
+    subscription = event_hub.subscribe(tenant_id)
+    
+    async def event_stream():
+        try:
+            yield b": connected\n\n"
+            while True:
+                event = await subscription.next_event()
+                if event is None:
+                    break
+                yield event.sse
+        finally:
+            event_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/stream")
+async def task_events_websocket(websocket: WebSocket, tenant_id: str = Depends(get_tenant_id)) -> None:
+    subscription = event_hub.subscribe(tenant_id)
+    await websocket.accept()
+    try:
+        while True:
+            event = await subscription.next_event()
+            if event is None:
+                # Dropped for falling behind or shutting down; the client should reconnect
+                await websocket.close(code=1013)
+                break
+            await websocket.send_text(event.message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
 @router.get("/{task_id}", response_model=TaskResponse, summary="Get a specific task")
 def get_task(
+    request: Request,
     task_id: str,
-    db: Session = Depends(get_database_session)
-) -> TaskResponse:
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.get_task_by_id(db, task_id)
+        return negotiated_response(request, task_service.get_task_by_id(db, task_id, tenant_id))
     except TaskNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except DatabaseError as e:
@@ -56,12 +170,14 @@ def get_task(
 
 @router.put("/{task_id}", response_model=TaskResponse, summary="Update a task")
 def update_task(
+    request: Request,
     task_id: str,
     task_data: TaskUpdate,
-    db: Session = Depends(get_database_session)
-) -> TaskResponse:
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.update_task(db, task_id, task_data)
+        return negotiated_response(request, task_service.update_task(db, task_id, task_data, tenant_id))
     except TaskNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except TaskValidationError as e:
@@ -72,24 +188,36 @@ def update_task(
 
 @router.patch("/{task_id}/toggle", response_model=TaskToggleResponse, summary="Toggle task completion")
 def toggle_task_completion(
+    request: Request,
     task_id: str,
-    db: Session = Depends(get_database_session)
-) -> TaskToggleResponse:
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+) -> Response:
     try:
-        return task_service.toggle_task_completion(db, task_id)
+        return idempotency_service.run(
+            db, tenant_id, idempotency_key, request, None,
+            lambda: negotiated_response(request, task_service.toggle_task_completion(db, task_id, tenant_id)),
+        )
     except TaskNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.delete("/{task_id}", response_model=TaskDeleteResponse, summary="Delete a task")
 def delete_task(
+    request: Request,
     task_id: str,
-    db: Session = Depends(get_database_session)
-) -> TaskDeleteResponse:
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.delete_task(db, task_id)
+        return negotiated_response(request, task_service.delete_task(db, task_id, tenant_id))
     except TaskNotFoundError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except DatabaseError as e:
@@ -98,11 +226,16 @@ def delete_task(
 
 @router.get("/search/", response_model=List[TaskResponse], summary="Search tasks")
 def search_tasks(
+    request: Request,
     q: str = Query(..., min_length=2, description="Search query"),
-    db: Session = Depends(get_database_session)
-) -> List[TaskResponse]:
+    include_archived: bool = Query(False, description="Also include archived tasks"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.search_tasks(db, q)
+        return negotiated_response(
+            request, task_service.search_tasks(db, q, include_archived=include_archived, tenant_id=tenant_id)
+        )
     except TaskValidationError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except DatabaseError as e:
@@ -111,38 +244,53 @@ def search_tasks(
 
 @router.get("/stats/", response_model=TaskStats, summary="Get task statistics")
 def get_task_statistics(
-    db: Session = Depends(get_database_session)
-) -> TaskStats:
+    request: Request,
+    include_archived: bool = Query(False, description="Also include archived tasks"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.get_task_statistics(db)
+        return negotiated_response(
+            request, task_service.get_task_statistics(db, include_archived=include_archived, tenant_id=tenant_id)
+        )
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.get("/completed/", response_model=List[TaskResponse], summary="Get completed tasks")
 def get_completed_tasks(
-    db: Session = Depends(get_database_session)
-) -> List[TaskResponse]:
+    request: Request,
+    include_archived: bool = Query(False, description="Also include archived tasks"),
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.get_completed_tasks(db)
+        return negotiated_response(
+            request, task_service.get_completed_tasks(db, include_archived=include_archived, tenant_id=tenant_id)
+        )
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.get("/pending/", response_model=List[TaskResponse], summary="Get pending tasks")
 def get_pending_tasks(
-    db: Session = Depends(get_database_session)
-) -> List[TaskResponse]:
+    request: Request,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id)
+) -> Response:
     try:
-        return task_service.get_pending_tasks(db)
+        return negotiated_response(request, task_service.get_pending_tasks(db, tenant_id))
     except DatabaseError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
 @router.post("/seed", summary="Seed sample data")
 def seed_sample_data(
-    db: Session = Depends(get_database_session)
-) -> dict:
+    request: Request,
+    db: Session = Depends(get_database_session),
+    tenant_id: str = Depends(get_tenant_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key)
+) -> Response:
     sample_tasks = [
         TaskCreate(title="Learn FastAPI", description="Study FastAPI framework and build REST APIs"),
         TaskCreate(title="Build Frontend", description="Create React TypeScript frontend"),
@@ -151,16 +299,23 @@ def seed_sample_data(
         TaskCreate(title="Documentation", description="Write API documentation and README"),
     ]
     
-    created_tasks = []
-    try:
+    def seed() -> Response:
+        created_tasks = []
         for task_data in sample_tasks:
-            task = task_service.create_task(db, task_data)
+            task = task_service.create_task(db, task_data, tenant_id)
             created_tasks.append(task)
         
-        return {
+        return negotiated_response(request, {
             "message": f"Successfully created {len(created_tasks)} sample tasks",
             "tasks": created_tasks
-        }
+        })
+    
+    try:
+        return idempotency_service.run(db, tenant_id, idempotency_key, request, None, seed)
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
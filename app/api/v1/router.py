@@ -3,7 +3,10 @@ app/api/v1/router.py - API router configuration
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import tasks
+from app.api.v1.endpoints import tasks, batch, jobs, admin
 
 api_router = APIRouter()
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
+api_router.include_router(batch.router, prefix="/batch", tags=["batch"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,38 @@
+"""
+app/cli/archive_tasks.py - Move long-completed tasks to the archive now
+
+Runs archive batches until no task completed more than --days ago is left,
+resuming from the saved cursor of an interrupted run:
+
+    python -m app.cli.archive_tasks --days 30 --batch-size 500 --pause 0.5
+"""
+import argparse
+import logging
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, create_tables
+from app.services.archive import TaskArchiver
+from app.services.task import task_service
+
+settings = get_settings()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move long-completed tasks to tasks_archive")
+    parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS, help="Archive tasks completed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="Tasks moved per transaction")
+    parser.add_argument("--pause", type=float, default=settings.ARCHIVE_BATCH_PAUSE_SECONDS, help="Seconds to wait between batches")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    create_tables()
+    archiver = TaskArchiver(
+        task_service.repository, SessionLocal,
+        after_days=args.days, batch_size=args.batch_size, pause=args.pause,
+    )
+    print(f"Archived {archiver.run_pass(max_batches=args.max_batches)} tasks")
+
+
+if __name__ == "__main__":
+    main()
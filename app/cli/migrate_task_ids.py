@@ -0,0 +1,132 @@
+"""
+app/cli/migrate_task_ids.py - Convert legacy 36-character task ids to compact UUID columns
+
+Existing ids keep their values; only their storage changes.  New tasks get
+time-ordered UUIDv7 ids.  Run once per database (and once per shard):
+
+    python -m app.cli.migrate_task_ids                       # DATABASE_URL and all shards
+    python -m app.cli.migrate_task_ids sqlite:///./legacy.db # specific databases
+"""
+import argparse
+import logging
+import uuid
+from typing import Dict, List
+
+from sqlalchemy import String, inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.database import Base, build_engine
+import app.models.task  # noqa: F401 - registers the task tables
+import app.models.task_change  # noqa: F401
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Table name -> id columns stored as CompactUUID
+UUID_COLUMNS: Dict[str, List[str]] = {
+    "tasks": ["id"],
+    "task_changes": ["task_id"],
+}
+
+
+def legacy_tables(engine: Engine) -> List[str]:
+    """Tables whose id columns are still stored as strings"""
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    legacy = []
+    for table_name, column_names in UUID_COLUMNS.items():
+        if table_name not in existing:
+            continue
+        columns = {column["name"]: column["type"] for column in inspector.get_columns(table_name)}
+        if any(isinstance(columns.get(name), String) for name in column_names):
+            legacy.append(table_name)
+    return legacy
+
+
+def _migrate_postgresql(engine: Engine, table_name: str) -> None:
+    with engine.begin() as conn:
+        for column_name in UUID_COLUMNS[table_name]:
+            conn.execute(text(
+                f"ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE uuid USING {column_name}::uuid"
+            ))
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_id"))
+
+
+def _migrate_by_copy(engine: Engine, table_name: str, batch_size: int) -> int:
+    """Rebuild the table with the current schema and copy the rows across"""
+    table = Base.metadata.tables[table_name]
+    legacy_name = f"{table_name}_legacy_ids"
+    copied = 0
+    with engine.begin() as conn:
+        legacy_columns = {column["name"] for column in inspect(conn).get_columns(table_name)}
+        # Index names are global in SQLite, so free them before recreating the table
+        for index in inspect(conn).get_indexes(table_name):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+        conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+        table.create(conn)
+        
+        # Columns added since (such as tenant_id) take their defaults
+        copied_columns = [column for column in table.columns if column.name in legacy_columns]
+        # Type every column except the ids, which are still strings in the legacy table
+        legacy_select = text(
+            f"SELECT {', '.join(column.name for column in copied_columns)} FROM {legacy_name}"
+        ).columns(**{
+            column.name: column.type for column in copied_columns
+            if column.name not in UUID_COLUMNS[table_name]
+        })
+        rows = conn.execute(legacy_select).mappings()
+        batch = []
+        for row in rows:
+            record = dict(row)
+            for column_name in UUID_COLUMNS[table_name]:
+                record[column_name] = str(uuid.UUID(str(record[column_name])))
+            batch.append(record)
+            if len(batch) >= batch_size:
+                conn.execute(table.insert(), batch)
+                copied += len(batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+            copied += len(batch)
+        
+        conn.execute(text(f"DROP TABLE {legacy_name}"))
+    return copied
+
+
+def migrate(database_url: str, batch_size: int = 1000) -> Dict[str, int]:
+    """Migrate one database; returns rows converted per table"""
+    engine = build_engine(database_url)
+    converted = {}
+    try:
+        for table_name in legacy_tables(engine):
+            if engine.dialect.name == "postgresql":
+                _migrate_postgresql(engine, table_name)
+                with engine.connect() as conn:
+                    converted[table_name] = conn.execute(text(f"SELECT count(*) FROM {table_name}")).scalar()
+            else:
+                converted[table_name] = _migrate_by_copy(engine, table_name, batch_size)
+            logger.info(f"Migrated {table_name} ids in {database_url}")
+    finally:
+        engine.dispose()
+    return converted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert legacy string task ids to compact UUID storage")
+    parser.add_argument("database_urls", nargs="*", help="Databases to migrate (default: DATABASE_URL and all shards)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows copied per insert")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    urls = args.database_urls or [settings.DATABASE_URL, *settings.SHARD_DATABASE_URLS]
+    for url in urls:
+        converted = migrate(url, batch_size=args.batch_size)
+        if not converted:
+            print(f"{url}: already up to date")
+        for table_name, count in converted.items():
+            print(f"{url}: {table_name} migrated ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+app/cli/migrate_tenants.py - Add tenant columns and tenant-leading indexes to existing tables
+
+Rows that predate multi-tenancy are assigned to one tenant (the "default"
+tenant unless --tenant is given) and every index is rebuilt to lead with
+tenant_id.  Run once per database (and once per shard), before starting the
+new version; the per-tenant counters are built on the next startup:
+
+    python -m app.cli.migrate_tenants                        # DATABASE_URL and all shards
+    python -m app.cli.migrate_tenants --tenant acme sqlite:///./task_manager.db
+"""
+import argparse
+import logging
+from typing import Dict, List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import get_settings
+from app.core.database import Base, build_engine
+from app.models.task import DEFAULT_TENANT
+import app.models.job  # noqa: F401 - registers the tenant-scoped tables
+import app.models.task_analytics  # noqa: F401
+import app.models.task_archive  # noqa: F401
+import app.models.task_change  # noqa: F401
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+TENANT_TABLES = [
+    "tasks", "tasks_archive", "task_changes", "task_daily_rollups", "task_completion_histogram", "jobs",
+]
+
+
+def untenanted_tables(engine: Engine) -> List[str]:
+    """Existing tables that have no tenant_id column yet"""
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    return [
+        table_name for table_name in TENANT_TABLES
+        if table_name in existing
+        and "tenant_id" not in {column["name"] for column in inspector.get_columns(table_name)}
+    ]
+
+
+def _migrate_postgresql(conn: Connection, table_name: str, tenant_id: str) -> None:
+    table = Base.metadata.tables[table_name]
+    inspector = inspect(conn)
+    # DDL takes no bound parameters; the default only fills the existing rows
+    literal = tenant_id.replace("'", "''")
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN tenant_id VARCHAR(64) NOT NULL DEFAULT '{literal}'"))
+    conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN tenant_id DROP DEFAULT"))
+    for constraint in inspector.get_unique_constraints(table_name):
+        conn.execute(text(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint['name']}"))
+    for index in inspector.get_indexes(table_name):
+        # Indexes behind unique constraints went with their constraint
+        if not index.get("duplicates_constraint"):
+            conn.execute(text(f"DROP INDEX {index['name']}"))
+    primary_key = inspector.get_pk_constraint(table_name)
+    if primary_key["constrained_columns"] != [column.name for column in table.primary_key.columns]:
+        conn.execute(text(f"ALTER TABLE {table_name} DROP CONSTRAINT {primary_key['name']}"))
+        conn.execute(text(
+            f"ALTER TABLE {table_name} ADD PRIMARY KEY ({', '.join(column.name for column in table.primary_key)})"
+        ))
+    for index in table.indexes:
+        index.create(conn)
+
+
+def _migrate_by_copy(conn: Connection, table_name: str, tenant_id: str) -> None:
+    """Rebuild the table with the current schema and copy the rows across"""
+    table = Base.metadata.tables[table_name]
+    legacy_name = f"{table_name}_pre_tenancy"
+    legacy_columns = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    # Index names are global in SQLite, so free them before recreating the table
+    for index in inspect(conn).get_indexes(table_name):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy_name}"))
+    table.create(conn)
+    
+    column_names = ", ".join(column.name for column in table.columns if column.name in legacy_columns)
+    conn.execute(
+        text(
+            f"INSERT INTO {table_name} ({column_names}, tenant_id) "
+            f"SELECT {column_names}, :tenant_id FROM {legacy_name}"
+        ).bindparams(tenant_id=tenant_id)
+    )
+    conn.execute(text(f"DROP TABLE {legacy_name}"))
+
+
+def migrate(database_url: str, tenant_id: str = DEFAULT_TENANT) -> Dict[str, int]:
+    """Migrate one database; returns the rows assigned to ``tenant_id`` per table"""
+    engine = build_engine(database_url)
+    migrated = {}
+    try:
+        for table_name in untenanted_tables(engine):
+            with engine.begin() as conn:
+                if engine.dialect.name == "postgresql":
+                    _migrate_postgresql(conn, table_name, tenant_id)
+                else:
+                    _migrate_by_copy(conn, table_name, tenant_id)
+                migrated[table_name] = conn.execute(text(f"SELECT count(*) FROM {table_name}")).scalar()
+            logger.info(f"Added tenants to {table_name} in {database_url}")
+    finally:
+        engine.dispose()
+    return migrated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add tenant columns and tenant-leading indexes")
+    parser.add_argument("database_urls", nargs="*", help="Databases to migrate (default: DATABASE_URL and all shards)")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant that existing rows are assigned to")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    urls = args.database_urls or [settings.DATABASE_URL, *settings.SHARD_DATABASE_URLS]
+    for url in urls:
+        migrated = migrate(url, tenant_id=args.tenant)
+        if not migrated:
+            print(f"{url}: already up to date")
+        for table_name, count in migrated.items():
+            print(f"{url}: {table_name} migrated ({count} rows assigned to {args.tenant})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+app/cli/rebalance_shards.py - Move sharded rows after the shard count changes
+
+Usage:
+    python -m app.cli.rebalance_shards \
+        --from sqlite:///./task_shard_0.db sqlite:///./task_shard_1.db \
+        --to sqlite:///./task_shard_0.db sqlite:///./task_shard_1.db sqlite:///./task_shard_2.db
+"""
+import argparse
+import logging
+from typing import Dict, List
+
+from sqlalchemy import Table, delete, select
+
+from app.core.database import Base, build_engine, sharded_tables
+from app.core.sharding import shard_index
+import app.models.task  # noqa: F401 - registers the sharded models
+import app.models.task_analytics  # noqa: F401
+import app.models.task_archive  # noqa: F401
+
+logger = logging.getLogger(__name__)
+
+
+def _shard_key_column(table: Table):
+    for mapper in Base.registry.mappers:
+        if mapper.local_table is table:
+            return mapper.columns[mapper.class_.__shard_key__]
+    raise ValueError(f"Table {table.name} is not sharded")
+
+
+def rebalance(
+    source_urls: List[str],
+    target_urls: List[str],
+    batch_size: int = 500,
+    dry_run: bool = False
+) -> Dict[str, int]:
+    """Move every sharded row to the shard it hashes to under ``target_urls``.
+
+    Rows are copied to their new shard before being deleted from the old one,
+    and copies skip keys the target already holds, so an interrupted run can
+    simply be repeated.  Surrogate primary keys (such as change-feed
+    sequences) are reassigned by the target.  Returns the number of rows
+    moved per table.
+    """
+    engines = {url: build_engine(url) for url in set(source_urls) | set(target_urls)}
+    tables = sharded_tables()
+    for url in target_urls:
+        Base.metadata.create_all(bind=engines[url], tables=tables)
+
+    moved = {table.name: 0 for table in tables}
+    for source_url in source_urls:
+        source = engines[source_url]
+        for table in tables:
+            key_column = _shard_key_column(table)
+            surrogate_keys = {
+                column.name for column in table.primary_key.columns if column is not key_column
+            }
+            last_key = None
+            while True:
+                query = select(table).order_by(key_column).limit(batch_size)
+                if last_key is not None:
+                    query = query.where(key_column > last_key)
+                with source.connect() as conn:
+                    rows = conn.execute(query).mappings().all()
+                if not rows:
+                    break
+                last_key = rows[-1][key_column.name]
+
+                outgoing: Dict[str, List[dict]] = {}
+                for row in rows:
+                    target_url = target_urls[shard_index(row[key_column.name], len(target_urls))]
+                    if target_url != source_url:
+                        outgoing.setdefault(target_url, []).append(
+                            {name: value for name, value in row.items() if name not in surrogate_keys}
+                        )
+
+                for target_url, batch in outgoing.items():
+                    keys = [row[key_column.name] for row in batch]
+                    moved[table.name] += len(batch)
+                    if dry_run:
+                        continue
+                    with engines[target_url].begin() as conn:
+                        existing = set(conn.execute(select(key_column).where(key_column.in_(keys))).scalars())
+                        fresh = [row for row in batch if row[key_column.name] not in existing]
+                        if fresh:
+                            conn.execute(table.insert(), fresh)
+                    with source.begin() as conn:
+                        conn.execute(delete(table).where(key_column.in_(keys)))
+                    logger.info(f"Moved {len(batch)} {table.name} rows from {source_url} to {target_url}")
+
+    for engine in engines.values():
+        engine.dispose()
+    return moved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebalance sharded tables onto a new set of shards")
+    parser.add_argument("--from", dest="source_urls", nargs="+", required=True, help="Current shard URLs, in order")
+    parser.add_argument("--to", dest="target_urls", nargs="+", required=True, help="New shard URLs, in order")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows read per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Count rows that would move without moving them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    moved = rebalance(args.source_urls, args.target_urls, batch_size=args.batch_size, dry_run=args.dry_run)
+    for table_name, count in moved.items():
+        print(f"{table_name}: {count} rows {'would move' if args.dry_run else 'moved'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""
+app/cli/rebuild_analytics.py - Recompute the task analytics rollups
+
+The rollups behind /tasks/analytics are kept up to date by every task write.
+Run this after restoring a backup, editing tasks outside the API, or to
+repair drift; it rebuilds them from the tasks and archived tasks:
+
+    python -m app.cli.rebuild_analytics --batch-size 1000
+"""
+import argparse
+import logging
+
+from app.core.database import SessionLocal, create_tables
+from app.services.task import task_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute the task analytics rollups")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Tasks read per query")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    create_tables()
+    with SessionLocal() as db:
+        summary = task_service.rebuild_analytics(db, batch_size=args.batch_size)
+    print(f"Rebuilt {summary['days']} days from {summary['tasks']} tasks ({summary['completed']} completed)")
+
+
+if __name__ == "__main__":
+    main()
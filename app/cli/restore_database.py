@@ -0,0 +1,51 @@
+"""
+app/cli/restore_database.py - Replace the SQLite database with a backup
+
+Stop the application first: the database is locked while it is overwritten
+and running processes would keep serving cached state. The backup is
+integrity-checked before anything is changed:
+
+    python -m app.cli.restore_database task_manager-20240101T030000000000Z.db --yes
+
+A bare file name is looked up in --dir; without a file, the backups there
+are listed.
+"""
+import argparse
+import logging
+
+from app.cli.backup_database import progress_printer
+from app.core.config import get_settings
+from app.core.database import engine
+from app.core.exceptions import BackupError
+from app.services.backup import DatabaseBackup
+
+settings = get_settings()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replace the SQLite database with a backup")
+    parser.add_argument("backup", nargs="?", help="Backup file, or its name in --dir")
+    parser.add_argument("--dir", default=settings.BACKUP_DIR, help="Directory of backup files")
+    parser.add_argument("--pages", type=int, default=settings.BACKUP_PAGES_PER_STEP, help="Pages copied per step")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    backup = DatabaseBackup(engine, args.dir, pages_per_step=args.pages)
+    if args.backup is None:
+        for entry in backup.list_backups():
+            print(f"{entry['name']}  {entry['bytes']} bytes  {entry['created_at']}")
+        return
+    
+    try:
+        path = backup.resolve(args.backup)
+        if not args.yes and input(f"Replace {engine.url.database} with {path}? [y/N] ").strip().lower() != "y":
+            raise SystemExit("Restore aborted")
+        result = backup.restore(path, progress_printer())
+    except BackupError as e:
+        raise SystemExit(e.message)
+    print(f"Restored {result['pages']} pages from {result['file']} in {result['duration_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+app/core/admission.py - Admission control and load shedding per route class
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+READ = "read"
+WRITE = "write"
+SCAN = "scan"
+SEARCH = "search"
+EXPORT = "export"
+
+# Lower values are admitted first when slots free up: cheap point reads
+# ahead of writes, writes ahead of full scans, exports last.
+PRIORITIES: Dict[str, int] = {READ: 0, WRITE: 1, SCAN: 2, SEARCH: 3, EXPORT: 4}
+
+_SAFE_METHODS = {"GET", "HEAD"}
+
+# (pattern, class) checked in order for GET/HEAD; a class of None bypasses
+# admission control (long-lived streams must not pin a slot).
+ROUTE_CLASSES: List[Tuple[Pattern[str], Optional[str]]] = [
+    (re.compile(r"^/api/v1/tasks/stream/?$"), None),
+    (re.compile(r"^/api/v1/tasks/changes/?$"), EXPORT),
+    (re.compile(r"^/api/v1/tasks/search/?$"), SEARCH),
+    (re.compile(r"^/api/v1/tasks/(stats|completed|pending|analytics)/?$"), SCAN),
+    (re.compile(r"^/api/v1/tasks/?$"), SCAN),
+    (re.compile(r"^/api/v1/tasks/[^/]+$"), READ),
+]
+
+# The task list with ``ids`` is a bounded primary-key multi-get, not a scan
+_TASK_LIST = re.compile(r"^/api/v1/tasks/?$")
+
+
+def _names_ids(query_string: bytes) -> bool:
+    return any(key == "ids" and value for key, value in parse_qsl(query_string.decode("latin-1")))
+
+
+def classify(method: str, path: str, query_string: bytes = b"") -> Optional[str]:
+    """Route class of a request, or None when it is not admission controlled"""
+    if not path.startswith("/api/"):
+        return None
+    if method not in _SAFE_METHODS:
+        return None if method == "OPTIONS" else WRITE
+    if _TASK_LIST.match(path) and _names_ids(query_string):
+        return READ
+    for pattern, route_class in ROUTE_CLASSES:
+        if pattern.match(path):
+            return route_class
+    return None
+
+
+class _Waiter:
+    __slots__ = ("route_class", "future")
+
+    def __init__(self, route_class: str, future: asyncio.Future):
+        self.route_class = route_class
+        self.future = future
+
+
+class AdmissionController:
+    """Caps in-flight requests per route class with a bounded priority queue.
+
+    A request runs immediately when both its class limit and the overall
+    ``max_in_flight`` allow it; otherwise it waits up to ``queue_timeout``
+    seconds. Freed slots go to the highest-priority waiter that fits. When
+    the queue is full, a new request displaces the lowest-priority waiter if
+    it outranks it and is rejected otherwise.
+
+    All state is touched from the event loop only, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        max_in_flight: int,
+        queue_size: int,
+        queue_timeout: float,
+    ):
+        self.limits = {route_class: limits.get(route_class, max_in_flight) for route_class in PRIORITIES}
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight: Dict[str, int] = {route_class: 0 for route_class in PRIORITIES}
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    def queued(self) -> Dict[str, int]:
+        depth = {route_class: 0 for route_class in PRIORITIES}
+        for _, _, waiter in self._queue:
+            depth[waiter.route_class] += 1
+        return depth
+
+    def _fits(self, route_class: str) -> bool:
+        return (
+            self.total_in_flight < self.max_in_flight
+            and self.in_flight[route_class] < self.limits[route_class]
+        )
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued requests, best priority first"""
+        position = 0
+        while position < len(self._queue):
+            waiter = self._queue[position][2]
+            if self._fits(waiter.route_class):
+                del self._queue[position]
+                self.in_flight[waiter.route_class] += 1
+                waiter.future.set_result(True)
+            else:
+                position += 1
+
+    def _remove(self, waiter: _Waiter) -> None:
+        for position, entry in enumerate(self._queue):
+            if entry[2] is waiter:
+                del self._queue[position]
+                return
+
+    async def acquire(self, route_class: str) -> Optional[str]:
+        """Wait for a slot; returns None once admitted or the reason it was rejected"""
+        if self._fits(route_class):
+            self.in_flight[route_class] += 1
+            return None
+
+        priority = PRIORITIES[route_class]
+        if len(self._queue) >= self.queue_size:
+            worst_priority, _, worst = self._queue[-1] if self._queue else (-1, 0, None)
+            if worst is None or worst_priority <= priority:
+                return "queue_full"
+            self._queue.pop()
+            worst.future.set_result(False)
+
+        waiter = _Waiter(route_class, asyncio.get_running_loop().create_future())
+        bisect.insort(self._queue, (priority, next(self._sequence), waiter))
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            if waiter.future.done() and waiter.future.result():
+                self.release(route_class)
+            else:
+                self._remove(waiter)
+            raise
+
+        if not waiter.future.done():
+            self._remove(waiter)
+            waiter.future.cancel()
+            return "timeout"
+        return None if waiter.future.result() else "shed"
+
+    def release(self, route_class: str) -> None:
+        self.in_flight[route_class] -= 1
+        self._dispatch()
+
+
+admitted_requests = metrics.counter(
+    "admission_admitted_total", "Requests admitted, by route class", ("route_class",)
+)
+rejected_requests = metrics.counter(
+    "admission_rejected_total", "Requests answered 503, by route class and reason", ("route_class", "reason")
+)
+
+
+class AdmissionMiddleware:
+    """Reject requests with 503 and ``Retry-After`` instead of queueing them
+    without bound when the application is saturated.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, retry_after: int = 1):
+        self.app = app
+        self.controller = controller
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"], scope.get("query_string", b""))
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire(route_class)
+        if reason is not None:
+            rejected_requests.inc(route_class=route_class, reason=reason)
+            logger.warning(f"Shed {route_class} request {scope['method']} {scope['path']}: {reason}")
+            response = JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Server is busy, retry later", "type": "Overloaded"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        admitted_requests.inc(route_class=route_class)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+
+def register_metrics(controller: AdmissionController) -> None:
+    """Expose a controller's live in-flight and queue depth gauges"""
+    metrics.gauge(
+        "admission_in_flight", "Requests currently running, by route class", ("route_class",),
+        callback=lambda: {(route_class,): count for route_class, count in controller.in_flight.items()},
+    )
+    metrics.gauge(
+        "admission_queue_depth", "Requests waiting for a slot, by route class", ("route_class",),
+        callback=lambda: {(route_class,): depth for route_class, depth in controller.queued().items()},
+    )
+
+
+admission_controller = AdmissionController(
+    limits=settings.ADMISSION_LIMITS,
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+register_metrics(admission_controller)
@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Dict, List
 
 try:
     from pydantic import BaseSettings, validator
@@ -22,8 +22,175 @@ class Settings(BaseSettings):
     PORT: int = 8000
     RELOAD: bool = False
 
+    # Launcher (python -m app.server). WORKERS=0 sizes worker processes from
+    # the available CPUs, capped so that every worker's pool fits within
+    # DATABASE_MAX_CONNECTIONS. THREADPOOL_SIZE caps concurrent sync endpoint
+    # calls per worker; keep it above ADMISSION_MAX_IN_FLIGHT. In-flight
+    # requests get GRACEFUL_SHUTDOWN_SECONDS to finish on shutdown.
+    WORKERS: int = 0
+    KEEP_ALIVE_SECONDS: int = 5
+    BACKLOG: int = 2048
+    THREADPOOL_SIZE: int = 40
+    GRACEFUL_SHUTDOWN_SECONDS: int = 30
+
     # Database
     DATABASE_URL: str = "sqlite:///./task_manager.db"
+    # Connection pool of each worker process, per database (not SQLite), and
+    # the connections the database server allows this service in total
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DATABASE_MAX_CONNECTIONS: int = 100
+
+    # Sharding - one URL per shard; tasks are spread over them by id hash.
+    # Empty keeps all tables on DATABASE_URL.
+    SHARD_DATABASE_URLS: List[str] = []
+
+    # Task event streaming (SSE / WebSocket)
+    # "local" delivers within one worker, so the launcher then starts one
+    # unless WORKERS is set; use "package.module:Class" for a shared pub/sub
+    # backend when running several workers.
+    EVENT_BACKEND: str = "local"
+    EVENT_SUBSCRIBER_QUEUE_SIZE: int = 100
+    EVENT_HEARTBEAT_SECONDS: float = 15.0
+
+    # Response compression (gzip / brotli / zstd, by Accept-Encoding)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    # Admission control - in-flight caps per route class (read, write, scan,
+    # search, export) under an overall cap kept below the threadpool size.
+    # Excess requests wait up to ADMISSION_QUEUE_TIMEOUT seconds, then get 503.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 32
+    ADMISSION_LIMITS: Dict[str, int] = {"read": 32, "write": 16, "scan": 8, "search": 4, "export": 4}
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+
+    # Statement timeouts - seconds each database statement of a request may
+    # run, per admission route class; 0 or a missing class means no limit.
+    # Statements of a request whose client disconnects are cancelled too.
+    # Enforced with statement_timeout on Postgres and a progress-handler
+    # interrupt on SQLite.
+    STATEMENT_TIMEOUT_ENABLED: bool = True
+    STATEMENT_TIMEOUTS: Dict[str, float] = {"read": 2.0, "write": 5.0, "scan": 10.0, "search": 5.0, "export": 30.0}
+
+    # Single flight - concurrent identical reads (task list, stats, completed,
+    # pending, analytics) of a tenant share one execution. Results are also
+    # kept for SINGLE_FLIGHT_CACHE_MS (0 disables this micro-cache); writes
+    # in this process drop them at once, writes elsewhere are seen after it.
+    SINGLE_FLIGHT_ENABLED: bool = True
+    SINGLE_FLIGHT_CACHE_MS: float = 0.0
+
+    # Group commit - queue concurrent creates and toggles for up to
+    # GROUP_COMMIT_MAX_DELAY_MS and apply them in one transaction.
+    GROUP_COMMIT_ENABLED: bool = False
+    GROUP_COMMIT_MAX_BATCH: int = 64
+    GROUP_COMMIT_MAX_DELAY_MS: float = 2.0
+
+    # Archival - tasks completed more than ARCHIVE_AFTER_DAYS ago move to
+    # tasks_archive in batches, pausing between batches, every
+    # ARCHIVE_INTERVAL_SECONDS while ARCHIVE_ENABLED is set.
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_BATCH_PAUSE_SECONDS: float = 0.5
+    ARCHIVE_INTERVAL_SECONDS: float = 3600.0
+
+    # Backups - with BACKUP_ENABLED the SQLite database is copied into
+    # BACKUP_DIR every BACKUP_INTERVAL_SECONDS, BACKUP_PAGES_PER_STEP pages at
+    # a time with BACKUP_STEP_PAUSE_MS between steps so writers are never
+    # held up for long. The newest BACKUP_KEEP backups are kept (0 keeps all).
+    # A copy restarted by writes more than BACKUP_MAX_RESTARTS times is
+    # finished in one step, blocking writers until it is done.
+    BACKUP_ENABLED: bool = False
+    BACKUP_DIR: str = "backups"
+    BACKUP_INTERVAL_SECONDS: float = 86400.0
+    BACKUP_PAGES_PER_STEP: int = 256
+    BACKUP_STEP_PAUSE_MS: float = 10.0
+    BACKUP_KEEP: int = 7
+    BACKUP_MAX_RESTARTS: int = 3
+
+    # Profiling
+    # With PROFILING_ENABLED, requests sending "X-Profile: <ADMIN_TOKEN>", and
+    # a PROFILING_SAMPLE_RATE fraction of all requests, run under a stack
+    # sampler taking a sample every PROFILING_INTERVAL_MS. Profiles are
+    # written to PROFILING_DIR, keeping the newest PROFILING_MAX_FILES.
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: float = 2.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 100
+
+    # Tracing
+    # With TRACING_ENABLED, every request gets a root span (continuing an
+    # incoming W3C traceparent) with child spans for TaskService and
+    # repository methods and SQL statements. Traces go to an in-memory
+    # buffer of TRACING_MEMORY_TRACES (exporter "memory", readable at
+    # /admin/traces) or are appended to TRACING_FILE as OTLP/JSON lines
+    # (exporter "file"). TRACING_SAMPLE_RATE applies to new traces only.
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "memory"
+    TRACING_FILE: str = "logs/traces.jsonl"
+    TRACING_MEMORY_TRACES: int = 1000
+    TRACING_SAMPLE_RATE: float = 1.0
+
+    # Memory diagnostics
+    # With MEMORY_DIAGNOSTICS_ENABLED, tracemalloc runs (keeping
+    # MEMORY_TRACEMALLOC_FRAMES frames per allocation) and every request's
+    # peak allocation is measured. Requests sending
+    # "X-Memory-Snapshot: <ADMIN_TOKEN>" also record a snapshot diff.
+    # tracemalloc slows allocation-heavy code noticeably; enable it to
+    # investigate, not permanently.
+    MEMORY_DIAGNOSTICS_ENABLED: bool = False
+    MEMORY_TRACEMALLOC_FRAMES: int = 10
+
+    # Background jobs
+    # Jobs submitted to /jobs are queued in the jobs table. With JOBS_ENABLED
+    # this process runs JOBS_WORKERS worker threads that pick them up, also
+    # polling every JOBS_POLL_INTERVAL_SECONDS for jobs queued elsewhere.
+    # JOBS_CONCURRENCY caps running jobs per type in this process, e.g.
+    # {"import_tasks": 4}; unlisted types keep their defaults. A running job
+    # whose heartbeat is older than JOBS_STALE_SECONDS is marked failed.
+    # Shutdown waits up to JOBS_SHUTDOWN_TIMEOUT_SECONDS for running jobs.
+    JOBS_ENABLED: bool = True
+    JOBS_WORKERS: int = 2
+    JOBS_CONCURRENCY: Dict[str, int] = {}
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0
+    JOBS_STALE_SECONDS: float = 60.0
+    JOBS_SHUTDOWN_TIMEOUT_SECONDS: float = 30.0
+    JOBS_IMPORT_CHUNK_SIZE: int = 500
+    JOBS_EXPORT_DIR: str = "exports"
+
+    # Multi-tenancy: tasks, analytics, the change feed and jobs are scoped to
+    # the tenant named in TENANT_HEADER. Requests without it act for the
+    # "default" tenant, or are rejected when TENANT_REQUIRED is set.
+    TENANT_HEADER: str = "X-Tenant-ID"
+    TENANT_REQUIRED: bool = False
+
+    # Repository backend
+    # "sqlalchemy" keeps tasks in DATABASE_URL (and SHARD_DATABASE_URLS).
+    # "memory" keeps them in an indexed in-process store, for previews and
+    # tests: nothing survives a restart unless REPOSITORY_SNAPSHOT_PATH is
+    # set, in which case the store is loaded from that file on startup and
+    # written back on shutdown and every REPOSITORY_SNAPSHOT_INTERVAL_SECONDS
+    # (0 disables the periodic snapshots). Jobs and idempotency keys stay in
+    # DATABASE_URL with either backend.
+    REPOSITORY_BACKEND: str = "sqlalchemy"
+    REPOSITORY_SNAPSHOT_PATH: str = ""
+    REPOSITORY_SNAPSHOT_INTERVAL_SECONDS: float = 0.0
+
+    # Idempotency keys
+    # Writes sent with an "Idempotency-Key" header run once per key and
+    # tenant; retries get the stored first response for IDEMPOTENCY_TTL_SECONDS.
+    # A retry arriving while the first request is still running waits up to
+    # IDEMPOTENCY_WAIT_SECONDS for it before getting a 409. A first request
+    # that has not finished after IDEMPOTENCY_IN_FLIGHT_SECONDS is presumed
+    # dead and its key can be claimed again.
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_IN_FLIGHT_SECONDS: float = 60.0
 
     # CORS
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173", "https://cybermax-web.vercel.app"]
@@ -36,6 +203,8 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "development-secret-key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Required as X-Admin-Token by the /admin endpoints; empty disables them
+    ADMIN_TOKEN: str = ""
 
     @validator("SECRET_KEY")
     def validate_secret_key(cls, v: str, values: dict) -> str:
@@ -1,31 +1,110 @@
 """app/core/database.py - Database configuration and session management"""
-from sqlalchemy import create_engine, MetaData, text
+from sqlalchemy import create_engine, event, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.engine import Engine, default
+from contextlib import contextmanager
+from typing import Callable, Dict, Generator, Iterator, List, Optional
 import logging
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.sharding import ShardRouter, create_sharded_sessionmaker
+from app.core.timeouts import guard_engine
+from app.core.tracing import trace_engine
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+
+_CACHE_RESULTS = {
+    default.CACHE_HIT: "hit",
+    default.CACHE_MISS: "miss",
+    default.CACHING_DISABLED: "disabled",
+    default.NO_CACHE_KEY: "no_key",
+    default.NO_DIALECT_SUPPORT: "unsupported",
+}
+
+compiled_cache_lookups = metrics.counter(
+    "sql_compiled_cache_total", "Statement executions by compiled-cache outcome", ("result",)
+)
+_instrumented_engines: List[Engine] = []
+
+
+def _record_cache_lookup(conn, cursor, statement, parameters, context, executemany) -> None:
+    result = _CACHE_RESULTS.get(getattr(context, "cache_hit", None))
+    if result is not None:
+        compiled_cache_lookups.inc(result=result)
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Count compiled-cache hits and misses for statements run on ``engine``
+    and record them as spans of the current trace
+    """
+    if engine not in _instrumented_engines:
+        event.listen(engine, "before_cursor_execute", _record_cache_lookup)
+        trace_engine(engine)
+        _instrumented_engines.append(engine)
+    return engine
+
+
+def _compiled_cache_stats() -> Dict:
+    hits = compiled_cache_lookups.value(result="hit")
+    misses = compiled_cache_lookups.value(result="miss")
+    entries = sum(len(engine._compiled_cache or ()) for engine in _instrumented_engines)
+    return {
+        ("entries",): entries,
+        ("hit_ratio",): hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+metrics.gauge(
+    "sql_compiled_cache", "Compiled statements cached and the hit ratio so far", ("stat",),
+    callback=_compiled_cache_stats,
+)
+
+
+def build_engine(database_url: str) -> Engine:
+    """Create an engine with the settings appropriate for its backend"""
+    if database_url.startswith("sqlite"):
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            echo=settings.DEBUG
+        )
+    else:
+        engine = create_engine(
+            database_url,
+            echo=settings.DEBUG,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    if settings.STATEMENT_TIMEOUT_ENABLED:
+        guard_engine(engine)
+    return instrument_engine(engine)
+
+
 # Database engine configuration
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        echo=settings.DEBUG
-    )
+engine = build_engine(settings.DATABASE_URL)
+
+# Sharded models are spread over SHARD_DATABASE_URLS; everything else stays
+# on the primary DATABASE_URL engine.
+shard_router: Optional[ShardRouter] = None
+shard_engines: Dict[str, Engine] = {}
+
+if settings.SHARD_DATABASE_URLS:
+    shard_router = ShardRouter(len(settings.SHARD_DATABASE_URLS))
+    shard_engines = {
+        shard_id: build_engine(url)
+        for shard_id, url in zip(shard_router.shard_ids, settings.SHARD_DATABASE_URLS)
+    }
+    SessionLocal = create_sharded_sessionmaker(shard_router, engine, shard_engines)
 else:
-    engine = create_engine(
-        settings.DATABASE_URL,
-        echo=settings.DEBUG,
-        pool_pre_ping=True,
-        pool_recycle=300,
-    )
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
 Base = declarative_base()
 metadata = MetaData()
 
@@ -43,10 +122,88 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+DEFER_COMMIT_KEY = "defer_commit"
+AFTER_COMMIT_KEY = "after_commit"
+
+
+def commits_deferred(db: Session) -> bool:
+    """Whether repository writes on ``db`` belong to an enclosing unit of work"""
+    return db.info.get(DEFER_COMMIT_KEY, False)
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """Run several repository writes as a single transaction.
+    
+    Inside the block repositories flush instead of committing and leave
+    rollbacks to the block, which commits once on exit (or rolls back on
+    error) and then runs the callbacks registered with :func:`after_commit`.
+    """
+    if commits_deferred(db):
+        yield db
+        return
+    
+    db.info[DEFER_COMMIT_KEY] = True
+    db.info[AFTER_COMMIT_KEY] = []
+    try:
+        yield db
+        db.commit()
+        callbacks = db.info[AFTER_COMMIT_KEY]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.info.pop(DEFER_COMMIT_KEY, None)
+        db.info.pop(AFTER_COMMIT_KEY, None)
+    
+    for callback in callbacks:
+        callback()
+
+
+@contextmanager
+def savepoint(db: Session) -> Iterator[Session]:
+    """Nested transaction inside a unit of work.
+    
+    On error its writes and the after-commit callbacks registered inside it
+    are discarded while the rest of the unit of work carries on.
+    """
+    callbacks = db.info[AFTER_COMMIT_KEY]
+    mark = len(callbacks)
+    nested = db.begin_nested()
+    try:
+        yield db
+    except Exception:
+        if nested.is_active:
+            nested.rollback()
+        del callbacks[mark:]
+        raise
+    else:
+        nested.commit()
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current write is durable"""
+    pending = db.info.get(AFTER_COMMIT_KEY)
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+def sharded_tables() -> List:
+    """Tables of models that declare a ``__shard_key__``"""
+    return [
+        mapper.local_table for mapper in Base.registry.mappers
+        if getattr(mapper.class_, "__shard_key__", None)
+    ]
+
+
 def create_tables() -> None:
     """Create all database tables"""
     try:
         Base.metadata.create_all(bind=engine)
+        for shard_engine in shard_engines.values():
+            Base.metadata.create_all(bind=shard_engine, tables=sharded_tables())
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
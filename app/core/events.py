@@ -0,0 +1,200 @@
+"""
+app/core/events.py - In-process broadcast of task change events
+"""
+import asyncio
+import itertools
+from abc import ABC, abstractmethod
+import json
+import logging
+from datetime import datetime, timezone
+from importlib import import_module
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class Event:
+    """A delivered event; wire encodings are built once and shared by all subscribers"""
+    __slots__ = ("id", "type", "message", "tenant_id", "_sse")
+
+    def __init__(self, id: int, type: str, message: str, tenant_id: Optional[str] = None):
+        self.id = id
+        self.type = type
+        self.message = message
+        self.tenant_id = tenant_id
+        self._sse: Optional[bytes] = None
+
+    @property
+    def sse(self) -> bytes:
+        if self._sse is None:
+            self._sse = f"id: {self.id}\nevent: {self.type}\ndata: {self.message}\n\n".encode("utf-8")
+        return self._sse
+
+
+HEARTBEAT = Event(0, "heartbeat", '{"type": "heartbeat"}')
+HEARTBEAT._sse = b": keepalive\n\n"
+_CLOSED = object()
+
+
+class Subscription:
+    """A subscriber's bounded queue of pending events, optionally of one tenant only"""
+    __slots__ = ("queue", "dropped", "tenant_id")
+
+    def __init__(self, maxsize: int, tenant_id: Optional[str] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = False
+        self.tenant_id = tenant_id
+
+    async def next_event(self) -> Optional[Event]:
+        """Wait for the next event; None once the subscription is closed"""
+        event = await self.queue.get()
+        return None if event is _CLOSED else event
+
+    def close(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+
+class PubSubBackend(ABC):
+    """Transport carrying events between workers.
+
+    ``publish`` may be called from any thread; the backend hands every message
+    (including this worker's own) to ``deliver`` on the event loop.
+    """
+
+    @abstractmethod
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, message: str) -> None:
+        ...
+
+    async def stop(self) -> None:
+        pass
+
+
+class LocalPubSub(PubSubBackend):
+    """Single-process stand-in that loops messages straight back to this worker"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._deliver: Optional[Callable[[str], None]] = None
+
+    async def start(self, deliver: Callable[[str], None]) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._deliver = deliver
+
+    def publish(self, message: str) -> None:
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._deliver, message)
+
+    async def stop(self) -> None:
+        self._loop = None
+        self._deliver = None
+
+
+def load_backend(spec: str) -> PubSubBackend:
+    """Build the backend named by ``spec``: ``local`` or ``package.module:ClassName``"""
+    if spec == "local":
+        return LocalPubSub()
+    module_name, _, class_name = spec.partition(":")
+    backend_class = getattr(import_module(module_name), class_name)
+    return backend_class()
+
+
+class EventHub:
+    """Broadcasts task events to SSE and WebSocket subscribers.
+
+    Each subscriber gets a bounded queue; one that falls a full queue behind is
+    dropped and its stream closed, so a slow client never holds back the rest.
+    Reconnecting clients catch up through the change feed.
+    """
+
+    def __init__(self, backend: PubSubBackend, queue_size: int = 100, heartbeat_seconds: float = 15.0):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribers: Set[Subscription] = set()
+        self.dropped_subscribers = 0
+        self._ids = itertools.count(1)
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+        self._running = True
+        if self.heartbeat_seconds > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        await self.backend.stop()
+        for subscription in list(self.subscribers):
+            subscription.close()
+        self.subscribers.clear()
+
+    def subscribe(self, tenant_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(self.queue_size, tenant_id)
+        self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+
+    def publish(
+        self, event_type: str, task_id: str, data: Optional[Dict[str, Any]] = None, tenant_id: Optional[str] = None
+    ) -> None:
+        """Publish an event; safe to call from request threads"""
+        if not self._running:
+            return
+        message = json.dumps({
+            "type": event_type,
+            "tenant_id": tenant_id,
+            "task_id": task_id,
+            "data": data,
+            "occurred_at": datetime.now(timezone.utc).isoformat(),
+        }, default=str)
+        try:
+            self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Failed to publish {event_type} event for task {task_id}: {e}")
+
+    def _deliver(self, message: str) -> None:
+        payload = json.loads(message)
+        self._broadcast(Event(next(self._ids), payload["type"], message, payload.get("tenant_id")))
+
+    def _broadcast(self, event: Event) -> None:
+        for subscription in list(self.subscribers):
+            if subscription.tenant_id is not None and subscription.tenant_id != event.tenant_id:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.subscribers.discard(subscription)
+                subscription.dropped = True
+                subscription.close()
+                self.dropped_subscribers += 1
+                logger.warning("Dropped slow event subscriber")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscription in list(self.subscribers):
+                if subscription.queue.empty():
+                    subscription.queue.put_nowait(HEARTBEAT)
+
+
+event_hub = EventHub(
+    load_backend(settings.EVENT_BACKEND),
+    queue_size=settings.EVENT_SUBSCRIBER_QUEUE_SIZE,
+    heartbeat_seconds=settings.EVENT_HEARTBEAT_SECONDS,
+)
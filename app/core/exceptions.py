@@ -38,3 +38,55 @@ class DatabaseError(TaskManagerException):
     
     def __init__(self, message: str = "Database operation failed"):
         super().__init__(message=message, error_code="DATABASE_ERROR")
+
+
+class JobNotFoundError(TaskManagerException):
+    """Exception raised when a background job is not found"""
+    
+    def __init__(self, message: str = "Job not found"):
+        super().__init__(message=message, error_code="JOB_NOT_FOUND")
+
+
+class JobForbiddenError(TaskManagerException):
+    """Exception raised when a job type may only be submitted by an admin"""
+    
+    def __init__(self, message: str = "Job type requires the admin token"):
+        super().__init__(message=message, error_code="JOB_FORBIDDEN")
+
+
+class IdempotencyKeyReusedError(TaskManagerException):
+    """Exception raised when an idempotency key is sent again with a different request"""
+    
+    def __init__(self, message: str = "Idempotency key was already used for a different request"):
+        super().__init__(message=message, error_code="IDEMPOTENCY_KEY_REUSED")
+
+
+class IdempotencyKeyInProgressError(TaskManagerException):
+    """Exception raised when the first request with an idempotency key has not finished"""
+    
+    def __init__(self, message: str = "A request with this idempotency key is still in progress"):
+        super().__init__(message=message, error_code="IDEMPOTENCY_KEY_IN_PROGRESS")
+
+
+class StatementTimeoutError(TaskManagerException):
+    """Exception raised when a database statement runs past its route's timeout"""
+    
+    def __init__(self, timeout: Optional[float] = None):
+        message = "Database statement timed out"
+        if timeout is not None:
+            message = f"{message} after {timeout:g}s"
+        super().__init__(message=message, error_code="STATEMENT_TIMEOUT")
+
+
+class RequestCancelledError(TaskManagerException):
+    """Exception raised when a request's client disconnected before it finished"""
+    
+    def __init__(self, message: str = "Client disconnected; request cancelled"):
+        super().__init__(message=message, error_code="REQUEST_CANCELLED")
+
+
+class BackupError(TaskManagerException):
+    """Exception raised when a database backup or restore fails"""
+    
+    def __init__(self, message: str = "Database backup failed"):
+        super().__init__(message=message, error_code="BACKUP_ERROR")
@@ -0,0 +1,131 @@
+"""
+app/core/group_commit.py - Coalesce concurrent writes into shared transactions
+"""
+import contextvars
+import functools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from app.core.database import savepoint, unit_of_work
+from app.core.exceptions import DatabaseError
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+_STOP = object()
+
+group_commit_batches = metrics.counter("group_commit_batches_total", "Transactions committed by the group committer")
+group_commit_writes = metrics.counter(
+    "group_commit_writes_total", "Writes applied by the group committer, by outcome", ("outcome",)
+)
+
+
+class GroupCommitter:
+    """Applies queued writes from many requests in one transaction.
+
+    A single writer thread takes the first queued write, keeps collecting
+    until ``max_batch`` writes are queued or ``max_delay`` seconds have
+    passed, then runs them in one unit of work with a savepoint each and
+    commits once. Each caller blocks until its own write is durable and gets
+    back its own result or exception; a failing write only rolls back its
+    savepoint.
+
+    Operations receive the writer's session and must return values that
+    stay usable after it commits (response schemas rather than ORM objects).
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], max_batch: int = 64, max_delay: float = 0.002):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Apply everything already queued, then stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, operation: Callable[[Session], T]) -> T:
+        """Queue ``operation`` for the next batch and wait for its result"""
+        if self._thread is None:
+            self.start()
+        future: Future = Future()
+        # Run in the caller's context so its trace spans follow the write
+        operation = functools.partial(contextvars.copy_context().run, operation)
+        self._queue.put((operation, future))
+        return future.result()
+
+    def _collect(self, first: Tuple[Callable, Future]) -> Tuple[List[Tuple[Callable, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch, stopping = self._collect(item)
+            self._apply(batch)
+        # Drain writes queued behind the stop marker
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                self._apply([item])
+
+    def _apply(self, batch: List[Tuple[Callable, Future]]) -> None:
+        applied: List[Tuple[Future, object]] = []
+        try:
+            with self.session_factory() as db, unit_of_work(db):
+                for operation, future in batch:
+                    try:
+                        with savepoint(db):
+                            applied.append((future, operation(db)))
+                    except Exception as e:
+                        group_commit_writes.inc(outcome="failed")
+                        future.set_exception(e)
+        except Exception as e:
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    group_commit_writes.inc(outcome="failed")
+                    future.set_exception(DatabaseError("Failed to commit write"))
+            return
+
+        group_commit_batches.inc()
+        group_commit_writes.inc(len(applied), outcome="committed")
+        for future, result in applied:
+            future.set_result(result)
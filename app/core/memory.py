@@ -0,0 +1,216 @@
+"""
+app/core/memory.py - Opt-in allocation tracking with tracemalloc
+"""
+import asyncio
+import hmac
+import logging
+import threading
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Frames of the diagnostics machinery itself are left out of reports
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class PeakMeasurement:
+    """Bytes allocated at the high-water mark of a block, above where it started"""
+
+    def __init__(self):
+        self.peak_bytes = 0
+
+
+@contextmanager
+def track_peak() -> Iterator[PeakMeasurement]:
+    """Measure the peak memory allocated inside the block.
+
+    Starts tracemalloc for the duration if it is not already tracing, and
+    resets the process-wide peak, so run it without concurrent work when
+    the number matters (tests and benchmarks).
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    measurement = PeakMeasurement()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        yield measurement
+        measurement.peak_bytes = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _format_stats(stats, limit: int) -> List[dict]:
+    sites = []
+    for stat in stats[:limit]:
+        site = {"site": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+        if isinstance(stat, tracemalloc.StatisticDiff):
+            site["size_diff_bytes"] = stat.size_diff
+            site["count_diff"] = stat.count_diff
+        if len(stat.traceback) > 1:
+            site["traceback"] = [str(frame) for frame in stat.traceback]
+        sites.append(site)
+    return sites
+
+
+class MemoryTracker:
+    """Per-route peak allocation of requests and tracemalloc snapshot reports.
+
+    A request's peak is measured against the allocations outstanding when
+    it started. tracemalloc keeps a single process-wide peak, which is only
+    reset when no other measured request is running; overlapping requests
+    therefore see each other's allocations, so read concurrent peaks as
+    upper bounds.
+    """
+
+    def __init__(self, frames: int = 10, max_diffs: int = 50):
+        self.frames = frames
+        self.max_diffs = max_diffs
+        self.routes: Dict[str, List[int]] = {}
+        self.diffs: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._started = False
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started = True
+
+    def stop(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def begin(self) -> int:
+        """Start measuring a request; returns its baseline"""
+        with self._lock:
+            if self._in_flight == 0:
+                tracemalloc.reset_peak()
+            self._in_flight += 1
+        return tracemalloc.get_traced_memory()[0]
+
+    def end(self, route: str, baseline: int) -> int:
+        """Finish measuring a request and record its peak under ``route``"""
+        peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+        with self._lock:
+            self._in_flight -= 1
+            stats = self.routes.setdefault(route, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += peak
+            stats[2] = max(stats[2], peak)
+        return peak
+
+    def route_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                route: {"requests": count, "mean_peak_bytes": total // count, "max_peak_bytes": largest}
+                for route, (count, total, largest) in sorted(self.routes.items())
+            }
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED)
+
+    def top(self, limit: int = 20, group_by: str = "lineno") -> List[dict]:
+        """Largest allocation sites currently alive"""
+        return _format_stats(self.snapshot().statistics(group_by), limit)
+
+    def record_diff(self, route: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot,
+                    limit: int = 20) -> None:
+        """Keep the allocation sites that grew most between two snapshots of a request"""
+        with self._lock:
+            self.diffs[route] = _format_stats(after.compare_to(before, "lineno"), limit)
+            self.diffs.move_to_end(route)
+            while len(self.diffs) > self.max_diffs:
+                self.diffs.popitem(last=False)
+
+
+class MemoryMiddleware:
+    """Measure the peak allocation of every request while tracemalloc runs.
+
+    The peak is reported in ``X-Memory-Peak-Bytes`` and aggregated per
+    route. A request sending ``X-Memory-Snapshot: <token>`` is also
+    bracketed by two snapshots whose difference is kept for its route.
+    """
+
+    def __init__(self, app: ASGIApp, tracker: MemoryTracker, token: str = ""):
+        self.app = app
+        self.tracker = tracker
+        self.token = token.encode("utf-8")
+
+    def _wants_snapshot(self, scope: Scope) -> bool:
+        if not self.token:
+            return False
+        for key, value in scope["headers"]:
+            if key == b"x-memory-snapshot":
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.tracker.tracing:
+            await self.app(scope, receive, send)
+            return
+
+        before = await asyncio.to_thread(self.tracker.snapshot) if self._wants_snapshot(scope) else None
+        baseline = self.tracker.begin()
+
+        async def send_with_peak(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Everything but streaming the body has happened by now
+                peak = max(tracemalloc.get_traced_memory()[1] - baseline, 0)
+                MutableHeaders(scope=message)["X-Memory-Peak-Bytes"] = str(peak)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_peak)
+        finally:
+            # Unmatched paths share one entry so stray URLs cannot grow the table
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            route = f"{scope['method']} {route}"
+            self.tracker.end(route, baseline)
+            if before is not None:
+                after = await asyncio.to_thread(self.tracker.snapshot)
+                self.tracker.record_diff(route, before, after)
+
+
+memory_tracker = MemoryTracker(frames=settings.MEMORY_TRACEMALLOC_FRAMES)
+
+metrics.gauge(
+    "memory_request_peak_bytes", "Peak bytes allocated per request, by route", ("route", "stat"),
+    callback=lambda: {
+        (route, stat): stats[f"{stat}_peak_bytes"]
+        for route, stats in memory_tracker.route_stats().items()
+        for stat in ("mean", "max")
+    },
+)
+
+
+def _traced_memory() -> Dict[tuple, int]:
+    if not tracemalloc.is_tracing():
+        return {}
+    current, peak = tracemalloc.get_traced_memory()
+    return {("current",): current, ("peak",): peak}
+
+
+metrics.gauge("tracemalloc_bytes", "Memory traced by tracemalloc", ("stat",), callback=_traced_memory)
@@ -0,0 +1,265 @@
+"""
+app/core/profiling.py - Opt-in per-request CPU profiling with a stack sampler
+"""
+import asyncio
+import contextvars
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Only stacks passing through this package are kept: an idle thread, or the
+# event loop waiting on I/O, never shows up in a profile.
+APP_ROOT = str(Path(__file__).resolve().parents[1])
+
+PROFILE_EXTENSION = ".folded"
+_PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+\.folded$")
+
+# Sampler of the request being profiled. Worker threads see it in the copy of
+# the request's context they run its sync calls in.
+_profiled: contextvars.ContextVar[Optional["StackSampler"]] = contextvars.ContextVar("profiled", default=None)
+
+profiles_captured = metrics.counter(
+    "profiles_captured_total", "Requests run under the profiler, by trigger", ("trigger",)
+)
+
+
+class StackSampler:
+    """Samples the Python stacks of every other thread every ``interval``
+    seconds and counts them as collapsed stacks (``outer;...;inner``).
+
+    Sync endpoints run on worker threads, so the sampler looks at all
+    threads instead of the one that started it; samples are kept only if
+    some frame belongs to ``root``. Given ``request``, the frame of the
+    coroutine serving one request, only that request's stacks are kept:
+    on the event loop those passing through ``request``, on worker threads
+    calls run in a context where the sampler is the profiled one. Other
+    requests served meanwhile stay out of the profile.
+    """
+
+    def __init__(self, interval: float = 0.002, root: str = APP_ROOT, request=None):
+        self.interval = interval
+        self.root = root
+        self.request = request
+        self.stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(self.root):
+                filename = os.path.relpath(filename, os.path.dirname(self.root))
+            else:
+                filename = os.path.basename(filename)
+            label = f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _runs_request(self, frame) -> bool:
+        if frame is self.request:
+            return True
+        # anyio's worker thread holds the context of the call it runs in a
+        # local named "context" (WorkerThread.run, anyio 4)
+        if "context" not in frame.f_code.co_varnames or frame.f_code.co_filename.startswith(self.root):
+            return False
+        context = frame.f_locals.get("context")
+        return isinstance(context, contextvars.Context) and context.get(_profiled) is self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                codes = []
+                in_root = False
+                ours = self.request is None
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    in_root = in_root or frame.f_code.co_filename.startswith(self.root)
+                    ours = ours or self._runs_request(frame)
+                    frame = frame.f_back
+                if in_root and ours:
+                    self.stacks[";".join(self._label(code) for code in reversed(codes))] += 1
+
+
+class ProfileStore:
+    """Collapsed-stack profiles in a local directory, newest ``max_profiles`` kept"""
+
+    def __init__(self, directory: str, max_profiles: int = 100):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    def new_name(self, method: str, path: str) -> str:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_")[:60] or "root"
+        return f"{stamp}-{uuid.uuid4().hex[:8]}-{method}-{slug}{PROFILE_EXTENSION}"
+
+    def save(self, name: str, stacks: Counter) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {count}\n" for stack, count in stacks.most_common()]
+        (self.directory / name).write_text("".join(lines), encoding="utf-8")
+        self._prune()
+
+    def _files(self) -> List[Path]:
+        if not self.directory.is_dir():
+            return []
+        files = [path for path in self.directory.iterdir() if _PROFILE_NAME.match(path.name)]
+        return sorted(files, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        for path in self._files()[self.max_profiles:]:
+            path.unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        """Stored profiles, newest first"""
+        profiles = []
+        for path in self._files():
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+            })
+        return profiles
+
+    def load(self, name: str) -> Optional[str]:
+        """Collapsed stacks of profile ``name``, or None if there is no such profile"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path.read_text(encoding="utf-8") if path.is_file() else None
+
+
+def to_speedscope(name: str, collapsed: str) -> dict:
+    """Convert collapsed stacks to a speedscope "sampled" profile (weights are sample counts)"""
+    frames: List[dict] = []
+    index: Dict[str, int] = {}
+    samples: List[List[int]] = []
+    weights: List[int] = []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack:
+            continue
+        sample = []
+        for frame in stack.split(";"):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(int(count))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": settings.APP_NAME,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "none",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class ProfilingMiddleware:
+    """Profile requests that send ``X-Profile: <token>`` or win the sample draw.
+
+    One request is profiled at a time; others run normally meanwhile and
+    are left out of its profile. The response of a profiled request names
+    its profile in ``X-Profile-Id``. Only install the middleware when
+    profiling is enabled, so disabled profiling costs nothing per request.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval: float = 0.002,
+    ):
+        self.app = app
+        self.store = store
+        self.token = token.encode("utf-8")
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._active = False
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self.token:
+            for key, value in scope["headers"]:
+                if key == b"x-profile" and hmac.compare_digest(value, self.token):
+                    return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        name = self.store.new_name(scope["method"], scope["path"])
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = name
+            await send(message)
+
+        sampler = StackSampler(self.interval, request=sys._getframe())
+        token = _profiled.set(sampler)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _profiled.reset(token)
+            stacks = await asyncio.to_thread(sampler.stop)
+            self._active = False
+            profiles_captured.inc(trigger=trigger)
+            try:
+                await asyncio.to_thread(self.store.save, name, stacks)
+            except OSError as e:
+                logger.error(f"Could not save profile {name}: {e}")
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
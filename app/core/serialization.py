@@ -0,0 +1,251 @@
+"""
+app/core/serialization.py - Response content negotiation (JSON, MessagePack, CBOR)
+"""
+import io
+import weakref
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import pydantic_core
+from pydantic import BaseModel, TypeAdapter
+from fastapi import HTTPException, Request, Response, status
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency
+    cbor2 = None
+
+T = TypeVar("T")
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+_MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def parse_accept(header: str) -> List[Tuple[str, float]]:
+    """Parse an Accept-style header into ``(value, q)`` pairs, best first"""
+    entries = []
+    for position, part in enumerate(header.split(",")):
+        value, *params = [piece.strip() for piece in part.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, raw = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(raw)
+                except ValueError:
+                    quality = 0.0
+        entries.append((value.lower(), quality, position))
+    entries.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(value, quality) for value, quality, _ in entries]
+
+
+class _Writer(ABC):
+    """Minimal streaming interface shared by the binary encoders"""
+
+    @abstractmethod
+    def map_header(self, size: int) -> None:
+        ...
+
+    @abstractmethod
+    def array_header(self, size: int) -> None:
+        ...
+
+    @abstractmethod
+    def scalar(self, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    def getvalue(self) -> bytes:
+        ...
+
+
+class _MsgpackWriter(_Writer):
+    def __init__(self):
+        self.packer = msgpack.Packer(autoreset=False)
+
+    def map_header(self, size: int) -> None:
+        self.packer.pack_map_header(size)
+
+    def array_header(self, size: int) -> None:
+        self.packer.pack_array_header(size)
+
+    def scalar(self, value: Any) -> None:
+        self.packer.pack(value)
+
+    def getvalue(self) -> bytes:
+        return self.packer.bytes()
+
+
+class _CborWriter(_Writer):
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.encoder = cbor2.CBOREncoder(self.buffer)
+
+    def map_header(self, size: int) -> None:
+        self.encoder.encode_length(5, size)
+
+    def array_header(self, size: int) -> None:
+        self.encoder.encode_length(4, size)
+
+    def scalar(self, value: Any) -> None:
+        self.encoder.encode(value)
+
+    def getvalue(self) -> bytes:
+        return self.buffer.getvalue()
+
+
+def _write(writer: _Writer, value: Any) -> None:
+    """Stream ``value`` into ``writer`` straight from model attributes.
+
+    Unlike ``model_dump`` this never builds an intermediate dict per row;
+    datetimes are written as ISO 8601 strings to match the JSON output.
+    """
+    if isinstance(value, BaseModel):
+        fields = type(value).model_fields
+        writer.map_header(len(fields))
+        for name in fields:
+            writer.scalar(name)
+            _write(writer, getattr(value, name))
+    elif isinstance(value, (list, tuple)):
+        writer.array_header(len(value))
+        for item in value:
+            _write(writer, item)
+    elif isinstance(value, dict):
+        writer.map_header(len(value))
+        for key, item in value.items():
+            writer.scalar(key)
+            _write(writer, item)
+    elif isinstance(value, (datetime, date)):
+        writer.scalar(value.isoformat())
+    else:
+        writer.scalar(value)
+
+
+def encode_json(content: Any) -> bytes:
+    return pydantic_core.to_json(content)
+
+
+def encode_msgpack(content: Any) -> bytes:
+    writer = _MsgpackWriter()
+    _write(writer, content)
+    return writer.getvalue()
+
+
+def encode_cbor(content: Any) -> bytes:
+    writer = _CborWriter()
+    _write(writer, content)
+    return writer.getvalue()
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {JSON: encode_json}
+if msgpack is not None:
+    ENCODERS[MSGPACK] = encode_msgpack
+if cbor2 is not None:
+    ENCODERS[CBOR] = encode_cbor
+
+
+def negotiate_media_type(accept: Optional[str]) -> Optional[str]:
+    """Pick the response media type for an Accept header; None if nothing fits"""
+    if not accept:
+        return JSON
+    for value, quality in parse_accept(accept):
+        if quality <= 0:
+            continue
+        if value in ("*/*", "application/*"):
+            return JSON
+        value = _MEDIA_TYPE_ALIASES.get(value, value)
+        if value in ENCODERS:
+            return value
+    return None
+
+
+@lru_cache(maxsize=None)
+def _response_adapter(response_model: Any) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _response_model(request: Request) -> Any:
+    return getattr(request.scope.get("route"), "response_model", None)
+
+
+def validate_response(request: Request, content: Any) -> Any:
+    """Check ``content`` against the route's ``response_model``, as FastAPI
+    does for returned values but not for a returned ``Response``.
+
+    Instances of the model pass through as they are; anything else is
+    validated (reading attributes of ORM objects) and reduced to the
+    model's fields.
+    """
+    response_model = _response_model(request)
+    if response_model is None:
+        return content
+    return _response_adapter(response_model).validate_python(content, from_attributes=True)
+
+
+class _SharedList(list):
+    __slots__ = ("__weakref__",)
+
+
+# Encoded bodies of shared results, by id, kept as long as the result lives
+_shared_encodings: Dict[int, Dict[Tuple[str, Any], bytes]] = {}
+
+
+def share_encodings(content: T) -> T:
+    """Mark ``content`` as a result several requests respond with, so that
+    :func:`negotiated_response` encodes it once per media type and response
+    model instead of once per request.
+
+    Lists come back as a list subclass that can be weakly referenced; the
+    memoized encodings go when the result does. Results that cannot be
+    weakly referenced are returned as they are and encoded per request.
+    """
+    if type(content) is list:
+        content = _SharedList(content)
+    try:
+        weakref.finalize(content, _shared_encodings.pop, id(content), None)
+    except TypeError:
+        return content
+    _shared_encodings[id(content)] = {}
+    return content
+
+
+def _encode(request: Request, content: Any, media_type: str) -> bytes:
+    encodings = _shared_encodings.get(id(content))
+    if encodings is None:
+        return ENCODERS[media_type](validate_response(request, content))
+    key = (media_type, _response_model(request))
+    body = encodings.get(key)
+    if body is None:
+        body = encodings[key] = ENCODERS[media_type](validate_response(request, content))
+    return body
+
+
+def negotiated_response(request: Request, content: Any, status_code: int = status.HTTP_200_OK) -> Response:
+    """Encode ``content``, checked against the route's response model, in the format the client asked for"""
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    if media_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"Supported media types: {', '.join(ENCODERS)}"
+        )
+    return Response(
+        content=_encode(request, content, media_type),
+        status_code=status_code,
+        media_type=media_type,
+        headers={"Vary": "Accept"},
+    )
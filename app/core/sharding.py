@@ -0,0 +1,135 @@
+"""
+app/core/sharding.py - Hash-based horizontal sharding of task storage
+"""
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.sql import operators
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Mapper, ORMExecuteState, sessionmaker
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnElement
+
+PRIMARY_SHARD = "primary"
+
+
+def shard_index(key: Any, shard_count: int) -> int:
+    """Map a shard key onto one of ``shard_count`` shards.
+
+    CRC32 is stable across processes and Python versions, unlike ``hash()``.
+    """
+    return zlib.crc32(str(key).encode("utf-8")) % shard_count
+
+
+def shard_key_attribute(mapper: Mapper) -> Optional[str]:
+    """Return the attribute a model is sharded by, or None for unsharded models"""
+    return getattr(mapper.class_, "__shard_key__", None)
+
+
+class ShardRouter:
+    """Routes ORM statements and flushes to shards.
+
+    Models declaring ``__shard_key__`` are spread over the numbered shards by
+    the hash of that attribute; every other model lives on the primary
+    database.
+    """
+
+    def __init__(self, shard_count: int):
+        if shard_count < 1:
+            raise ValueError("At least one shard is required")
+        self.shard_ids: List[str] = [str(i) for i in range(shard_count)]
+
+    def shard_for_key(self, key: Any) -> str:
+        return self.shard_ids[shard_index(key, len(self.shard_ids))]
+
+    def shard_chooser(self, mapper: Mapper, instance: Any, clause: Any = None, **kw: Any) -> str:
+        key_attr = shard_key_attribute(mapper)
+        if key_attr is None:
+            return PRIMARY_SHARD
+        if instance is None:
+            return self.shard_ids[0]
+
+        key = getattr(instance, key_attr)
+        if key is None:
+            # Column defaults normally fire during INSERT, which is too late
+            # to pick a shard, so generate the key up front.
+            default = mapper.columns[key_attr].default
+            if default is None or not callable(default.arg):
+                raise ValueError(f"Cannot choose a shard for {mapper.class_.__name__} without '{key_attr}'")
+            key = default.arg(None)
+            setattr(instance, key_attr, key)
+        return self.shard_for_key(key)
+
+    def identity_chooser(self, mapper: Mapper, primary_key: Any, **kw: Any) -> List[str]:
+        key_attr = shard_key_attribute(mapper)
+        if key_attr is None:
+            return [PRIMARY_SHARD]
+        pk_attrs = [mapper.get_property_by_column(col).key for col in mapper.primary_key]
+        if key_attr in pk_attrs:
+            return [self.shard_for_key(primary_key[pk_attrs.index(key_attr)])]
+        return list(self.shard_ids)
+
+    def execute_chooser(self, orm_context: ORMExecuteState) -> List[str]:
+        mapper = orm_context.bind_mapper
+        key_attr = shard_key_attribute(mapper) if mapper is not None else None
+        if key_attr is None:
+            return [PRIMARY_SHARD]
+
+        keys = _criteria_keys(orm_context.statement, mapper.columns[key_attr], orm_context.parameters)
+        if keys is None:
+            return list(self.shard_ids)
+        return sorted({self.shard_for_key(key) for key in keys})
+
+
+def _criteria_keys(statement: Any, column: ColumnElement, parameters: Any = None) -> Optional[Set[Any]]:
+    """Extract shard key values from top-level ``==`` / ``IN`` criteria.
+
+    Only conjuncts are considered so an ``OR`` never narrows the shard set.
+    Returns None when the statement may touch any shard.
+    """
+    if not isinstance(parameters, dict):
+        # executemany parameter lists are never used for sharded reads
+        parameters = {}
+    whereclause = getattr(statement, "whereclause", None)
+    if whereclause is None:
+        return None
+
+    if isinstance(whereclause, BooleanClauseList) and whereclause.operator is operators.and_:
+        conjuncts: Iterable[Any] = whereclause.clauses
+    else:
+        conjuncts = [whereclause]
+
+    for clause in conjuncts:
+        if not isinstance(clause, BinaryExpression) or not isinstance(clause.right, BindParameter):
+            continue
+        left = clause.left
+        if getattr(left, "key", None) != column.key or getattr(left, "table", None) is None:
+            continue
+        if left.table.name != column.table.name:
+            continue
+
+        bind = clause.right
+        value = parameters.get(bind.key, bind.effective_value)
+        if value is None:
+            continue
+        if clause.operator is operators.eq:
+            return {value}
+        if clause.operator is operators.in_op:
+            return set(value)
+    return None
+
+
+def create_sharded_sessionmaker(router: ShardRouter, primary: Engine, shards: Dict[str, Engine]) -> sessionmaker:
+    """Build a session factory spreading sharded models over ``shards``"""
+    binds = {PRIMARY_SHARD: primary}
+    binds.update({shard_id: shards[shard_id] for shard_id in router.shard_ids})
+
+    return sessionmaker(
+        class_=ShardedSession,
+        autocommit=False,
+        autoflush=False,
+        shards=binds,
+        shard_chooser=router.shard_chooser,
+        identity_chooser=router.identity_chooser,
+        execute_chooser=router.execute_chooser,
+    )
@@ -0,0 +1,119 @@
+"""
+app/core/single_flight.py - Share one execution among concurrent identical calls
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type, TypeVar
+
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+single_flight_calls = metrics.counter(
+    "single_flight_calls_total",
+    "Coalescable reads by outcome: executed, coalesced onto an in-flight call, or served from the micro-cache",
+    ("method", "outcome"),
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "shared")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Cleared when a write makes the result stale before it is ready
+        self.shared = True
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Callers arriving while a call with the same key is running wait for it
+    and get its result (or exception) instead of running it again. With a
+    ``ttl`` the result is also kept that many seconds for later callers, for
+    up to ``max_entries`` keys. Keys are ``(scope, method, ...)`` tuples;
+    :meth:`invalidate` drops everything cached or in flight for a scope, so
+    callers after a write never join a call that started before it.
+
+    A waiter whose leader failed with one of ``retry_on`` (errors that are
+    about the leader's request rather than the call, such as its client
+    disconnecting) runs the call itself.
+    """
+
+    def __init__(
+        self, ttl: float = 0.0, retry_on: Tuple[Type[BaseException], ...] = (), max_entries: int = 1024
+    ):
+        self.ttl = ttl
+        self.retry_on = retry_on
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._cache: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def do(self, key: Tuple[Hashable, ...], func: Callable[[], T]) -> T:
+        method = key[1]
+        while True:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    if cached[0] > time.monotonic():
+                        single_flight_calls.inc(method=method, outcome="cached")
+                        return cached[1]
+                    del self._cache[key]
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                single_flight_calls.inc(method=method, outcome="executed")
+                return self._lead(key, call, func)
+
+            call.done.wait()
+            if call.error is None:
+                single_flight_calls.inc(method=method, outcome="coalesced")
+                return call.result
+            if not isinstance(call.error, self.retry_on):
+                single_flight_calls.inc(method=method, outcome="coalesced")
+                raise call.error
+
+    def _lead(self, key: Tuple[Hashable, ...], call: _Call, func: Callable[[], T]) -> T:
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                if call.error is None and call.shared and self.ttl > 0:
+                    self._store(key, call.result)
+            call.done.set()
+
+    def _store(self, key: Tuple[Hashable, ...], result: Any) -> None:
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            for stale in [stale for stale, (expires, _) in self._cache.items() if expires <= now]:
+                del self._cache[stale]
+            if len(self._cache) >= self.max_entries:
+                return
+        self._cache[key] = (now + self.ttl, result)
+
+    def invalidate(self, scope: Hashable) -> None:
+        """Forget cached and in-flight calls whose key starts with ``scope``"""
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == scope]:
+                del self._cache[key]
+            for key in [key for key in self._calls if key[0] == scope]:
+                self._calls.pop(key).shared = False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            for call in self._calls.values():
+                call.shared = False
+            self._calls.clear()
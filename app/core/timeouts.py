@@ -0,0 +1,240 @@
+"""
+app/core/timeouts.py - Per-route statement timeouts and cancellation on client disconnect
+"""
+import asyncio
+import contextvars
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.admission import classify
+from app.core.exceptions import RequestCancelledError, StatementTimeoutError
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# SQLite calls the progress handler every this many virtual machine instructions
+SQLITE_PROGRESS_STEPS = 1000
+# SQLSTATE of a Postgres statement stopped by statement_timeout or a cancel request
+PG_QUERY_CANCELED = "57014"
+
+# Statement timeout (ms) last set on a Postgres connection, kept in its pool record
+_PG_TIMEOUT_KEY = "statement_timeout_ms"
+# Budget whose progress handler is installed on a SQLite connection
+_SQLITE_BUDGET_KEY = "statement_budget"
+
+_DISCONNECT: Message = {"type": "http.disconnect"}
+
+statement_timeouts = metrics.counter(
+    "statement_timeouts_total", "Statements stopped for exceeding their route's timeout", ("route_class",)
+)
+cancelled_requests = metrics.counter(
+    "cancelled_requests_total", "Requests whose client disconnected before the response", ("route_class",)
+)
+
+
+class StatementBudget:
+    """How long each statement of one request may run, and whether the
+    request has been abandoned by its client.
+
+    The budget lives in a context variable, so the endpoint's worker thread
+    sees :meth:`cancel` called from the event loop.
+    """
+
+    def __init__(self, timeout: Optional[float], route_class: str = "none"):
+        self.timeout = timeout
+        self.route_class = route_class
+        self.cancelled = False
+        self.deadline: Optional[float] = None
+        self._lock = threading.Lock()
+        self._connection: Any = None
+
+    def start_statement(self, dbapi_connection: Any) -> None:
+        if self.cancelled:
+            raise RequestCancelledError()
+        with self._lock:
+            self._connection = dbapi_connection
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+
+    def release(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            if self._connection is dbapi_connection:
+                self._connection = None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def interrupted(self) -> bool:
+        return self.cancelled or self.expired()
+
+    def cancel(self) -> None:
+        """Stop the running statement and refuse any further ones"""
+        self.cancelled = True
+        with self._lock:
+            connection = self._connection
+            # SQLite checks the flag in its progress handler; Postgres needs a
+            # cancel request sent on another socket.
+            if connection is not None and hasattr(connection, "cancel"):
+                try:
+                    connection.cancel()
+                except Exception as e:
+                    logger.warning(f"Failed to cancel running statement: {e}")
+
+
+_statement_budget: contextvars.ContextVar[Optional[StatementBudget]] = contextvars.ContextVar(
+    "statement_budget", default=None
+)
+
+
+@contextmanager
+def statement_budget(timeout: Optional[float], route_class: str = "none") -> Iterator[StatementBudget]:
+    """Run the block's statements under ``timeout`` seconds each"""
+    budget = StatementBudget(timeout, route_class)
+    token = _statement_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _statement_budget.reset(token)
+
+
+def _set_pg_timeout(cursor, connection_info: Dict, timeout_ms: int) -> None:
+    if connection_info.get(_PG_TIMEOUT_KEY, 0) != timeout_ms:
+        cursor.execute(f"SET statement_timeout = {int(timeout_ms)}")
+        connection_info[_PG_TIMEOUT_KEY] = timeout_ms
+
+
+def _set_sqlite_handler(dbapi_connection, connection_info: Dict, budget: Optional[StatementBudget]) -> None:
+    if connection_info.get(_SQLITE_BUDGET_KEY) is budget:
+        return
+    if budget is None:
+        dbapi_connection.set_progress_handler(None, 0)
+    else:
+        # A non-zero return makes SQLite abort the statement with "interrupted"
+        dbapi_connection.set_progress_handler(budget.interrupted, SQLITE_PROGRESS_STEPS)
+    connection_info[_SQLITE_BUDGET_KEY] = budget
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    budget = _statement_budget.get()
+    dbapi_connection = conn.connection.dbapi_connection
+    if budget is not None:
+        budget.start_statement(dbapi_connection)
+    if conn.dialect.name == "sqlite":
+        # Rows are stepped out of SQLite while fetching, after this statement
+        # "executed", so the handler stays installed until the next one.
+        _set_sqlite_handler(dbapi_connection, conn.info, budget)
+    elif conn.dialect.name == "postgresql":
+        timeout = budget.timeout if budget is not None else None
+        _set_pg_timeout(cursor, conn.info, int(timeout * 1000) if timeout else 0)
+
+
+def _is_interruption(error: BaseException) -> bool:
+    if isinstance(error, sqlite3.OperationalError):
+        return str(error) == "interrupted"
+    return (getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)) == PG_QUERY_CANCELED
+
+
+def _handle_error(exception_context) -> Optional[Exception]:
+    budget = _statement_budget.get()
+    if budget is None or exception_context.is_pre_ping:
+        return None
+    if not _is_interruption(exception_context.original_exception):
+        return None
+    if budget.cancelled:
+        return RequestCancelledError()
+    statement_timeouts.inc(route_class=budget.route_class)
+    logger.warning(f"Statement exceeded the {budget.timeout}s {budget.route_class} timeout")
+    return StatementTimeoutError(budget.timeout)
+
+
+def _rollback(conn) -> None:
+    # A SET inside a rolled back transaction is undone with it
+    conn.info.pop(_PG_TIMEOUT_KEY, None)
+
+
+def _checkin(dbapi_connection, connection_record) -> None:
+    if connection_record.info.get(_SQLITE_BUDGET_KEY) is not None:
+        if dbapi_connection is not None:
+            dbapi_connection.set_progress_handler(None, 0)
+        connection_record.info[_SQLITE_BUDGET_KEY] = None
+    budget = _statement_budget.get()
+    if budget is not None:
+        budget.release(dbapi_connection)
+
+
+def _reset(dbapi_connection, connection_record, reset_state) -> None:
+    connection_record.info.pop(_PG_TIMEOUT_KEY, None)
+
+
+def guard_engine(engine: Engine) -> Engine:
+    """Enforce the current :class:`StatementBudget` on statements run on ``engine``"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error, retval=True)
+    event.listen(engine, "rollback", _rollback)
+    event.listen(engine.pool, "checkin", _checkin)
+    event.listen(engine.pool, "reset", _reset)
+    return engine
+
+
+class StatementTimeoutMiddleware:
+    """Give each admission-controlled request the statement timeout of its
+    route class, and cancel it when the client disconnects before the
+    response is complete.
+    """
+
+    def __init__(self, app: ASGIApp, timeouts: Dict[str, float]):
+        self.app = app
+        self.timeouts = timeouts
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"], scope.get("query_string", b""))
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        response_complete = False
+        disconnected = False
+
+        with statement_budget(self.timeouts.get(route_class) or None, route_class) as budget:
+
+            async def watch_disconnect() -> None:
+                nonlocal disconnected
+                while not disconnected:
+                    message = await receive()
+                    if message["type"] == "http.disconnect":
+                        disconnected = True
+                        if not response_complete:
+                            cancelled_requests.inc(route_class=route_class)
+                            logger.info(f"Client left {scope['method']} {scope['path']}; cancelling it")
+                            budget.cancel()
+                    messages.put_nowait(message)
+
+            async def receive_message() -> Message:
+                if disconnected and messages.empty():
+                    return _DISCONNECT
+                return await messages.get()
+
+            async def send_message(message: Message) -> None:
+                nonlocal response_complete
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    response_complete = True
+                await send(message)
+
+            watcher = asyncio.create_task(watch_disconnect())
+            try:
+                await self.app(scope, receive_message, send_message)
+            finally:
+                watcher.cancel()
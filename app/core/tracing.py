@@ -0,0 +1,370 @@
+"""
+app/core/tracing.py - Lightweight request tracing with OTLP JSON export
+"""
+import collections
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+# Longest SQL statement text kept on a span
+MAX_STATEMENT_LENGTH = 2048
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List["Span"] = []
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace", "span_id", "parent_span_id", "name", "kind", "attributes",
+                 "start_ns", "end_ns", "status", "status_message")
+
+    def __init__(self, trace: _Trace, name: str, kind: int, parent_span_id: str = "",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status: Optional[int] = None
+        self.status_message = ""
+        trace.spans.append(self)
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def child(self, name: str, kind: int = KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> "Span":
+        return Span(self.trace, name, kind, self.span_id, attributes)
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = str(error)
+        self.attributes["exception.type"] = type(error).__name__
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """``(trace_id, parent_span_id, sampled)`` from a W3C traceparent header, or None if invalid"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, bool(int(flags, 16) & 1)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Spans as an OTLP/JSON ``ExportTraceServiceRequest``"""
+    encoded = []
+    for span in spans:
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": _otlp_attributes(span.attributes),
+        }
+        if span.parent_span_id:
+            record["parentSpanId"] = span.parent_span_id
+        if span.status is not None:
+            record["status"] = {"code": span.status, "message": span.status_message}
+        encoded.append(record)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": encoded}],
+    }]}
+
+
+class InMemorySpanExporter:
+    """Keeps the spans of the last ``max_traces`` traces"""
+
+    def __init__(self, max_traces: int = 1000):
+        self._traces: Deque[List[Span]] = collections.deque(maxlen=max_traces)
+
+    def export(self, spans: List[Span]) -> None:
+        self._traces.append(spans)
+
+    def traces(self) -> List[List[Span]]:
+        return list(self._traces)
+
+    def clear(self) -> None:
+        self._traces.clear()
+
+
+class FileSpanExporter:
+    """Appends each trace to ``path`` as one line of OTLP/JSON"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp(spans, self.service_name), separators=(",", ":"))
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+class Tracer:
+    """Creates spans under the current request's trace.
+
+    Spans are only recorded inside a trace started by :meth:`start_trace`
+    (normally by :class:`TracingMiddleware`); elsewhere :meth:`span` and
+    :meth:`start_span` do nothing, so instrumented code costs one context
+    variable lookup when tracing is off.
+    """
+
+    def __init__(self, exporter, service_name: str, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.service_name = service_name
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Root span continuing ``traceparent`` if given, or None when the trace is not sampled"""
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_span_id, sampled = parent
+        else:
+            trace_id, parent_span_id = os.urandom(16).hex(), ""
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        return Span(_Trace(trace_id), name, KIND_SERVER, parent_span_id, attributes)
+
+    def finish_trace(self, root: Span) -> None:
+        root.end()
+        try:
+            self.exporter.export(list(root.trace.spans))
+        except Exception as e:
+            logger.error(f"Failed to export trace {root.trace_id}: {e}")
+
+    def start_span(self, name: str, kind: int = KIND_INTERNAL,
+                   attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Child of the current span that the caller ends; it does not become current"""
+        parent = _current_span.get()
+        return parent.child(name, kind, attributes) if parent is not None else None
+
+    @contextmanager
+    def span(self, name: str, kind: int = KIND_INTERNAL,
+             attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+        """Run the block in a child span of the current span"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        child = parent.child(name, kind, attributes)
+        token = _current_span.set(child)
+        try:
+            yield child
+        except BaseException as e:
+            child.set_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            child.end()
+
+    @contextmanager
+    def activate(self, span: Span) -> Iterator[Span]:
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE, settings.APP_NAME)
+    return InMemorySpanExporter(settings.TRACING_MEMORY_TRACES)
+
+
+tracer = Tracer(_build_exporter(), settings.APP_NAME, settings.TRACING_SAMPLE_RATE)
+
+
+def traced(func: Callable) -> Callable:
+    """Record each call of ``func`` as a span named after its qualified name"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return func(*args, **kwargs)
+        with tracer.span(name, attributes={"code.function": name}):
+            return func(*args, **kwargs)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+def trace_methods(cls: type) -> type:
+    """Class decorator applying :func:`traced` to every public method, inherited ones included"""
+    for name in dir(cls):
+        if name.startswith("_"):
+            continue
+        value = inspect.getattr_static(cls, name)
+        if inspect.isfunction(value) and not getattr(value, "__traced__", False):
+            setattr(cls, name, traced(value))
+    return cls
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current_span.get() is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    context._trace_span = tracer.start_span(operation, KIND_CLIENT, {
+        "db.system": conn.dialect.name,
+        "db.name": os.path.basename(conn.engine.url.database or ""),
+        "db.operation": operation,
+        "db.statement": statement[:MAX_STATEMENT_LENGTH],
+        "db.executemany": bool(executemany),
+    })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.attributes["db.rows_affected"] = cursor.rowcount
+        span.end()
+
+
+def _handle_error(exception_context) -> None:
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.set_error(exception_context.original_exception)
+        span.end()
+
+
+def trace_engine(engine) -> None:
+    """Record every statement run on ``engine`` inside a trace as a client span"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class TracingMiddleware:
+    """Start a root span per HTTP request, continuing an incoming W3C
+    ``traceparent``, and answer with a ``traceresponse`` header naming it.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = self.tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent, {
+            "http.request.method": scope["method"],
+            "url.path": scope["path"],
+        })
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["http.response.status_code"] = message["status"]
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+                MutableHeaders(scope=message)["traceresponse"] = root.traceparent
+            await send(message)
+
+        try:
+            with self.tracer.activate(root):
+                await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            root.set_error(e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                root.attributes["http.route"] = route.path
+                root.name = f"{scope['method']} {route.path}"
+            self.tracer.finish_trace(root)
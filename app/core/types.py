@@ -0,0 +1,43 @@
+"""
+app/core/types.py - Custom SQLAlchemy column types
+"""
+import uuid
+from typing import Any, Optional
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# Never generated, so malformed ids bind to it and simply match nothing
+NIL_UUID = uuid.UUID(int=0)
+
+
+class CompactUUID(TypeDecorator):
+    """UUID column stored in 16 bytes, exposed to Python as the canonical string.
+    
+    PostgreSQL gets its native ``uuid`` type; other backends store the raw
+    bytes in a binary column instead of a 36-character string.
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+    
+    def process_bind_param(self, value: Any, dialect) -> Any:
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            try:
+                value = uuid.UUID(str(value))
+            except ValueError:
+                value = NIL_UUID
+        return value if dialect.name == "postgresql" else value.bytes
+    
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=bytes(value)))
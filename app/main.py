@@ -1,18 +1,34 @@
 """
 app/main.py - Main FastAPI application
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
+import anyio
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app.core.config import get_settings
 from app.core.database import create_tables, db_manager
-from app.core.exceptions import TaskManagerException
+from app.core.exceptions import RequestCancelledError, StatementTimeoutError, TaskManagerException
+from app.core.events import event_hub
+from app.core.compression import CompressionMiddleware
+from app.core.admission import AdmissionMiddleware, admission_controller
+from app.core.timeouts import StatementTimeoutMiddleware
+from app.core.profiling import ProfilingMiddleware, profile_store
+from app.core.tracing import TracingMiddleware, tracer
+from app.core.memory import MemoryMiddleware, memory_tracker
+from app.core.metrics import metrics
+from app.core.serialization import negotiated_response
 from app.api.v1.router import api_router
+from app.services.task import task_service
+from app.services.archive import task_archiver
+from app.services.backup import database_backup
+from app.services.jobs import job_runner
 from app.utils.logger import setup_logging
 
 settings = get_settings()
@@ -24,6 +40,8 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("Starting Task Manager API...")
+    # Sync endpoints run on this threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
     
     try:
         create_tables()
@@ -36,9 +54,74 @@ async def lifespan(app: FastAPI):
         logger.error("Database health check failed")
         raise Exception("Database is not accessible")
     
+    snapshots = task_service.backend.snapshots
+    if snapshots is not None:
+        try:
+            snapshots.load_snapshot()
+        except (OSError, ValueError) as e:
+            # Starting empty would overwrite the snapshot on shutdown
+            logger.error(f"Failed to load task snapshot {snapshots.snapshot_path}: {e}")
+            raise
+    
+    try:
+        with db_manager.get_session() as db:
+            task_service.backfill_change_feed(db)
+    except TaskManagerException as e:
+        logger.warning(f"Change feed backfill skipped: {e.message}")
+    
+    try:
+        with db_manager.get_session() as db:
+            task_service.backfill_analytics(db)
+    except TaskManagerException as e:
+        logger.warning(f"Analytics backfill skipped: {e.message}")
+    
+    try:
+        with db_manager.get_session() as db:
+            task_service.backfill_task_counts(db)
+    except TaskManagerException as e:
+        logger.warning(f"Task counter backfill skipped: {e.message}")
+    
+    if settings.MEMORY_DIAGNOSTICS_ENABLED:
+        memory_tracker.start()
+    await event_hub.start()
+    if task_service.group_commit is not None:
+        task_service.group_commit.start()
+    archiver = None
+    if settings.ARCHIVE_ENABLED:
+        archiver = asyncio.create_task(task_archiver.run_forever(settings.ARCHIVE_INTERVAL_SECONDS))
+    backups = None
+    if settings.BACKUP_ENABLED:
+        if database_backup.supported:
+            backups = asyncio.create_task(database_backup.run_forever(settings.BACKUP_INTERVAL_SECONDS))
+        else:
+            logger.warning("BACKUP_ENABLED ignored: online backups need a SQLite DATABASE_URL")
+    if settings.JOBS_ENABLED:
+        job_runner.start()
+    snapshotter = None
+    if snapshots is not None and settings.REPOSITORY_SNAPSHOT_INTERVAL_SECONDS > 0:
+        snapshotter = asyncio.create_task(snapshots.run_snapshots(settings.REPOSITORY_SNAPSHOT_INTERVAL_SECONDS))
+    
     logger.info(f"Task Manager API started successfully on {settings.HOST}:{settings.PORT}")
     yield
     logger.info("Shutting down Task Manager API...")
+    if archiver is not None:
+        archiver.cancel()
+    if backups is not None:
+        backups.cancel()
+    if job_runner.running:
+        await asyncio.to_thread(job_runner.stop, settings.JOBS_SHUTDOWN_TIMEOUT_SECONDS)
+    if task_service.group_commit is not None:
+        task_service.group_commit.stop()
+    if snapshotter is not None:
+        snapshotter.cancel()
+    if snapshots is not None:
+        try:
+            saved = await asyncio.to_thread(snapshots.save_snapshot)
+            logger.info(f"Saved {saved} tasks to {snapshots.snapshot_path}")
+        except OSError as e:
+            logger.error(f"Failed to save task snapshot: {e}")
+    await event_hub.stop()
+    memory_tracker.stop()
 
 
 def create_app() -> FastAPI:
@@ -54,6 +137,17 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
     
+    if settings.STATEMENT_TIMEOUT_ENABLED:
+        # Inside admission control: only admitted requests get a budget
+        app.add_middleware(StatementTimeoutMiddleware, timeouts=settings.STATEMENT_TIMEOUTS)
+    
+    if settings.ADMISSION_CONTROL_ENABLED:
+        app.add_middleware(
+            AdmissionMiddleware,
+            controller=admission_controller,
+            retry_after=settings.ADMISSION_RETRY_AFTER,
+        )
+    
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.ALLOWED_ORIGINS,
@@ -62,6 +156,25 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+    
+    if settings.MEMORY_DIAGNOSTICS_ENABLED:
+        app.add_middleware(MemoryMiddleware, tracker=memory_tracker, token=settings.ADMIN_TOKEN)
+    
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+    
+    if settings.PROFILING_ENABLED:
+        # Outermost, so the profile covers every other middleware too
+        app.add_middleware(
+            ProfilingMiddleware,
+            store=profile_store,
+            token=settings.ADMIN_TOKEN,
+            sample_rate=settings.PROFILING_SAMPLE_RATE,
+            interval=settings.PROFILING_INTERVAL_MS / 1000,
+        )
+    
     app.include_router(api_router, prefix="/api/v1")
     return app
 
@@ -78,12 +191,29 @@ async def task_manager_exception_handler(request: Request, exc: TaskManagerExcep
     )
 
 
+@app.exception_handler(StatementTimeoutError)
+async def statement_timeout_exception_handler(request: Request, exc: StatementTimeoutError):
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": exc.message, "error_code": exc.error_code, "type": "StatementTimeout"}
+    )
+
+
+@app.exception_handler(RequestCancelledError)
+async def request_cancelled_exception_handler(request: Request, exc: RequestCancelledError):
+    # 499 "Client Closed Request": nobody reads it, but access logs and traces do
+    return JSONResponse(
+        status_code=499,
+        content={"detail": exc.message, "error_code": exc.error_code, "type": "RequestCancelled"}
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error(f"Validation error: {exc.errors()}")
     return JSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-        content={"detail": "Validation error", "errors": exc.errors(), "type": "ValidationError"}
+        content={"detail": "Validation error", "errors": jsonable_encoder(exc.errors()), "type": "ValidationError"}
     )
 
 
@@ -109,32 +239,37 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 
 @app.get("/", tags=["Root"])
-def read_root():
-    return {
+def read_root(request: Request):
+    return negotiated_response(request, {
         "message": f"Welcome to {settings.APP_NAME}",
         "version": settings.APP_VERSION,
         "environment": settings.ENVIRONMENT,
         "docs_url": "/docs",
         "redoc_url": "/redoc",
         "api_prefix": "/api/v1"
-    }
+    })
 
 
 @app.get("/health", tags=["Health"])
-def health_check():
+def health_check(request: Request):
     db_healthy = db_manager.health_check()
-    return {
+    return negotiated_response(request, {
         "status": "healthy" if db_healthy else "unhealthy",
         "timestamp": "2025-06-19T00:00:00Z",
         "version": settings.APP_VERSION,
         "environment": settings.ENVIRONMENT,
         "database": "connected" if db_healthy else "disconnected"
-    }
+    })
+
+
+@app.get("/metrics", tags=["Health"])
+def get_metrics(request: Request):
+    return negotiated_response(request, metrics.snapshot())
 
 
 @app.get("/info", tags=["Info"])
-def get_app_info():
-    return {
+def get_app_info(request: Request):
+    return negotiated_response(request, {
         "app_name": settings.APP_NAME,
         "version": settings.APP_VERSION,
         "environment": settings.ENVIRONMENT,
@@ -142,16 +277,9 @@ def get_app_info():
         "database_type": "sqlite" if "sqlite" in settings.DATABASE_URL else "postgresql",
         "allowed_origins": settings.ALLOWED_ORIGINS,
         "log_level": settings.LOG_LEVEL
-    }
+    })
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.RELOAD,
-        log_level=settings.LOG_LEVEL.lower(),
-        access_log=True
-    )
+    from app.server import main
+    main()
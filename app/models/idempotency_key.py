@@ -0,0 +1,29 @@
+"""
+app/models/idempotency_key.py - Stored responses of writes sent with an Idempotency-Key
+"""
+from sqlalchemy import Column, String, DateTime, Index, Integer, LargeBinary
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """A tenant's idempotency key and the first response to the write it came with.
+    
+    ``status_code`` stays NULL while that write is still running; retries
+    with the same key wait for it and then get the stored response back.
+    """
+    __tablename__ = "idempotency_keys"
+    # Expired keys are purged across all tenants
+    __table_args__ = (Index("ix_idempotency_keys_expires_at", "expires_at"),)
+    
+    tenant_id = Column(String(64), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    media_type = Column(String(100), nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey(tenant_id='{self.tenant_id}', key='{self.key}', status_code={self.status_code})>"
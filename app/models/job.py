@@ -0,0 +1,55 @@
+"""
+app/models/job.py - Background jobs run by the in-process job runner
+"""
+from sqlalchemy import Column, String, Boolean, DateTime, Index, Integer, JSON, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.core.types import CompactUUID
+from app.models.task import DEFAULT_TENANT
+from app.utils.ids import uuid7
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+def generate_job_id() -> str:
+    return str(uuid7())
+
+
+class Job(Base):
+    """A submitted job, its progress and its outcome.
+    
+    Rows outlive the process that ran them: queued jobs are picked up after
+    a restart, and a running job whose heartbeat stops is marked failed.
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_tenant_created_at", "tenant_id", "created_at"),
+        # The queue is shared by all tenants: workers look for the oldest
+        # queued job, the reaper for stale running ones
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+    )
+    
+    id = Column(CompactUUID, primary_key=True, default=generate_job_id)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    type = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<Job(id={self.id}, type='{self.type}', status='{self.status}')>"
@@ -0,0 +1,19 @@
+"""
+app/models/job_cursor.py - Saved positions of resumable background jobs
+"""
+from sqlalchemy import Column, String, DateTime, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class JobCursor(Base):
+    """Where a long-running job stopped, so a restart picks up from there"""
+    __tablename__ = "job_cursors"
+    
+    name = Column(String(100), primary_key=True)
+    position = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<JobCursor(name='{self.name}', position={self.position!r})>"
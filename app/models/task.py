@@ -1,25 +1,39 @@
 """
 app/models/task.py - Task SQLAlchemy model
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Text
+from sqlalchemy import Column, String, Boolean, DateTime, Index, Text
 from sqlalchemy.sql import func
-import uuid
 
 from app.core.database import Base
+from app.core.types import CompactUUID
+from app.utils.ids import uuid7
+
+# Tenant of tasks written without naming one (and of pre-tenancy data)
+DEFAULT_TENANT = "default"
 
 
 def generate_uuid() -> str:
-    return str(uuid.uuid4())
+    return str(uuid7())
 
 
 class Task(Base):
     """Task model representing a task in the database"""
     __tablename__ = "tasks"
+    __shard_key__ = "id"
+    # Every index leads with the tenant, so a tenant's queries only touch
+    # its own rows however large the table grows
+    __table_args__ = (
+        Index("ix_tasks_tenant_created_at", "tenant_id", "created_at", "id"),
+        Index("ix_tasks_tenant_title", "tenant_id", "title"),
+        # Completed/pending listings and the archiver's scan of long-completed tasks
+        Index("ix_tasks_tenant_completed_updated_at", "tenant_id", "completed", "updated_at"),
+    )
     
-    id = Column(String(36), primary_key=True, default=generate_uuid, index=True)
-    title = Column(String(255), nullable=False, index=True)
+    id = Column(CompactUUID, primary_key=True, default=generate_uuid)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    title = Column(String(255), nullable=False)
     description = Column(Text, nullable=True, default="")
-    completed = Column(Boolean, nullable=False, default=False, index=True)
+    completed = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
     
@@ -33,6 +47,7 @@ class Task(Base):
     def to_dict(self) -> dict:
         return {
             "id": self.id,
+            "tenant_id": self.tenant_id,
             "title": self.title,
             "description": self.description,
             "completed": self.completed,
@@ -0,0 +1,51 @@
+"""
+app/models/task_analytics.py - Rollup tables behind the task analytics endpoint
+"""
+from sqlalchemy import Column, Date, DateTime, Integer, String
+
+from app.core.database import Base
+from app.core.types import CompactUUID
+from app.models.task import DEFAULT_TENANT
+
+
+class TaskCompletion(Base):
+    """When a currently completed task was completed.
+
+    Kept so un-completing or deleting the task can take exactly its share
+    back out of the rollups.
+    """
+    __tablename__ = "task_completions"
+    __shard_key__ = "task_id"
+    
+    task_id = Column(CompactUUID, primary_key=True)
+    completed_at = Column(DateTime(timezone=True), nullable=False)
+    duration_bucket = Column(Integer, nullable=False)
+    
+    def __repr__(self) -> str:
+        return f"<TaskCompletion(task_id={self.task_id}, completed_at={self.completed_at})>"
+
+
+class TaskDailyRollup(Base):
+    """Tasks created and completed per tenant and UTC day"""
+    __tablename__ = "task_daily_rollups"
+    
+    tenant_id = Column(String(64), primary_key=True, default=DEFAULT_TENANT)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<TaskDailyRollup(day={self.day}, created={self.created}, completed={self.completed})>"
+
+
+class TaskCompletionHistogram(Base):
+    """Time-to-complete histogram of a tenant's tasks completed on each UTC day"""
+    __tablename__ = "task_completion_histogram"
+    
+    tenant_id = Column(String(64), primary_key=True, default=DEFAULT_TENANT)
+    day = Column(Date, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<TaskCompletionHistogram(day={self.day}, bucket={self.bucket}, count={self.count})>"
@@ -0,0 +1,35 @@
+"""
+app/models/task_archive.py - Cold storage for long-completed tasks
+"""
+from sqlalchemy import Column, String, Boolean, DateTime, Index, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.core.types import CompactUUID
+from app.models.task import DEFAULT_TENANT
+
+# Columns copied verbatim between tasks and tasks_archive
+ARCHIVED_COLUMNS = ("id", "tenant_id", "title", "description", "completed", "created_at", "updated_at")
+
+
+class TaskArchive(Base):
+    """A task moved out of the hot ``tasks`` table by the archiver.
+
+    Rows keep their task id, so archived tasks stay reachable by id and
+    can be restored unchanged.
+    """
+    __tablename__ = "tasks_archive"
+    __shard_key__ = "id"
+    __table_args__ = (Index("ix_tasks_archive_tenant_created_at", "tenant_id", "created_at", "id"),)
+    
+    id = Column(CompactUUID, primary_key=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True, default="")
+    completed = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<TaskArchive(id={self.id}, title='{self.title}')>"
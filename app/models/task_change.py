@@ -0,0 +1,38 @@
+"""
+app/models/task_change.py - Change log backing the task delta-sync feed
+"""
+from sqlalchemy import Column, Index, Integer, String, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+from app.core.types import CompactUUID
+from app.models.task import DEFAULT_TENANT
+
+CHANGE_UPSERT = "upsert"
+CHANGE_DELETE = "delete"
+
+
+class TaskChange(Base):
+    """Latest change of a task, ordered by a monotonically increasing sequence.
+
+    Each task keeps a single row: a new write deletes the previous row and
+    appends a fresh one, so reading the feed costs O(changed tasks) and a
+    deleted task leaves behind a tombstone.
+    """
+    __tablename__ = "task_changes"
+    __shard_key__ = "task_id"
+    __table_args__ = (
+        Index("ix_task_changes_tenant_seq", "tenant_id", "seq"),
+        Index("ux_task_changes_tenant_task", "tenant_id", "task_id", unique=True),
+        # AUTOINCREMENT stops SQLite from reusing the sequence of a deleted tail row
+        {"sqlite_autoincrement": True},
+    )
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+    task_id = Column(CompactUUID, nullable=False)
+    operation = Column(String(16), nullable=False, default=CHANGE_UPSERT)
+    changed_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    
+    def __repr__(self) -> str:
+        return f"<TaskChange(seq={self.seq}, task_id={self.task_id}, operation='{self.operation}')>"
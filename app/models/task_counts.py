@@ -0,0 +1,22 @@
+"""
+app/models/task_counts.py - Per-tenant task counters
+"""
+from sqlalchemy import Column, Integer, String
+
+from app.core.database import Base
+
+
+class TenantTaskCounts(Base):
+    """How many tasks a tenant has, kept up to date on every write.
+    
+    Lets the stats endpoint answer for one tenant without counting its rows.
+    """
+    __tablename__ = "tenant_task_counts"
+    
+    tenant_id = Column(String(64), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    archived = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<TenantTaskCounts(tenant_id='{self.tenant_id}', total={self.total}, completed={self.completed})>"
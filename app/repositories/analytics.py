@@ -0,0 +1,213 @@
+"""
+app/repositories/analytics.py - Incrementally maintained task analytics rollups
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.task import Task
+from app.models.task_analytics import TaskCompletion, TaskCompletionHistogram, TaskDailyRollup
+from app.models.task_archive import TaskArchive
+from app.repositories.base import BaseRepository
+from app.utils.histogram import duration_bucket
+
+# Rows per INSERT during a rebuild; keeps bound parameters below SQLite's limit
+_INSERT_CHUNK_SIZE = 250
+
+
+def _utc(moment: datetime) -> datetime:
+    """SQLite hands back naive datetimes; they are stored in UTC"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+class AnalyticsRepository(BaseRepository[TaskDailyRollup, TaskDailyRollup, TaskDailyRollup]):
+    """Keeps per-day created/completed counts and time-to-complete histograms.
+    
+    Task writes call :meth:`record` inside their own transaction, so the
+    rollups always agree with the tasks they describe. Reads touch one row
+    per day (plus one per populated histogram bucket), never the tasks.
+    """
+    
+    def __init__(self):
+        super().__init__(TaskDailyRollup)
+    
+    def _add_completion(self, db: Session, task: Task, completed_at: datetime) -> None:
+        bucket = duration_bucket((completed_at - _utc(task.created_at)).total_seconds())
+        db.add(TaskCompletion(task_id=task.id, completed_at=completed_at, duration_bucket=bucket))
+        self._count_completion(db, task.tenant_id, completed_at, bucket, 1)
+    
+    def _remove_completion(self, db: Session, task: Task) -> None:
+        removed = db.execute(
+            delete(TaskCompletion)
+            .where(TaskCompletion.task_id == task.id)
+            .returning(TaskCompletion.completed_at, TaskCompletion.duration_bucket)
+        ).first()
+        if removed is not None:
+            self._count_completion(db, task.tenant_id, removed.completed_at, removed.duration_bucket, -1)
+    
+    def _count_completion(
+        self, db: Session, tenant_id: str, completed_at: datetime, bucket: int, delta: int
+    ) -> None:
+        day = _utc(completed_at).date()
+        self._increment(db, TaskDailyRollup, {"tenant_id": tenant_id, "day": day}, {"created": 0, "completed": delta})
+        self._increment(
+            db, TaskCompletionHistogram, {"tenant_id": tenant_id, "day": day, "bucket": bucket}, {"count": delta}
+        )
+    
+    def _count_created(self, db: Session, task: Task, delta: int) -> None:
+        day = _utc(task.created_at).date()
+        self._increment(
+            db, TaskDailyRollup, {"tenant_id": task.tenant_id, "day": day}, {"created": delta, "completed": 0}
+        )
+    
+    def record(self, db: Session, task: Task, operation: str, completion_changed: bool = True) -> None:
+        """Apply a task write (``create``, ``update`` or ``delete``) to the rollups.
+        
+        A task has a completion record exactly while it is completed, so an
+        update only touches the rollups when ``completion_changed``. Creates
+        and deletes both count on the day of the task's ``created_at``, so a
+        day never goes negative and always matches what :meth:`rebuild`
+        recomputes from the stored tasks.
+        """
+        now = datetime.now(timezone.utc)
+        if operation == "create":
+            self._count_created(db, task, 1)
+            if task.completed:
+                self._add_completion(db, task, now)
+        elif operation == "delete":
+            self._count_created(db, task, -1)
+            if task.completed:
+                self._remove_completion(db, task)
+        elif completion_changed:
+            if task.completed:
+                self._add_completion(db, task, now)
+            else:
+                self._remove_completion(db, task)
+    
+    def get_range(
+        self, db: Session, start: date, end: date, tenant_id: Optional[str] = None
+    ) -> Tuple[List[tuple], List[tuple]]:
+        """``(day, created, completed)`` and ``(day, bucket, count)`` rows for
+        ``start`` to ``end`` inclusive; ``tenant_id=None`` sums every tenant
+        """
+        try:
+            days = (
+                select(TaskDailyRollup.day, func.sum(TaskDailyRollup.created), func.sum(TaskDailyRollup.completed))
+                .where(TaskDailyRollup.day >= start, TaskDailyRollup.day <= end)
+                .group_by(TaskDailyRollup.day)
+                .order_by(TaskDailyRollup.day)
+            )
+            histogram = (
+                select(
+                    TaskCompletionHistogram.day, TaskCompletionHistogram.bucket, func.sum(TaskCompletionHistogram.count)
+                )
+                .where(TaskCompletionHistogram.day >= start, TaskCompletionHistogram.day <= end)
+                .where(TaskCompletionHistogram.count > 0)
+                .group_by(TaskCompletionHistogram.day, TaskCompletionHistogram.bucket)
+            )
+            return (
+                db.execute(self._scoped(days, tenant_id)).all(),
+                db.execute(self._scoped(histogram, tenant_id, TaskCompletionHistogram)).all(),
+            )
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def is_empty(self, db: Session) -> bool:
+        return db.scalars(select(TaskDailyRollup.day).limit(1)).first() is None
+    
+    def _scan(self, db: Session, model, columns, batch_size: int) -> Iterator:
+        """Keyset-paged rows of ``model`` in id order (also across shards)"""
+        key = model.__mapper__.primary_key[0]
+        after: Optional[str] = None
+        while True:
+            statement = select(key, *columns).order_by(key).limit(batch_size)
+            if after is not None:
+                statement = statement.where(key > after)
+            rows = sorted(db.execute(statement).all(), key=lambda row: row[0])[:batch_size]
+            if not rows:
+                return
+            yield from rows
+            after = rows[-1][0]
+    
+    def _insert_rows(self, db: Session, model, rows: List[dict]) -> None:
+        # Multi-row VALUES rather than executemany: the sharded session
+        # does not support ORM bulk inserts
+        for start in range(0, len(rows), _INSERT_CHUNK_SIZE):
+            db.execute(insert(model).values(rows[start:start + _INSERT_CHUNK_SIZE]))
+    
+    def rebuild(self, db: Session, batch_size: int = 1000) -> Dict[str, int]:
+        """Recompute every rollup from the tasks and archived tasks.
+        
+        Completed tasks without a completion record (those that predate the
+        rollups) are given one, using their last update as completion time.
+        """
+        try:
+            created: Dict[Tuple[str, date], int] = defaultdict(int)
+            completed_at: Dict[str, datetime] = {}
+            created_at: Dict[str, datetime] = {}
+            tenants: Dict[str, str] = {}
+            for model in (Task, TaskArchive):
+                for task_id, tenant_id, task_created, is_completed, updated_at in self._scan(
+                    db, model, (model.tenant_id, model.created_at, model.completed, model.updated_at), batch_size
+                ):
+                    created[(tenant_id, _utc(task_created).date())] += 1
+                    if is_completed:
+                        completed_at[task_id] = _utc(updated_at)
+                        created_at[task_id] = _utc(task_created)
+                        tenants[task_id] = tenant_id
+            
+            # Keep recorded completion times; drop records of tasks no longer completed
+            recorded: Dict[str, int] = {}
+            for task_id, recorded_at, bucket in self._scan(
+                db, TaskCompletion, (TaskCompletion.completed_at, TaskCompletion.duration_bucket), batch_size
+            ):
+                if task_id in completed_at:
+                    completed_at[task_id] = _utc(recorded_at)
+                    recorded[task_id] = bucket
+                else:
+                    db.execute(delete(TaskCompletion).where(TaskCompletion.task_id == task_id))
+            
+            completions: Dict[Tuple[str, date], int] = defaultdict(int)
+            histogram: Dict[Tuple[str, date, int], int] = defaultdict(int)
+            for task_id, moment in completed_at.items():
+                bucket = duration_bucket((moment - created_at[task_id]).total_seconds())
+                if task_id not in recorded:
+                    db.add(TaskCompletion(task_id=task_id, completed_at=moment, duration_bucket=bucket))
+                elif recorded[task_id] != bucket:
+                    db.execute(
+                        update(TaskCompletion).where(TaskCompletion.task_id == task_id).values(duration_bucket=bucket)
+                    )
+                completions[(tenants[task_id], moment.date())] += 1
+                histogram[(tenants[task_id], moment.date(), bucket)] += 1
+            
+            db.execute(delete(TaskDailyRollup))
+            db.execute(delete(TaskCompletionHistogram))
+            rollups = sorted(set(created) | set(completions))
+            self._insert_rows(db, TaskDailyRollup, [
+                {
+                    "tenant_id": tenant_id, "day": day,
+                    "created": created.get((tenant_id, day), 0), "completed": completions.get((tenant_id, day), 0),
+                }
+                for tenant_id, day in rollups
+            ])
+            self._insert_rows(db, TaskCompletionHistogram, [
+                {"tenant_id": tenant_id, "day": day, "bucket": bucket, "count": count}
+                for (tenant_id, day, bucket), count in sorted(histogram.items())
+            ])
+            self._commit(db)
+            return {
+                "days": len({day for _, day in rollups}),
+                "tasks": sum(created.values()),
+                "completed": len(completed_at),
+            }
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+
+analytics_repository = AnalyticsRepository()
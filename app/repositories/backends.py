@@ -0,0 +1,76 @@
+"""
+app/repositories/backends.py - Interchangeable task storage backends
+
+A backend supplies the task and analytics repositories behind
+:class:`TaskService`; ``REPOSITORY_BACKEND`` picks one by name. New backends
+register a factory with :func:`register_backend`.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.core.config import Settings, get_settings
+from app.core.database import shard_router
+from app.repositories.analytics import analytics_repository
+from app.repositories.memory import MemoryAnalyticsRepository, MemoryTaskRepository, MemoryTaskStore
+from app.repositories.protocol import AnalyticsRepositoryProtocol, TaskRepositoryProtocol
+from app.repositories.sharded import ShardedTaskRepository
+from app.repositories.task import task_repository
+
+settings = get_settings()
+
+
+class TaskBackend(NamedTuple):
+    """Repositories of one storage backend"""
+    name: str
+    tasks: TaskRepositoryProtocol
+    analytics: AnalyticsRepositoryProtocol
+    # Whether writes go to the database, so group commit has something to coalesce
+    uses_database: bool = True
+    # In-memory store to load on startup and snapshot to disk, if configured
+    snapshots: Optional[MemoryTaskStore] = None
+
+
+BackendFactory = Callable[[Settings], TaskBackend]
+_BACKENDS: Dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str) -> Callable[[BackendFactory], BackendFactory]:
+    """Make a backend factory available as ``REPOSITORY_BACKEND=<name>``"""
+    def register(factory: BackendFactory) -> BackendFactory:
+        _BACKENDS[name] = factory
+        return factory
+    return register
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+@register_backend("sqlalchemy")
+def _sqlalchemy_backend(config: Settings) -> TaskBackend:
+    tasks = ShardedTaskRepository(shard_router) if shard_router else task_repository
+    return TaskBackend("sqlalchemy", tasks, analytics_repository)
+
+
+@register_backend("memory")
+def _memory_backend(config: Settings) -> TaskBackend:
+    store = MemoryTaskStore(config.REPOSITORY_SNAPSHOT_PATH or None)
+    analytics = MemoryAnalyticsRepository(store)
+    return TaskBackend(
+        "memory",
+        MemoryTaskRepository(store, analytics),
+        analytics,
+        uses_database=False,
+        snapshots=store if config.REPOSITORY_SNAPSHOT_PATH else None,
+    )
+
+
+def create_task_backend(name: Optional[str] = None, config: Optional[Settings] = None) -> TaskBackend:
+    """Build the backend called ``name`` (default: ``REPOSITORY_BACKEND``)"""
+    config = config or settings
+    name = name or config.REPOSITORY_BACKEND
+    factory = _BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(
+            f"Unknown repository backend '{name}'; available: {', '.join(available_backends())}"
+        )
+    return factory(config)
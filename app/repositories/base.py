@@ -1,17 +1,22 @@
 """
 app/repositories/base.py - Base repository with common CRUD operations
 """
-from typing import Generic, TypeVar, Type, Optional, List, Any
+from typing import Dict, Generic, TypeVar, Type, Optional, List, Any
+from sqlalchemy import Select, TextClause, func, select, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import BaseModel
 
-from app.core.database import Base
+from app.core.database import Base, commits_deferred
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Upsert statements by (model, key columns, counter columns); the
+# ON CONFLICT ... DO UPDATE syntax is shared by SQLite and PostgreSQL
+_UPSERTS: Dict[tuple, TextClause] = {}
+
 
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Base repository class with common CRUD operations"""
@@ -19,30 +24,81 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
     
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+    def _commit(self, db: Session) -> None:
+        """Commit, or only flush when the write is part of a unit of work"""
+        if commits_deferred(db):
+            db.flush()
+        else:
+            db.commit()
+    
+    def _rollback(self, db: Session) -> None:
+        """Roll back unless an enclosing unit of work owns the transaction"""
+        if not commits_deferred(db):
+            db.rollback()
+    
+    def _scoped(self, statement: Select, tenant_id: Optional[str], model=None) -> Select:
+        """Restrict ``statement`` to one tenant's rows; ``None`` reads every tenant"""
+        if tenant_id is None:
+            return statement
+        return statement.where((model or self.model).tenant_id == tenant_id)
+    
+    def _increment(self, db: Session, model, keys: dict, deltas: dict) -> None:
+        """Add ``deltas`` to the ``model`` row at ``keys``, creating it if missing"""
+        shape = (model, tuple(keys), tuple(deltas))
+        statement = _UPSERTS.get(shape)
+        if statement is None:
+            # Plain SQL: the dialect upsert constructs have no cache key and
+            # would be recompiled on every write
+            table = model.__tablename__
+            columns = [*keys, *deltas]
+            statement = _UPSERTS[shape] = text(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(':' + column for column in columns)}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+                + ", ".join(f"{column} = {table}.{column} + excluded.{column}" for column in deltas)
+            )
+        db.execute(statement, {**keys, **deltas}, bind_arguments={"mapper": model.__mapper__})
+    
+    def _on_change(self, db: Session, db_obj: ModelType, operation: str) -> None:
+        """Hook run inside a write transaction just before it commits.
+        
+        ``operation`` is one of ``create``, ``update`` or ``delete``; subclasses
+        override this to keep derived tables in step with the write.
+        """
+    
+    def get(self, db: Session, id: Any, tenant_id: Optional[str] = None) -> Optional[ModelType]:
         try:
-            return db.query(self.model).filter(self.model.id == id).first()
+            # Identity map first, then SQLAlchemy's cached primary-key loader
+            obj = db.get(self.model, id)
+            if obj is not None and tenant_id is not None and obj.tenant_id != tenant_id:
+                return None
+            return obj
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
+    def get_multi(
+        self, db: Session, *, skip: int = 0, limit: int = 100, tenant_id: Optional[str] = None
+    ) -> List[ModelType]:
         try:
-            return db.query(self.model).offset(skip).limit(limit).all()
+            return db.scalars(self._scoped(select(self.model), tenant_id).offset(skip).limit(limit)).all()
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
+    def create(self, db: Session, *, obj_in: CreateSchemaType, tenant_id: Optional[str] = None) -> ModelType:
         try:
             obj_in_data = obj_in.dict()
+            if tenant_id is not None:
+                obj_in_data["tenant_id"] = tenant_id
             db_obj = self.model(**obj_in_data)
             db.add(db_obj)
-            db.commit()
+            self._on_change(db, db_obj, "create")
+            self._commit(db)
             db.refresh(db_obj)
             return db_obj
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
     def update(self, db: Session, *, db_obj: ModelType, obj_in: UpdateSchemaType) -> ModelType:
@@ -53,27 +109,29 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                     setattr(db_obj, field, value)
             
             db.add(db_obj)
-            db.commit()
+            self._on_change(db, db_obj, "update")
+            self._commit(db)
             db.refresh(db_obj)
             return db_obj
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def delete(self, db: Session, *, id: Any) -> Optional[ModelType]:
+    def delete(self, db: Session, *, id: Any, tenant_id: Optional[str] = None) -> Optional[ModelType]:
         try:
-            obj = db.query(self.model).get(id)
+            obj = self.get(db, id, tenant_id)
             if obj:
+                self._on_change(db, obj, "delete")
                 db.delete(obj)
-                db.commit()
+                self._commit(db)
             return obj
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def count(self, db: Session) -> int:
+    def count(self, db: Session, tenant_id: Optional[str] = None) -> int:
         try:
-            return db.query(self.model).count()
+            return db.scalar(self._scoped(select(func.count()).select_from(self.model), tenant_id))
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
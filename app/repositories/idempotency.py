@@ -0,0 +1,155 @@
+"""
+app/repositories/idempotency.py - Claims and stored responses of idempotency keys
+"""
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import bindparam, delete, or_, select, text, tuple_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.idempotency_key import IdempotencyKey
+from app.repositories.base import BaseRepository
+
+_NO_SYNC = {"synchronize_session": False}
+
+# Plain SQL like the counter upserts; ON CONFLICT ... DO NOTHING is shared by
+# SQLite and PostgreSQL and makes the claim a single round trip
+_CLAIM = text(
+    "INSERT INTO idempotency_keys (tenant_id, key, fingerprint, created_at, expires_at) "
+    "VALUES (:tenant_id, :key, :fingerprint, :created_at, :expires_at) "
+    "ON CONFLICT (tenant_id, key) DO NOTHING"
+).bindparams(
+    bindparam("created_at", type_=IdempotencyKey.created_at.type),
+    bindparam("expires_at", type_=IdempotencyKey.expires_at.type),
+)
+
+
+class IdempotencyRepository(BaseRepository[IdempotencyKey, IdempotencyKey, IdempotencyKey]):
+    """Idempotency keys; every claim is a single conditional write and is
+    committed straight away, so other processes see the key as taken
+    """
+    
+    def __init__(self):
+        super().__init__(IdempotencyKey)
+    
+    def claim(
+        self, db: Session, tenant_id: str, key: str, fingerprint: str, now: datetime, expires_at: datetime
+    ) -> bool:
+        """Record ``key`` as in flight; False if the tenant already has it"""
+        try:
+            claimed = db.execute(
+                _CLAIM,
+                {
+                    "tenant_id": tenant_id, "key": key, "fingerprint": fingerprint,
+                    "created_at": now, "expires_at": expires_at,
+                },
+                bind_arguments={"mapper": IdempotencyKey.__mapper__},
+            ).rowcount == 1
+            self._commit(db)
+            return claimed
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def take_over(
+        self, db: Session, tenant_id: str, key: str, fingerprint: str, now: datetime, expires_at: datetime,
+        abandoned_before: datetime,
+    ) -> bool:
+        """Claim an existing key that has expired, or whose first request
+        started before ``abandoned_before`` and never finished
+        """
+        try:
+            claimed = db.execute(
+                update(IdempotencyKey)
+                .where(
+                    IdempotencyKey.tenant_id == tenant_id,
+                    IdempotencyKey.key == key,
+                    or_(
+                        IdempotencyKey.expires_at <= now,
+                        IdempotencyKey.status_code.is_(None) & (IdempotencyKey.created_at < abandoned_before),
+                    ),
+                )
+                .values(
+                    fingerprint=fingerprint, status_code=None, media_type=None, body=None,
+                    created_at=now, expires_at=expires_at,
+                ),
+                execution_options=_NO_SYNC,
+            ).rowcount == 1
+            self._commit(db)
+            return claimed
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_record(self, db: Session, tenant_id: str, key: str) -> Optional[Any]:
+        """``(fingerprint, status_code, media_type, body)`` as currently committed"""
+        try:
+            # Column rows bypass the identity map, so polling sees other writers
+            return db.execute(
+                select(
+                    IdempotencyKey.fingerprint, IdempotencyKey.status_code,
+                    IdempotencyKey.media_type, IdempotencyKey.body,
+                ).where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+            ).first()
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def complete(
+        self, db: Session, tenant_id: str, key: str, status_code: int, media_type: Optional[str], body: bytes
+    ) -> None:
+        """Store the response of the request holding ``key``"""
+        try:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.tenant_id == tenant_id, IdempotencyKey.key == key)
+                .values(status_code=status_code, media_type=media_type, body=body),
+                execution_options=_NO_SYNC,
+            )
+            self._commit(db)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def release(self, db: Session, tenant_id: str, key: str) -> None:
+        """Give up an in-flight claim so that a retry can run the request"""
+        try:
+            db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.tenant_id == tenant_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                ),
+                execution_options=_NO_SYNC,
+            )
+            self._commit(db)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def purge_expired(self, db: Session, now: datetime, limit: int) -> int:
+        """Delete up to ``limit`` expired keys of any tenant"""
+        try:
+            expired = db.execute(
+                select(IdempotencyKey.tenant_id, IdempotencyKey.key)
+                .where(IdempotencyKey.expires_at <= now)
+                .limit(limit)
+            ).all()
+            # Only take the write lock when there is something to delete
+            if not expired:
+                return 0
+            purged = db.execute(
+                delete(IdempotencyKey).where(
+                    tuple_(IdempotencyKey.tenant_id, IdempotencyKey.key).in_(expired),
+                    IdempotencyKey.expires_at <= now,
+                ),
+                execution_options=_NO_SYNC,
+            ).rowcount
+            self._commit(db)
+            return purged
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+
+idempotency_repository = IdempotencyRepository()
@@ -0,0 +1,160 @@
+"""
+app/repositories/job.py - Persistence of background jobs
+"""
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.job import Job, JOB_CANCELLED, JOB_FAILED, JOB_QUEUED, JOB_RUNNING
+from app.repositories.base import BaseRepository
+from app.schemas.job import JobCreate
+
+_NO_SYNC = {"synchronize_session": False}
+
+
+class JobRepository(BaseRepository[Job, JobCreate, JobCreate]):
+    """Job rows; every state change is a single conditional UPDATE, so
+    several processes can share the table without stepping on each other
+    """
+    
+    def __init__(self):
+        super().__init__(Job)
+    
+    def get_recent(
+        self, db: Session, status: Optional[str] = None, job_type: Optional[str] = None, limit: int = 100,
+        tenant_id: Optional[str] = None, exclude_types: Sequence[str] = (),
+    ) -> List[Job]:
+        try:
+            statement = self._scoped(select(Job), tenant_id)
+            if status is not None:
+                statement = statement.where(Job.status == status)
+            if job_type is not None:
+                statement = statement.where(Job.type == job_type)
+            if exclude_types:
+                statement = statement.where(Job.type.not_in(exclude_types))
+            return db.scalars(statement.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit)).all()
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_queued(self, db: Session, job_types: Sequence[str], limit: int) -> List[Tuple[str, str]]:
+        """``(id, type)`` of the oldest queued jobs of ``job_types``"""
+        try:
+            return db.execute(
+                select(Job.id, Job.type)
+                .where(Job.status == JOB_QUEUED, Job.type.in_(job_types))
+                .order_by(Job.created_at, Job.id)
+                .limit(limit)
+            ).all()
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def claim(self, db: Session, job_id: str, now: datetime) -> bool:
+        """Move a queued job to running; False if someone else got there first"""
+        try:
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_QUEUED)
+                .values(status=JOB_RUNNING, started_at=now, heartbeat_at=now),
+                execution_options=_NO_SYNC,
+            ).rowcount == 1
+            self._commit(db)
+            return claimed
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def record_progress(
+        self, db: Session, job_id: str, done: int, total: Optional[int], now: datetime
+    ) -> bool:
+        """Save progress and refresh the heartbeat; returns whether cancellation was requested"""
+        try:
+            cancel_requested = db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(progress_done=done, progress_total=total, heartbeat_at=now)
+                .returning(Job.cancel_requested),
+                execution_options=_NO_SYNC,
+            ).scalar()
+            self._commit(db)
+            return bool(cancel_requested)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def finish(
+        self, db: Session, job_id: str, status: str, now: datetime, progress: Tuple[int, Optional[int]],
+        result: Any = None, error: Optional[str] = None,
+    ) -> None:
+        """Record a running job's outcome together with its final progress"""
+        try:
+            done, total = progress
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_RUNNING)
+                .values(
+                    status=status, result=result, error=error, finished_at=now,
+                    progress_done=done, progress_total=total,
+                ),
+                execution_options=_NO_SYNC,
+            )
+            self._commit(db)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def request_cancel(self, db: Session, job_id: str, now: datetime) -> None:
+        """Cancel a queued job outright, or flag a running one to stop at its next checkpoint"""
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_QUEUED)
+                .values(status=JOB_CANCELLED, cancel_requested=True, finished_at=now),
+                execution_options=_NO_SYNC,
+            )
+            db.execute(
+                update(Job).where(Job.id == job_id, Job.status == JOB_RUNNING).values(cancel_requested=True),
+                execution_options=_NO_SYNC,
+            )
+            self._commit(db)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def heartbeat(self, db: Session, job_ids: Sequence[str], now: datetime) -> None:
+        try:
+            db.execute(
+                update(Job).where(Job.id.in_(job_ids), Job.status == JOB_RUNNING).values(heartbeat_at=now),
+                execution_options=_NO_SYNC,
+            )
+            self._commit(db)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def fail_stale(self, db: Session, heartbeat_before: datetime, now: datetime, error: str) -> int:
+        """Fail running jobs whose heartbeat stopped before ``heartbeat_before``"""
+        try:
+            stale = db.scalars(
+                select(Job.id).where(Job.status == JOB_RUNNING, Job.heartbeat_at < heartbeat_before)
+            ).all()
+            # Only take the write lock when there is something to fail
+            if not stale:
+                return 0
+            failed = db.execute(
+                update(Job)
+                .where(Job.id.in_(stale), Job.status == JOB_RUNNING, Job.heartbeat_at < heartbeat_before)
+                .values(status=JOB_FAILED, error=error, finished_at=now),
+                execution_options=_NO_SYNC,
+            ).rowcount
+            self._commit(db)
+            return failed
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+
+job_repository = JobRepository()
@@ -0,0 +1,35 @@
+"""
+app/repositories/job_cursor.py - Saved positions of resumable background jobs
+"""
+from typing import Optional
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.models.job_cursor import JobCursor
+from app.repositories.base import BaseRepository
+
+
+class JobCursorRepository(BaseRepository[JobCursor, JobCursor, JobCursor]):
+    """Reads and writes job cursors; writes join the caller's transaction"""
+    
+    def __init__(self):
+        super().__init__(JobCursor)
+    
+    def get_position(self, db: Session, name: str) -> Optional[str]:
+        try:
+            cursor = db.get(JobCursor, name)
+            return cursor.position if cursor else None
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def set_position(self, db: Session, name: str, position: Optional[str]) -> None:
+        """Stage ``position`` for ``name``; it is saved with the caller's next commit"""
+        cursor = db.get(JobCursor, name)
+        if cursor is None:
+            db.add(JobCursor(name=name, position=position))
+        else:
+            cursor.position = position
+
+
+job_cursor_repository = JobCursorRepository()
@@ -0,0 +1,802 @@
+"""
+app/repositories/memory.py - Indexed in-memory task storage
+
+Tasks live in this process only: a hash index by id, hash indexes by
+completion state and per-tenant lists sorted by ``(created_at, id)``. The
+change feed, per-tenant counters and analytics rollups are kept alongside,
+with the same semantics as the SQLAlchemy repositories, so the two
+backends are interchangeable behind :class:`TaskService`.
+
+Writes are visible to every reader as soon as they are made. Inside a
+unit of work each write also records how to undo itself on the session,
+so a rolled-back batch (or savepoint) leaves the store as it found it.
+The store can be snapshotted to a JSON file and loaded back on startup.
+"""
+import asyncio
+import heapq
+import json
+import logging
+import os
+import threading
+from bisect import bisect_right, insort
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from itertools import dropwhile, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.core.database import commits_deferred
+from app.models.task import DEFAULT_TENANT, generate_uuid
+from app.models.task_change import CHANGE_DELETE, CHANGE_UPSERT
+from app.repositories.protocol import ArchiveKey, PageKey
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.utils.histogram import duration_bucket
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Session.info keys of a unit of work's undo log and its savepoint marks
+_JOURNAL_KEY = "memory_journal"
+_MARKS_KEY = "memory_journal_marks"
+
+_UPDATABLE_FIELDS = ("title", "description", "completed")
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(moment: datetime) -> datetime:
+    """Callers may pass naive UTC datetimes read back from SQLite"""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+@dataclass
+class MemoryTask:
+    id: str
+    tenant_id: str
+    title: str
+    description: Optional[str]
+    completed: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+@dataclass
+class MemoryTaskChange:
+    seq: int
+    tenant_id: str
+    task_id: str
+    operation: str
+    changed_at: datetime
+
+
+def _order_key(task: MemoryTask) -> Tuple[datetime, str]:
+    return (task.created_at, task.id)
+
+
+# ---------------------------------------------------------------------------
+# Undo log: writes inside a unit of work are undone when its session rolls back
+
+def _mark_savepoint(session: Session, transaction: SessionTransaction) -> None:
+    journal = session.info.get(_JOURNAL_KEY)
+    if journal is not None and transaction.nested:
+        session.info[_MARKS_KEY][transaction] = len(journal)
+
+
+def _undo(session: Session, previous_transaction: SessionTransaction) -> None:
+    journal = session.info.get(_JOURNAL_KEY)
+    if journal is None:
+        return
+    # A savepoint opened before the first memory write marks an empty journal
+    mark = session.info[_MARKS_KEY].pop(previous_transaction, 0) if previous_transaction.nested else 0
+    while len(journal) > mark:
+        journal.pop()()
+    if not previous_transaction.nested:
+        _forget(session)
+
+
+def _forget(session: Session) -> None:
+    session.info.pop(_JOURNAL_KEY, None)
+    session.info.pop(_MARKS_KEY, None)
+
+
+def _journal(db: Session) -> Optional[List[Callable[[], None]]]:
+    """Undo log of the unit of work ``db`` is in; None when writes are final"""
+    if not commits_deferred(db):
+        return None
+    journal = db.info.get(_JOURNAL_KEY)
+    if journal is None:
+        journal = db.info[_JOURNAL_KEY] = []
+        db.info[_MARKS_KEY] = {}
+        # Without a transaction the unit of work's rollback would be a no-op
+        # that fires no events
+        if not db.in_transaction():
+            db.begin()
+        if not event.contains(db, "after_soft_rollback", _undo):
+            event.listen(db, "after_transaction_create", _mark_savepoint)
+            event.listen(db, "after_soft_rollback", _undo)
+            event.listen(db, "after_commit", _forget)
+    return journal
+
+
+class _ChangeLog:
+    """One tenant's change feed in sequence order.
+    
+    A task's previous change stays in the list (superseded) until enough
+    of them pile up to be worth compacting.
+    """
+    
+    def __init__(self):
+        self.entries: List[MemoryTaskChange] = []
+        self.superseded = 0
+    
+    def compact(self, current: Dict[Tuple[str, str], MemoryTaskChange]) -> None:
+        self.entries = [
+            change for change in self.entries if current.get((change.tenant_id, change.task_id)) is change
+        ]
+        self.superseded = 0
+
+
+class MemoryTaskStore:
+    """Tasks, archived tasks and everything derived from them, in memory.
+    
+    All access goes through :attr:`lock`; repository methods hold it for
+    their whole read or write.
+    """
+    
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.lock = threading.RLock()
+        self.snapshot_path = snapshot_path
+        self.clear()
+    
+    def clear(self) -> None:
+        with self.lock:
+            self.tasks: Dict[str, MemoryTask] = {}
+            self.archive: Dict[str, MemoryTask] = {}
+            # Per-tenant (created_at, id) keys, sorted
+            self.created_index: Dict[str, List[Tuple[datetime, str]]] = defaultdict(list)
+            self.archive_index: Dict[str, List[Tuple[datetime, str]]] = defaultdict(list)
+            # Live task ids by (tenant_id, completed)
+            self.completed_index: Dict[Tuple[str, bool], Set[str]] = defaultdict(set)
+            self.changes: Dict[Tuple[str, str], MemoryTaskChange] = {}
+            self.change_logs: Dict[str, _ChangeLog] = defaultdict(_ChangeLog)
+            self.seq = 0
+            # tenant_id -> [total, completed, archived]
+            self.counts: Dict[str, List[int]] = {}
+            # tenant_id -> day -> [created, completed]
+            self.daily: Dict[str, Dict[date, List[int]]] = defaultdict(dict)
+            # tenant_id -> (day, bucket) -> count
+            self.histogram: Dict[str, Dict[Tuple[date, int], int]] = defaultdict(dict)
+            # task_id -> (completed_at, bucket)
+            self.completions: Dict[str, Tuple[datetime, int]] = {}
+    
+    def _record(self, db: Session, undo: Callable[[], None]) -> None:
+        journal = _journal(db)
+        if journal is not None:
+            journal.append(lambda: self._locked(undo))
+    
+    def _locked(self, action: Callable[[], None]) -> None:
+        with self.lock:
+            action()
+    
+    # -- tasks ---------------------------------------------------------------
+    
+    def _add(self, task: MemoryTask, archived: bool = False) -> None:
+        if archived:
+            self.archive[task.id] = task
+            insort(self.archive_index[task.tenant_id], _order_key(task))
+        else:
+            self.tasks[task.id] = task
+            insort(self.created_index[task.tenant_id], _order_key(task))
+            self.completed_index[(task.tenant_id, task.completed)].add(task.id)
+    
+    def _remove(self, task: MemoryTask, archived: bool = False) -> None:
+        index = self.archive_index if archived else self.created_index
+        keys = index[task.tenant_id]
+        del keys[bisect_right(keys, _order_key(task)) - 1]
+        if archived:
+            del self.archive[task.id]
+        else:
+            del self.tasks[task.id]
+            self.completed_index[(task.tenant_id, task.completed)].discard(task.id)
+    
+    def insert(self, db: Session, task: MemoryTask, archived: bool = False) -> None:
+        self._add(task, archived)
+        self._record(db, lambda: self._remove(task, archived))
+    
+    def remove(self, db: Session, task: MemoryTask, archived: bool = False) -> None:
+        self._remove(task, archived)
+        self._record(db, lambda: self._add(task, archived))
+    
+    def _set(self, task: MemoryTask, values: Dict) -> None:
+        if "completed" in values and values["completed"] != task.completed:
+            self.completed_index[(task.tenant_id, task.completed)].discard(task.id)
+            self.completed_index[(task.tenant_id, values["completed"])].add(task.id)
+        for field, value in values.items():
+            setattr(task, field, value)
+    
+    def set_fields(self, db: Session, task: MemoryTask, **values) -> None:
+        """Change a live task in place (never its id, tenant or created_at)"""
+        previous = {field: getattr(task, field) for field in values}
+        self._set(task, values)
+        self._record(db, lambda: self._set(task, previous))
+    
+    def ordered(
+        self, tenant_id: Optional[str], archived: bool = False, after: Optional[PageKey] = None
+    ) -> Iterator[MemoryTask]:
+        """Tasks in ``(created_at, id)`` order, from just after ``after``; every tenant's merged for None"""
+        index = self.archive_index if archived else self.created_index
+        rows = self.archive if archived else self.tasks
+        if tenant_id is not None:
+            tenant_keys = index.get(tenant_id, [])
+            start = bisect_right(tenant_keys, after) if after is not None else 0
+            keys: Iterable = (tenant_keys[position] for position in range(start, len(tenant_keys)))
+        else:
+            keys = heapq.merge(*index.values())
+            if after is not None:
+                keys = dropwhile(lambda key: key <= after, keys)
+        return (rows[task_id] for _, task_id in keys)
+    
+    def by_completion(self, tenant_id: Optional[str], completed: bool) -> List[MemoryTask]:
+        if tenant_id is not None:
+            ids: Iterable[str] = self.completed_index.get((tenant_id, completed), ())
+        else:
+            ids = (
+                task_id for (_, state), tenant_ids in self.completed_index.items() if state == completed
+                for task_id in tenant_ids
+            )
+        return sorted((self.tasks[task_id] for task_id in ids), key=_order_key)
+    
+    # -- change feed -----------------------------------------------------------
+    
+    def _log(self, change: MemoryTaskChange, previous: Optional[MemoryTaskChange]) -> None:
+        log = self.change_logs[change.tenant_id]
+        self.changes[(change.tenant_id, change.task_id)] = change
+        log.entries.append(change)
+        if previous is not None:
+            log.superseded += 1
+            if log.superseded > len(log.entries) // 2:
+                log.compact(self.changes)
+    
+    def _unlog(self, change: MemoryTaskChange, previous: Optional[MemoryTaskChange]) -> None:
+        log = self.change_logs[change.tenant_id]
+        log.entries.remove(change)
+        if previous is None:
+            del self.changes[(change.tenant_id, change.task_id)]
+            return
+        self.changes[(change.tenant_id, change.task_id)] = previous
+        if previous in log.entries:
+            log.superseded -= 1
+        else:
+            # Compacted away meanwhile; put it back in sequence order
+            insort(log.entries, previous, key=lambda entry: entry.seq)
+    
+    def log_change(
+        self, db: Session, tenant_id: str, task_id: str, operation: str, changed_at: Optional[datetime] = None
+    ) -> None:
+        """Make ``operation`` the task's latest change, superseding the previous one"""
+        # Sequences are never reused, even when the write is rolled back
+        self.seq += 1
+        change = MemoryTaskChange(self.seq, tenant_id, task_id, operation, changed_at or _utcnow())
+        previous = self.changes.get((tenant_id, task_id))
+        self._log(change, previous)
+        self._record(db, lambda: self._unlog(change, previous))
+    
+    def changes_after(self, tenant_id: Optional[str], seq: int) -> Iterator[MemoryTaskChange]:
+        """Current changes with a sequence above ``seq``, in sequence order"""
+        if tenant_id is not None:
+            logs = [self.change_logs[tenant_id]] if tenant_id in self.change_logs else []
+        else:
+            logs = list(self.change_logs.values())
+        streams = []
+        for log in logs:
+            start = bisect_right(log.entries, seq, key=lambda entry: entry.seq)
+            streams.append(islice(log.entries, start, None))
+        for change in heapq.merge(*streams, key=lambda entry: entry.seq):
+            if self.changes.get((change.tenant_id, change.task_id)) is change:
+                yield change
+    
+    # -- counters and analytics ------------------------------------------------
+    
+    def _add_counts(self, tenant_id: str, deltas: Tuple[int, int, int]) -> None:
+        counts = self.counts.setdefault(tenant_id, [0, 0, 0])
+        for position, delta in enumerate(deltas):
+            counts[position] += delta
+    
+    def count(self, db: Session, tenant_id: str, total: int = 0, completed: int = 0, archived: int = 0) -> None:
+        """Adjust a tenant's counters as part of the current write"""
+        self._add_counts(tenant_id, (total, completed, archived))
+        self._record(db, lambda: self._add_counts(tenant_id, (-total, -completed, -archived)))
+    
+    def _add_daily(self, tenant_id: str, day: date, created: int, completed: int) -> None:
+        counts = self.daily[tenant_id].setdefault(day, [0, 0])
+        counts[0] += created
+        counts[1] += completed
+    
+    def count_day(self, db: Session, tenant_id: str, day: date, created: int = 0, completed: int = 0) -> None:
+        self._add_daily(tenant_id, day, created, completed)
+        self._record(db, lambda: self._add_daily(tenant_id, day, -created, -completed))
+    
+    def _add_histogram(self, tenant_id: str, day: date, bucket: int, delta: int) -> None:
+        histogram = self.histogram[tenant_id]
+        histogram[(day, bucket)] = histogram.get((day, bucket), 0) + delta
+    
+    def _set_completion(self, task_id: str, completion: Optional[Tuple[datetime, int]]) -> None:
+        if completion is None:
+            self.completions.pop(task_id, None)
+        else:
+            self.completions[task_id] = completion
+    
+    def add_completion(self, db: Session, task: MemoryTask, completed_at: datetime) -> None:
+        bucket = duration_bucket((completed_at - task.created_at).total_seconds())
+        previous = self.completions.get(task.id)
+        self._set_completion(task.id, (completed_at, bucket))
+        self._record(db, lambda: self._set_completion(task.id, previous))
+        self._count_completion(db, task.tenant_id, completed_at, bucket, 1)
+    
+    def remove_completion(self, db: Session, task: MemoryTask) -> None:
+        removed = self.completions.get(task.id)
+        if removed is None:
+            return
+        self._set_completion(task.id, None)
+        self._record(db, lambda: self._set_completion(task.id, removed))
+        self._count_completion(db, task.tenant_id, removed[0], removed[1], -1)
+    
+    def _count_completion(self, db: Session, tenant_id: str, completed_at: datetime, bucket: int, delta: int) -> None:
+        day = completed_at.date()
+        self.count_day(db, tenant_id, day, completed=delta)
+        self._add_histogram(tenant_id, day, bucket, delta)
+        self._record(db, lambda: self._add_histogram(tenant_id, day, bucket, -delta))
+    
+    def _assign(self, tables: Dict) -> None:
+        for name, value in tables.items():
+            setattr(self, name, value)
+    
+    def replace(self, db: Session, **tables) -> None:
+        """Swap whole derived tables (counts, daily, histogram, completions) for rebuilt ones"""
+        previous = {name: getattr(self, name) for name in tables}
+        self._assign(tables)
+        self._record(db, lambda: self._assign(previous))
+    
+    # -- snapshots ---------------------------------------------------------------
+    
+    def to_snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "version": SNAPSHOT_VERSION,
+                "seq": self.seq,
+                "tasks": [asdict(task) for task in self.tasks.values()],
+                "archive": [asdict(task) for task in self.archive.values()],
+                "changes": [asdict(change) for change in sorted(self.changes.values(), key=lambda c: c.seq)],
+                "counts": self.counts,
+                "daily": [
+                    [tenant_id, day, *counts] for tenant_id, days in self.daily.items() for day, counts in days.items()
+                ],
+                "histogram": [
+                    [tenant_id, day, bucket, count]
+                    for tenant_id, buckets in self.histogram.items() for (day, bucket), count in buckets.items()
+                ],
+                "completions": [[task_id, at, bucket] for task_id, (at, bucket) in self.completions.items()],
+            }
+    
+    def load_snapshot_data(self, data: dict) -> None:
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported task snapshot version {data.get('version')}")
+        
+        def task(row: dict) -> MemoryTask:
+            return MemoryTask(**{
+                **row,
+                "created_at": datetime.fromisoformat(row["created_at"]),
+                "updated_at": datetime.fromisoformat(row["updated_at"]),
+            })
+        
+        with self.lock:
+            self.clear()
+            for row in data["tasks"]:
+                self._add(task(row))
+            for row in data["archive"]:
+                self._add(task(row), archived=True)
+            for row in data["changes"]:
+                change = MemoryTaskChange(**{**row, "changed_at": datetime.fromisoformat(row["changed_at"])})
+                self._log(change, None)
+            self.seq = data["seq"]
+            self.counts = {tenant_id: list(counts) for tenant_id, counts in data["counts"].items()}
+            for tenant_id, day, created, completed in data["daily"]:
+                self.daily[tenant_id][date.fromisoformat(day)] = [created, completed]
+            for tenant_id, day, bucket, count in data["histogram"]:
+                self.histogram[tenant_id][(date.fromisoformat(day), bucket)] = count
+            for task_id, at, bucket in data["completions"]:
+                self.completions[task_id] = (datetime.fromisoformat(at), bucket)
+    
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """Write the store to ``path`` atomically; returns how many tasks it holds"""
+        path = path or self.snapshot_path
+        data = self.to_snapshot()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file, default=lambda value: value.isoformat())
+        os.replace(temporary, path)
+        return len(data["tasks"]) + len(data["archive"])
+    
+    def load_snapshot(self, path: Optional[str] = None) -> bool:
+        """Replace the store's contents with the snapshot at ``path``; False if there is none"""
+        path = path or self.snapshot_path
+        if not path or not os.path.exists(path):
+            return False
+        with open(path) as file:
+            self.load_snapshot_data(json.load(file))
+        logger.info(f"Loaded {len(self.tasks)} tasks and {len(self.archive)} archived tasks from {path}")
+        return True
+    
+    async def run_snapshots(self, interval: float) -> None:
+        """Save a snapshot every ``interval`` seconds without blocking the event loop"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.save_snapshot)
+            except OSError as e:
+                logger.warning(f"Task snapshot failed: {e}")
+
+
+class MemoryAnalyticsRepository:
+    """Per-day created/completed counts and time-to-complete histograms,
+    maintained exactly like :class:`AnalyticsRepository` does in SQL
+    """
+    
+    def __init__(self, store: MemoryTaskStore):
+        self.store = store
+    
+    def record(self, db: Session, task: MemoryTask, operation: str, completion_changed: bool = True) -> None:
+        now = _utcnow()
+        store = self.store
+        if operation == "create":
+            store.count_day(db, task.tenant_id, task.created_at.date(), created=1)
+            if task.completed:
+                store.add_completion(db, task, now)
+        elif operation == "delete":
+            store.count_day(db, task.tenant_id, task.created_at.date(), created=-1)
+            if task.completed:
+                store.remove_completion(db, task)
+        elif completion_changed:
+            if task.completed:
+                store.add_completion(db, task, now)
+            else:
+                store.remove_completion(db, task)
+    
+    def get_range(
+        self, db: Session, start: date, end: date, tenant_id: Optional[str] = None
+    ) -> Tuple[List[tuple], List[tuple]]:
+        with self.store.lock:
+            tenants = [tenant_id] if tenant_id is not None else list(self.store.daily)
+            days: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+            histogram: Dict[Tuple[date, int], int] = defaultdict(int)
+            for tenant in tenants:
+                for day, (created, completed) in self.store.daily.get(tenant, {}).items():
+                    if start <= day <= end:
+                        days[day][0] += created
+                        days[day][1] += completed
+                for (day, bucket), count in self.store.histogram.get(tenant, {}).items():
+                    if start <= day <= end and count > 0:
+                        histogram[(day, bucket)] += count
+            return (
+                [(day, created, completed) for day, (created, completed) in sorted(days.items())],
+                [(day, bucket, count) for (day, bucket), count in histogram.items()],
+            )
+    
+    def is_empty(self, db: Session) -> bool:
+        with self.store.lock:
+            return not any(self.store.daily.values())
+    
+    def rebuild(self, db: Session, batch_size: int = 1000) -> Dict[str, int]:
+        """Recompute every rollup, keeping recorded completion times"""
+        store = self.store
+        with store.lock:
+            daily: Dict[str, Dict[date, List[int]]] = defaultdict(dict)
+            histogram: Dict[str, Dict[Tuple[date, int], int]] = defaultdict(dict)
+            completions: Dict[str, Tuple[datetime, int]] = {}
+            for task in [*store.tasks.values(), *store.archive.values()]:
+                daily[task.tenant_id].setdefault(task.created_at.date(), [0, 0])[0] += 1
+                if not task.completed:
+                    continue
+                recorded = store.completions.get(task.id)
+                completed_at = recorded[0] if recorded else task.updated_at
+                bucket = duration_bucket((completed_at - task.created_at).total_seconds())
+                completions[task.id] = (completed_at, bucket)
+                day = completed_at.date()
+                daily[task.tenant_id].setdefault(day, [0, 0])[1] += 1
+                histogram[task.tenant_id][(day, bucket)] = histogram[task.tenant_id].get((day, bucket), 0) + 1
+            store.replace(db, daily=daily, histogram=histogram, completions=completions)
+            return {
+                "days": len({day for days in daily.values() for day in days}),
+                "tasks": len(store.tasks) + len(store.archive),
+                "completed": len(completions),
+            }
+
+
+class MemoryTaskRepository:
+    """Task repository over a :class:`MemoryTaskStore`.
+    
+    Reads take a ``tenant_id`` and only see that tenant's tasks; ``None``
+    reads across all tenants, for maintenance and internal callers.
+    """
+    
+    change_feed_width = 1
+    
+    def __init__(self, store: MemoryTaskStore, analytics: MemoryAnalyticsRepository):
+        self.store = store
+        self.analytics = analytics
+    
+    def _visible(self, task: Optional[MemoryTask], tenant_id: Optional[str]) -> Optional[MemoryTask]:
+        if task is not None and tenant_id is not None and task.tenant_id != tenant_id:
+            return None
+        return task
+    
+    def _on_change(self, db: Session, task: MemoryTask, operation: str, completion_changed: bool) -> None:
+        store = self.store
+        store.log_change(db, task.tenant_id, task.id, CHANGE_DELETE if operation == "delete" else CHANGE_UPSERT)
+        self.analytics.record(db, task, operation, completion_changed)
+        completed = 1 if task.completed else 0
+        if operation == "create":
+            store.count(db, task.tenant_id, total=1, completed=completed)
+        elif operation == "delete":
+            store.count(db, task.tenant_id, total=-1, completed=-completed)
+        elif completion_changed:
+            store.count(db, task.tenant_id, completed=1 if completed else -1)
+    
+    def get(self, db: Session, id: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        with self.store.lock:
+            return self._visible(self.store.tasks.get(id), tenant_id)
+    
+    def get_many(self, db: Session, ids: Sequence[str], tenant_id: Optional[str] = None) -> Dict[str, MemoryTask]:
+        """Tasks, live or archived, among ``ids``, by id"""
+        with self.store.lock:
+            found = {}
+            for task_id in ids:
+                task = self._visible(self.store.tasks.get(task_id) or self.store.archive.get(task_id), tenant_id)
+                if task is not None:
+                    found[task_id] = task
+            return found
+    
+    def get_multi(
+        self, db: Session, *, skip: int = 0, limit: int = 100, include_archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[MemoryTask]:
+        """Page through live tasks, continuing into the archive when asked to"""
+        with self.store.lock:
+            tasks = list(islice(self.store.ordered(tenant_id), skip, skip + limit))
+            if include_archived and len(tasks) < limit:
+                archive_skip = 0 if tasks or not skip else max(0, skip - self.count(db, tenant_id))
+                archived = self.store.ordered(tenant_id, archived=True)
+                tasks += islice(archived, archive_skip, archive_skip + limit - len(tasks))
+            return tasks
+    
+    def get_page_after(
+        self, db: Session, after: Optional[PageKey], limit: int, archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[MemoryTask]:
+        """Up to ``limit`` live (or archived) tasks after ``after`` in ``(created_at, id)`` order"""
+        with self.store.lock:
+            return list(islice(self.store.ordered(tenant_id, archived, after=after), limit))
+    
+    def create(self, db: Session, *, obj_in: TaskCreate, tenant_id: Optional[str] = None) -> MemoryTask:
+        data = obj_in.dict()
+        now = _utcnow()
+        task = MemoryTask(
+            id=generate_uuid(),
+            tenant_id=tenant_id or DEFAULT_TENANT,
+            title=data["title"],
+            description=data.get("description", ""),
+            completed=data.get("completed", False),
+            created_at=now,
+            updated_at=now,
+        )
+        with self.store.lock:
+            self.store.insert(db, task)
+            self._on_change(db, task, "create", completion_changed=task.completed)
+        return task
+    
+    def update(self, db: Session, *, db_obj: MemoryTask, obj_in: TaskUpdate) -> MemoryTask:
+        values = {
+            field: value for field, value in obj_in.dict(exclude_unset=True).items()
+            if field in _UPDATABLE_FIELDS and getattr(db_obj, field) != value
+        }
+        with self.store.lock:
+            completion_changed = "completed" in values
+            if values:
+                self.store.set_fields(db, db_obj, **values, updated_at=_utcnow())
+            self._on_change(db, db_obj, "update", completion_changed)
+        return db_obj
+    
+    def delete(self, db: Session, *, id: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        with self.store.lock:
+            task = self.get(db, id, tenant_id)
+            if task:
+                self._on_change(db, task, "delete", completion_changed=False)
+                self.store.remove(db, task)
+            return task
+    
+    def count(self, db: Session, tenant_id: Optional[str] = None) -> int:
+        with self.store.lock:
+            if tenant_id is None:
+                return len(self.store.tasks)
+            return len(self.store.created_index.get(tenant_id, ()))
+    
+    def toggle_completion(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        with self.store.lock:
+            task = self.get(db, task_id, tenant_id)
+            if task:
+                self.store.set_fields(db, task, completed=not task.completed, updated_at=_utcnow())
+                self._on_change(db, task, "update", completion_changed=True)
+            return task
+    
+    def get_by_title(self, db: Session, title: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        with self.store.lock:
+            return next((task for task in self.store.ordered(tenant_id) if task.title == title), None)
+    
+    def get_completed_tasks(
+        self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[MemoryTask]:
+        with self.store.lock:
+            tasks = self.store.by_completion(tenant_id, True)
+            if include_archived:
+                tasks += [task for task in self.store.ordered(tenant_id, archived=True) if task.completed]
+            return tasks
+    
+    def get_pending_tasks(self, db: Session, tenant_id: Optional[str] = None) -> List[MemoryTask]:
+        with self.store.lock:
+            return self.store.by_completion(tenant_id, False)
+    
+    def search_tasks(
+        self, db: Session, query: str, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[MemoryTask]:
+        term = query.casefold()
+        
+        def matches(task: MemoryTask) -> bool:
+            return term in task.title.casefold() or term in (task.description or "").casefold()
+        
+        with self.store.lock:
+            tasks = [task for task in self.store.ordered(tenant_id) if matches(task)]
+            if include_archived:
+                tasks += [task for task in self.store.ordered(tenant_id, archived=True) if matches(task)]
+            return tasks
+    
+    def get_task_stats(self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None) -> dict:
+        with self.store.lock:
+            if tenant_id is not None:
+                total, completed, archived = self.get_counts(db, tenant_id)
+            else:
+                total = len(self.store.tasks)
+                completed = sum(
+                    len(ids) for (_, state), ids in self.store.completed_index.items() if state
+                )
+                archived = len(self.store.archive) if include_archived else 0
+        if include_archived:
+            # Only completed tasks are ever archived
+            total += archived
+            completed += archived
+        pending = total - completed
+        completion_rate = (completed / total * 100) if total > 0 else 0
+        return {
+            "total_tasks": total,
+            "completed_tasks": completed,
+            "pending_tasks": pending,
+            "completion_rate": completion_rate
+        }
+    
+    def get_archived(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        with self.store.lock:
+            return self._visible(self.store.archive.get(task_id), tenant_id)
+    
+    def count_archived(self, db: Session, tenant_id: Optional[str] = None) -> int:
+        with self.store.lock:
+            if tenant_id is None:
+                return len(self.store.archive)
+            return len(self.store.archive_index.get(tenant_id, ()))
+    
+    def restore(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[MemoryTask]:
+        """Move an archived task back to the live tasks so it can be written"""
+        with self.store.lock:
+            task = self.get_archived(db, task_id, tenant_id)
+            if task is None:
+                return None
+            self.store.remove(db, task, archived=True)
+            self.store.insert(db, task)
+            self.store.count(db, task.tenant_id, total=1, completed=1 if task.completed else 0, archived=-1)
+            return task
+    
+    def archive_completed(
+        self, db: Session, completed_before: datetime, after: Optional[ArchiveKey], limit: int
+    ) -> Tuple[int, Optional[ArchiveKey]]:
+        """Move up to ``limit`` tasks completed before ``completed_before`` to
+        the archive, in ``(tenant_id, updated_at, id)`` order after ``after``
+        """
+        completed_before = _utc(completed_before)
+        resume = (after[0], _utc(after[1]), after[2]) if after is not None else None
+        with self.store.lock:
+            batch: List[MemoryTask] = []
+            for tenant_id in sorted(self.store.counts):
+                if resume is not None and tenant_id < resume[0]:
+                    continue
+                completed_ids = self.store.completed_index.get((tenant_id, True), ())
+                completed = (self.store.tasks[task_id] for task_id in completed_ids)
+                candidates = sorted(
+                    (
+                        task for task in completed
+                        if task.updated_at < completed_before
+                        and (resume is None or (tenant_id, task.updated_at, task.id) > resume)
+                    ),
+                    key=lambda task: (task.updated_at, task.id),
+                )
+                batch += candidates[:limit - len(batch)]
+                if len(batch) == limit:
+                    break
+            if not batch:
+                return 0, after
+            
+            for task in batch:
+                self.store.remove(db, task)
+                self.store.insert(db, task, archived=True)
+                self.store.count(db, task.tenant_id, total=-1, completed=-1, archived=1)
+            last = batch[-1]
+            return len(batch), (last.tenant_id, last.updated_at, last.id)
+    
+    def get_changes(
+        self, db: Session, cursor: List[int], limit: int, tenant_id: Optional[str] = None
+    ) -> Tuple[List[MemoryTaskChange], Dict[str, MemoryTask], List[int], bool]:
+        with self.store.lock:
+            changes = list(islice(self.store.changes_after(tenant_id, cursor[0]), limit + 1))
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+            tasks = {}
+            for change in changes:
+                if change.operation == CHANGE_UPSERT:
+                    task = self.store.tasks.get(change.task_id) or self.store.archive.get(change.task_id)
+                    if task is not None:
+                        tasks[task.id] = task
+            next_cursor = [changes[-1].seq if changes else cursor[0]]
+            return changes, tasks, next_cursor, has_more
+    
+    def backfill_changes(self, db: Session, batch_size: int = 1000) -> int:
+        """Log tasks that have no change yet (from an older snapshot)"""
+        with self.store.lock:
+            missing = sorted(
+                (task for task in self.store.tasks.values() if (task.tenant_id, task.id) not in self.store.changes),
+                key=lambda task: task.updated_at,
+            )
+            for task in missing:
+                self.store.log_change(db, task.tenant_id, task.id, CHANGE_UPSERT, task.updated_at)
+            return len(missing)
+    
+    def get_counts(self, db: Session, tenant_id: str) -> Tuple[int, int, int]:
+        with self.store.lock:
+            return tuple(self.store.counts.get(tenant_id, (0, 0, 0)))
+    
+    def has_counts(self, db: Session) -> bool:
+        with self.store.lock:
+            return bool(self.store.counts)
+    
+    def rebuild_counts(self, db: Session) -> Dict[str, Dict[str, int]]:
+        """Recount every tenant's tasks and replace the counters with the result"""
+        with self.store.lock:
+            counts: Dict[str, Dict[str, int]] = {}
+            
+            def tally(tenant_id: str) -> Dict[str, int]:
+                return counts.setdefault(tenant_id, {"total": 0, "completed": 0, "archived": 0})
+            
+            for task in self.store.tasks.values():
+                tally(task.tenant_id)["total"] += 1
+                tally(task.tenant_id)["completed"] += 1 if task.completed else 0
+            for task in self.store.archive.values():
+                tally(task.tenant_id)["archived"] += 1
+            self.store.replace(db, counts={
+                tenant_id: [tenant_counts["total"], tenant_counts["completed"], tenant_counts["archived"]]
+                for tenant_id, tenant_counts in counts.items()
+            })
+            return counts
@@ -0,0 +1,126 @@
+"""
+app/repositories/protocol.py - What TaskService needs from a task storage backend
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+from sqlalchemy.orm import Session
+
+from app.schemas.task import TaskCreate, TaskUpdate
+
+# Position of the archiver within completed tasks: (tenant_id, updated_at, id)
+ArchiveKey = Tuple[str, datetime, str]
+
+# Position of a keyset page within tasks: (created_at, id) of its last task
+PageKey = Tuple[datetime, str]
+
+
+class TaskRecord(Protocol):
+    """A stored task, live or archived, as backends hand it out"""
+    
+    id: str
+    tenant_id: str
+    title: str
+    description: Optional[str]
+    completed: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+class TaskChangeRecord(Protocol):
+    """The latest change of a task in the delta-sync feed"""
+    
+    seq: int
+    tenant_id: str
+    task_id: str
+    operation: str
+    changed_at: datetime
+
+
+@runtime_checkable
+class TaskRepositoryProtocol(Protocol):
+    """Task storage.
+    
+    Every method takes the caller's session: backends that keep tasks
+    elsewhere still use it to join (and roll back with) the caller's unit of
+    work. ``tenant_id=None`` reads across all tenants. Lists of tasks come
+    in ``(created_at, id)`` order, live tasks before archived ones.
+    """
+    
+    # Number of sequence positions in a change-feed cursor
+    change_feed_width: int
+    
+    def get(self, db: Session, id: Any, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def get_many(
+        self, db: Session, ids: Sequence[str], tenant_id: Optional[str] = None
+    ) -> Dict[str, TaskRecord]: ...
+    
+    def get_multi(
+        self, db: Session, *, skip: int = 0, limit: int = 100, include_archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[TaskRecord]: ...
+    
+    def get_page_after(
+        self, db: Session, after: Optional[PageKey], limit: int, archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[TaskRecord]: ...
+    
+    def create(self, db: Session, *, obj_in: TaskCreate, tenant_id: Optional[str] = None) -> TaskRecord: ...
+    
+    def update(self, db: Session, *, db_obj: TaskRecord, obj_in: TaskUpdate) -> TaskRecord: ...
+    
+    def delete(self, db: Session, *, id: Any, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def count(self, db: Session, tenant_id: Optional[str] = None) -> int: ...
+    
+    def toggle_completion(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def get_by_title(self, db: Session, title: str, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def get_completed_tasks(
+        self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[TaskRecord]: ...
+    
+    def get_pending_tasks(self, db: Session, tenant_id: Optional[str] = None) -> List[TaskRecord]: ...
+    
+    def search_tasks(
+        self, db: Session, query: str, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[TaskRecord]: ...
+    
+    def get_task_stats(self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None) -> dict: ...
+    
+    def get_archived(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def count_archived(self, db: Session, tenant_id: Optional[str] = None) -> int: ...
+    
+    def restore(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[TaskRecord]: ...
+    
+    def archive_completed(
+        self, db: Session, completed_before: datetime, after: Optional[ArchiveKey], limit: int
+    ) -> Tuple[int, Optional[ArchiveKey]]: ...
+    
+    def get_changes(
+        self, db: Session, cursor: List[int], limit: int, tenant_id: Optional[str] = None
+    ) -> Tuple[List[TaskChangeRecord], Dict[str, TaskRecord], List[int], bool]: ...
+    
+    def backfill_changes(self, db: Session, batch_size: int = 1000) -> int: ...
+    
+    def get_counts(self, db: Session, tenant_id: str) -> Tuple[int, int, int]: ...
+    
+    def has_counts(self, db: Session) -> bool: ...
+    
+    def rebuild_counts(self, db: Session) -> Dict[str, Dict[str, int]]: ...
+
+
+@runtime_checkable
+class AnalyticsRepositoryProtocol(Protocol):
+    """Created/completed rollups kept in step with the task writes"""
+    
+    def get_range(
+        self, db: Session, start: date, end: date, tenant_id: Optional[str] = None
+    ) -> Tuple[Sequence[tuple], Sequence[tuple]]: ...
+    
+    def is_empty(self, db: Session) -> bool: ...
+    
+    def rebuild(self, db: Session, batch_size: int = 1000) -> Dict[str, int]: ...
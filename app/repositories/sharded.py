@@ -0,0 +1,188 @@
+"""
+app/repositories/sharded.py - Task repository for hash-sharded storage
+"""
+import heapq
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, case, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+from sqlalchemy.orm import Session
+
+from app.core.sharding import ShardRouter
+from app.core.tracing import trace_methods
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.task_change import TaskChange
+from app.repositories.task import TaskRepository, settled_changes
+
+
+def _order_key(task):
+    return (task.created_at, task.id)
+
+
+@trace_methods
+class ShardedTaskRepository(TaskRepository):
+    """Task repository that scatter-gathers multi-row reads across shards.
+
+    Point reads and writes are routed to a single shard by the session's
+    :class:`ShardRouter`; queries that span shards run once per shard and the
+    ordered partial results are k-way merged.
+    """
+
+    def __init__(self, router: ShardRouter):
+        super().__init__()
+        self.router = router
+    
+    @property
+    def change_feed_width(self) -> int:
+        return len(self.router.shard_ids)
+
+    def _per_shard(self, statement: Select) -> Iterable[Select]:
+        for shard_id in self.router.shard_ids:
+            yield statement.options(set_shard_id(shard_id))
+
+    def _merge(
+        self, db: Session, statement: Select, skip: int = 0, limit: Optional[int] = None, entity=Task
+    ) -> List:
+        statement = statement.order_by(entity.created_at, entity.id)
+        if limit is not None:
+            # Every shard must supply enough rows to cover the requested window
+            statement = statement.limit(skip + limit)
+        partials = [db.scalars(shard_statement).all() for shard_statement in self._per_shard(statement)]
+        merged = heapq.merge(*partials, key=_order_key)
+        stop = skip + limit if limit is not None else None
+        return list(islice(merged, skip, stop))
+
+    def _live_page(self, db: Session, skip: int, limit: int, tenant_id: Optional[str] = None) -> List[Task]:
+        return self._merge(db, self._scoped(select(Task), tenant_id), skip=skip, limit=limit)
+
+    def _read_archive(
+        self, db: Session, statement: Select, skip: int = 0, limit: Optional[int] = None
+    ) -> List[TaskArchive]:
+        return self._merge(db, statement, skip=skip, limit=limit, entity=TaskArchive)
+
+    def _keyset_page(self, db: Session, statement: Select, limit: int, entity) -> List:
+        return self._merge(db, statement, limit=limit, entity=entity)
+
+    def count(self, db: Session, tenant_id: Optional[str] = None) -> int:
+        try:
+            return sum(
+                db.scalar(shard_statement)
+                for shard_statement in self._per_shard(self._scoped(select(func.count(Task.id)), tenant_id))
+            )
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def count_archived(self, db: Session, tenant_id: Optional[str] = None) -> int:
+        try:
+            statement = self._scoped(select(func.count(TaskArchive.id)), tenant_id, TaskArchive)
+            return sum(db.scalar(shard_statement) for shard_statement in self._per_shard(statement))
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def get_by_title(self, db: Session, title: str, tenant_id: Optional[str] = None) -> Optional[Task]:
+        try:
+            matches = self._merge(db, self._scoped(select(Task).where(Task.title == title), tenant_id), limit=1)
+            return matches[0] if matches else None
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def get_completed_tasks(
+        self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[Task]:
+        try:
+            tasks = self._merge(db, self._scoped(select(Task).where(Task.completed == True), tenant_id))
+            if include_archived:
+                tasks += self._read_archive(db, self._scoped(
+                    select(TaskArchive).where(TaskArchive.completed == True), tenant_id, TaskArchive
+                ))
+            return tasks
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def get_pending_tasks(self, db: Session, tenant_id: Optional[str] = None) -> List[Task]:
+        try:
+            return self._merge(db, self._scoped(select(Task).where(Task.completed == False), tenant_id))
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def search_tasks(
+        self, db: Session, query: str, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[Task]:
+        try:
+            search_term = f"%{query}%"
+            tasks = self._merge(db, self._scoped(select(Task).where(
+                (Task.title.ilike(search_term)) |
+                (Task.description.ilike(search_term))
+            ), tenant_id))
+            if include_archived:
+                tasks += self._read_archive(db, self._scoped(select(TaskArchive).where(
+                    (TaskArchive.title.ilike(search_term)) |
+                    (TaskArchive.description.ilike(search_term))
+                ), tenant_id, TaskArchive))
+            return tasks
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+
+    def _task_totals(self, db: Session) -> Tuple[int, int]:
+        totals = select(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0),
+        )
+        total = completed = 0
+        for shard_statement in self._per_shard(totals):
+            shard_total, shard_completed = db.execute(shard_statement).one()
+            total += shard_total
+            completed += shard_completed
+        return total, completed
+    
+    def get_changes(
+        self, db: Session, cursor: List[int], limit: int, tenant_id: Optional[str] = None
+    ) -> Tuple[List[TaskChange], Dict[str, Task], List[int], bool]:
+        """Merge per-shard change logs, carrying one sequence per shard in the cursor.
+        
+        Changes are interleaved by ``changed_at``; from each shard only a
+        gap-free prefix of its sequence is returned so no change is skipped.
+        """
+        try:
+            candidates = []
+            has_more = False
+            for position, shard_id in enumerate(self.router.shard_ids):
+                rows = db.scalars(
+                    self._scoped(select(TaskChange), tenant_id, TaskChange)
+                    .where(TaskChange.seq > cursor[position])
+                    .order_by(TaskChange.seq)
+                    .limit(limit + 1)
+                    .options(set_shard_id(shard_id))
+                ).all()
+                settled = settled_changes(rows[:limit], db.get_bind(shard_id=shard_id))
+                has_more = has_more or (len(rows) > limit and len(settled) == limit)
+                candidates.extend((row.changed_at, position, row) for row in settled)
+            
+            candidates.sort(key=lambda item: (item[0], item[1], item[2].seq))
+            selected = {id(row) for _, _, row in candidates[:limit]}
+            has_more = has_more or len(candidates) > limit
+            
+            changes: List[TaskChange] = []
+            next_cursor = list(cursor)
+            for position in range(len(self.router.shard_ids)):
+                for _, row_position, row in sorted(
+                    (item for item in candidates if item[1] == position), key=lambda item: item[2].seq
+                ):
+                    if id(row) not in selected:
+                        break
+                    changes.append(row)
+                    next_cursor[row_position] = row.seq
+            changes.sort(key=lambda change: (change.changed_at, change.seq))
+            return changes, self._get_changed_tasks(db, changes), next_cursor, has_more
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
@@ -1,70 +1,463 @@
 """
 app/repositories/task.py - Task-specific repository
 """
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Select, and_, case, delete, func, insert, inspect, lambda_stmt, or_, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
+from app.core.tracing import trace_methods
 from app.models.task import Task
+from app.models.task_counts import TenantTaskCounts
+from app.models.task_archive import TaskArchive, ARCHIVED_COLUMNS
+from app.models.task_change import TaskChange, CHANGE_UPSERT, CHANGE_DELETE
 from app.schemas.task import TaskCreate, TaskUpdate
+from app.repositories.analytics import analytics_repository
 from app.repositories.base import BaseRepository
+from app.repositories.protocol import ArchiveKey, PageKey
 
 
+# Keeps IN (...) lists below SQLite's bound-parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+
+# Outside SQLite, whose writers are serialized, a transaction can commit its
+# change after a later sequence number is already visible. Changes younger
+# than this are held back from the feed so a cursor never moves past a
+# sequence number that is still uncommitted; writes must commit within it.
+CHANGE_SETTLE_SECONDS = 5.0
+
+
+def settled_changes(changes: List[TaskChange], bind) -> List[TaskChange]:
+    """The prefix of ``changes`` (in sequence order) old enough to be final on ``bind``"""
+    if bind.dialect.name == "sqlite":
+        return changes
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=CHANGE_SETTLE_SECONDS)
+    for index, change in enumerate(changes):
+        changed_at = change.changed_at
+        if changed_at.tzinfo is None:
+            changed_at = changed_at.replace(tzinfo=timezone.utc)
+        if changed_at > settled_before:
+            return changes[:index]
+    return changes
+
+
+@trace_methods
 class TaskRepository(BaseRepository[Task, TaskCreate, TaskUpdate]):
-    """Task repository with task-specific operations"""
+    """Task repository with task-specific operations.
+    
+    Reads take a ``tenant_id`` and only see that tenant's tasks; ``None``
+    reads across all tenants, for maintenance and internal callers.
+    """
+    
+    # Number of sequence positions in a change-feed cursor
+    change_feed_width = 1
     
     def __init__(self):
         super().__init__(Task)
     
-    def get_by_title(self, db: Session, title: str) -> Optional[Task]:
+    def _on_change(
+        self, db: Session, db_obj: Task, operation: str, completion_changed: Optional[bool] = None
+    ) -> None:
+        if completion_changed is None:
+            # Read before the statements below autoflush the pending update
+            completion_changed = inspect(db_obj).attrs.completed.history.has_changes()
+        if operation == "create" and db_obj.created_at is None:
+            # Set here rather than by the database so the analytics rollups
+            # count the task on the same day as its created_at, without a reload
+            db_obj.created_at = db_obj.updated_at = datetime.now(timezone.utc)
+        if db_obj.id is None:
+            db.flush()
+        db.execute(
+            delete(TaskChange).where(TaskChange.tenant_id == db_obj.tenant_id, TaskChange.task_id == db_obj.id),
+            execution_options={"synchronize_session": False},
+        )
+        db.add(TaskChange(
+            tenant_id=db_obj.tenant_id,
+            task_id=db_obj.id,
+            operation=CHANGE_DELETE if operation == "delete" else CHANGE_UPSERT,
+            # Stamped when the sequence number is taken, not when the transaction began
+            changed_at=datetime.now(timezone.utc),
+        ))
+        analytics_repository.record(db, db_obj, operation, completion_changed)
+        
+        completed = 1 if db_obj.completed else 0
+        if operation == "create":
+            self._count(db, db_obj.tenant_id, total=1, completed=completed)
+        elif operation == "delete":
+            self._count(db, db_obj.tenant_id, total=-1, completed=-completed)
+        elif completion_changed:
+            self._count(db, db_obj.tenant_id, completed=1 if completed else -1)
+    
+    def _count(self, db: Session, tenant_id: str, total: int = 0, completed: int = 0, archived: int = 0) -> None:
+        """Adjust a tenant's counters as part of the current write"""
+        self._increment(
+            db, TenantTaskCounts, {"tenant_id": tenant_id},
+            {"total": total, "completed": completed, "archived": archived},
+        )
+    
+    def _get_by_ids(self, db: Session, ids: List[str], tenant_id: Optional[str] = None) -> Dict[str, Task]:
+        """Live or archived tasks with the given ids, one IN query per chunk and table"""
+        tasks: Dict[str, Task] = {}
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+            tasks.update(
+                (task.id, task) for task in db.scalars(self._scoped(select(Task).where(Task.id.in_(chunk)), tenant_id))
+            )
+            missing = [task_id for task_id in chunk if task_id not in tasks]
+            if missing:
+                statement = self._scoped(select(TaskArchive).where(TaskArchive.id.in_(missing)), tenant_id, TaskArchive)
+                tasks.update((task.id, task) for task in db.scalars(statement))
+        return tasks
+    
+    def _get_changed_tasks(self, db: Session, changes: Iterable[TaskChange]) -> Dict[str, Task]:
+        return self._get_by_ids(db, [change.task_id for change in changes if change.operation == CHANGE_UPSERT])
+    
+    def get_changes(
+        self, db: Session, cursor: List[int], limit: int, tenant_id: Optional[str] = None
+    ) -> Tuple[List[TaskChange], Dict[str, Task], List[int], bool]:
+        """Return changes after ``cursor`` in sequence order.
+        
+        Yields the changes, the live tasks they refer to keyed by id, the
+        cursor to resume from and whether more changes are waiting.
+        """
+        try:
+            after, fetch = cursor[0], limit + 1
+            statement = lambda_stmt(
+                lambda: select(TaskChange).where(TaskChange.seq > after).order_by(TaskChange.seq).limit(fetch)
+            )
+            if tenant_id is not None:
+                statement += lambda s: s.where(TaskChange.tenant_id == tenant_id)
+            changes = db.scalars(statement).all()
+            has_more = len(changes) > limit
+            changes = settled_changes(changes[:limit], db.get_bind())
+            has_more = has_more and len(changes) == limit
+            next_cursor = [changes[-1].seq if changes else cursor[0]]
+            return changes, self._get_changed_tasks(db, changes), next_cursor, has_more
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def backfill_changes(self, db: Session, batch_size: int = 1000) -> int:
+        """Log tasks that predate the change feed so a full sync sees them"""
+        try:
+            backfilled = 0
+            while True:
+                missing = db.execute(
+                    select(Task.id, Task.tenant_id, Task.updated_at)
+                    .outerjoin(TaskChange, TaskChange.task_id == Task.id)
+                    .where(TaskChange.seq.is_(None))
+                    .order_by(Task.updated_at)
+                    .limit(batch_size)
+                ).all()
+                if not missing:
+                    return backfilled
+                db.add_all(
+                    TaskChange(tenant_id=tenant_id, task_id=task_id, operation=CHANGE_UPSERT, changed_at=updated_at)
+                    for task_id, tenant_id, updated_at in missing
+                )
+                self._commit(db)
+                backfilled += len(missing)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def _live_page(self, db: Session, skip: int, limit: int, tenant_id: Optional[str] = None) -> List[Task]:
+        # Lambda statements skip rebuilding the select() on every call;
+        # skip, limit and the tenant become bound parameters of the cached statement.
+        statement = lambda_stmt(lambda: select(Task).order_by(Task.created_at, Task.id).offset(skip).limit(limit))
+        if tenant_id is not None:
+            statement += lambda s: s.where(Task.tenant_id == tenant_id)
+        return db.scalars(statement).all()
+    
+    def _read_archive(
+        self, db: Session, statement: Select, skip: int = 0, limit: Optional[int] = None
+    ) -> List[TaskArchive]:
+        statement = statement.order_by(TaskArchive.created_at, TaskArchive.id).offset(skip)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return db.scalars(statement).all()
+    
+    def get_multi(
+        self, db: Session, *, skip: int = 0, limit: int = 100, include_archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[Task]:
+        """Page through live tasks, continuing into the archive when asked to"""
+        try:
+            tasks = self._live_page(db, skip, limit, tenant_id)
+            if include_archived and len(tasks) < limit:
+                archive_skip = 0 if tasks or not skip else max(0, skip - self.count(db, tenant_id))
+                tasks = list(tasks) + self._read_archive(
+                    db, self._scoped(select(TaskArchive), tenant_id, TaskArchive),
+                    skip=archive_skip, limit=limit - len(tasks),
+                )
+            return tasks
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def _keyset_page(self, db: Session, statement: Select, limit: int, entity) -> List:
+        return db.scalars(statement.order_by(entity.created_at, entity.id).limit(limit)).all()
+    
+    def get_page_after(
+        self, db: Session, after: Optional[PageKey], limit: int, archived: bool = False,
+        tenant_id: Optional[str] = None,
+    ) -> List[Task]:
+        """Up to ``limit`` live (or archived) tasks after ``after`` in ``(created_at, id)`` order.
+        
+        Keyset paging: each page starts at an index seek, however deep it is,
+        and rows added or removed meanwhile do not shift later pages.
+        """
+        entity = TaskArchive if archived else Task
+        try:
+            statement = self._scoped(select(entity), tenant_id, entity)
+            if after is not None:
+                statement = statement.where(or_(
+                    entity.created_at > after[0],
+                    and_(entity.created_at == after[0], entity.id > after[1]),
+                ))
+            return self._keyset_page(db, statement, limit, entity)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_many(self, db: Session, ids: Sequence[str], tenant_id: Optional[str] = None) -> Dict[str, Task]:
+        """Tasks, live or archived, among ``ids`` (canonical id strings), by id"""
+        try:
+            return self._get_by_ids(db, list(ids), tenant_id)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_archived(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[TaskArchive]:
         try:
-            return db.query(Task).filter(Task.title == title).first()
+            archived = db.get(TaskArchive, task_id)
+            if archived is not None and tenant_id is not None and archived.tenant_id != tenant_id:
+                return None
+            return archived
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def get_completed_tasks(self, db: Session) -> List[Task]:
+    def count_archived(self, db: Session, tenant_id: Optional[str] = None) -> int:
         try:
-            return db.query(Task).filter(Task.completed == True).all()
+            return db.scalar(self._scoped(select(func.count()).select_from(TaskArchive), tenant_id, TaskArchive))
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def get_pending_tasks(self, db: Session) -> List[Task]:
+    def restore(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[Task]:
+        """Move an archived task back into ``tasks`` so it can be written.
+        
+        Flushes without committing: the restore becomes part of the write
+        that needed it.
+        """
         try:
-            return db.query(Task).filter(Task.completed == False).all()
+            archived = self.get_archived(db, task_id, tenant_id)
+            if archived is None:
+                return None
+            task = Task(**{column: getattr(archived, column) for column in ARCHIVED_COLUMNS})
+            db.delete(archived)
+            db.add(task)
+            self._count(db, task.tenant_id, total=1, completed=1 if task.completed else 0, archived=-1)
+            db.flush()
+            return task
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def archive_completed(
+        self, db: Session, completed_before: datetime, after: Optional[ArchiveKey], limit: int
+    ) -> Tuple[int, Optional[ArchiveKey]]:
+        """Move up to ``limit`` tasks completed before ``completed_before`` to the archive.
+        
+        Tenants are visited in turn, each over its own slice of the
+        ``(tenant_id, completed, updated_at)`` index; tasks are taken in
+        ``(tenant_id, updated_at, id)`` order starting after ``after``.
+        Returns how many moved and the key to resume from.
+        """
+        try:
+            tenants = select(TenantTaskCounts.tenant_id).order_by(TenantTaskCounts.tenant_id)
+            if after is not None:
+                tenants = tenants.where(TenantTaskCounts.tenant_id >= after[0])
+            batch: List[Task] = []
+            for tenant_id in db.scalars(tenants).all():
+                statement = select(Task).where(
+                    Task.tenant_id == tenant_id, Task.completed == True, Task.updated_at < completed_before
+                )
+                if after is not None and tenant_id == after[0]:
+                    statement = statement.where(or_(
+                        Task.updated_at > after[1],
+                        and_(Task.updated_at == after[1], Task.id > after[2]),
+                    ))
+                wanted = limit - len(batch)
+                statement = statement.order_by(Task.updated_at, Task.id).limit(wanted)
+                # Sharded sessions return each shard's prefix; keep the global one
+                batch += sorted(db.scalars(statement).all(), key=lambda task: (task.updated_at, task.id))[:wanted]
+                if len(batch) == limit:
+                    break
+            if not batch:
+                return 0, after
+            
+            for task in batch:
+                db.add(TaskArchive(**{column: getattr(task, column) for column in ARCHIVED_COLUMNS}))
+                db.delete(task)
+            for tenant_id, moved in Counter(task.tenant_id for task in batch).items():
+                self._count(db, tenant_id, total=-moved, completed=-moved, archived=moved)
+            last = (batch[-1].tenant_id, batch[-1].updated_at, batch[-1].id)
+            self._commit(db)
+            return len(batch), last
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_by_title(self, db: Session, title: str, tenant_id: Optional[str] = None) -> Optional[Task]:
+        try:
+            return db.scalars(self._scoped(select(Task).where(Task.title == title), tenant_id).limit(1)).first()
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_completed_tasks(
+        self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[Task]:
+        try:
+            statement = lambda_stmt(lambda: select(Task).where(Task.completed == True))
+            if tenant_id is not None:
+                statement += lambda s: s.where(Task.tenant_id == tenant_id)
+            statement += lambda s: s.order_by(Task.created_at, Task.id)
+            tasks = db.scalars(statement).all()
+            if include_archived:
+                tasks = list(tasks) + self._read_archive(db, self._scoped(
+                    select(TaskArchive).where(TaskArchive.completed == True), tenant_id, TaskArchive
+                ))
+            return tasks
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def get_pending_tasks(self, db: Session, tenant_id: Optional[str] = None) -> List[Task]:
+        try:
+            statement = lambda_stmt(lambda: select(Task).where(Task.completed == False))
+            if tenant_id is not None:
+                statement += lambda s: s.where(Task.tenant_id == tenant_id)
+            statement += lambda s: s.order_by(Task.created_at, Task.id)
+            return db.scalars(statement).all()
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def toggle_completion(self, db: Session, task_id: str) -> Optional[Task]:
+    def toggle_completion(self, db: Session, task_id: str, tenant_id: Optional[str] = None) -> Optional[Task]:
         try:
-            task = self.get(db, task_id)
+            # One UPDATE ... RETURNING instead of load, flush and refresh
+            statement = update(Task).where(Task.id == task_id)
+            if tenant_id is not None:
+                statement = statement.where(Task.tenant_id == tenant_id)
+            task = db.scalars(
+                statement.values(completed=~Task.completed).returning(Task),
+                execution_options={"populate_existing": True},
+            ).first()
             if task:
-                task.toggle_completion()
-                db.add(task)
-                db.commit()
-                db.refresh(task)
+                self._on_change(db, task, "update", completion_changed=True)
+                self._commit(db)
             return task
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def search_tasks(self, db: Session, query: str) -> List[Task]:
+    def search_tasks(
+        self, db: Session, query: str, include_archived: bool = False, tenant_id: Optional[str] = None
+    ) -> List[Task]:
         try:
             search_term = f"%{query}%"
-            return db.query(Task).filter(
-                (Task.title.ilike(search_term)) | 
+            statement = lambda_stmt(lambda: select(Task).where(
+                (Task.title.ilike(search_term)) |
                 (Task.description.ilike(search_term))
-            ).all()
+            ))
+            if tenant_id is not None:
+                statement += lambda s: s.where(Task.tenant_id == tenant_id)
+            statement += lambda s: s.order_by(Task.created_at, Task.id)
+            tasks = db.scalars(statement).all()
+            if include_archived:
+                tasks = list(tasks) + self._read_archive(db, self._scoped(select(TaskArchive).where(
+                    (TaskArchive.title.ilike(search_term)) |
+                    (TaskArchive.description.ilike(search_term))
+                ), tenant_id, TaskArchive))
+            return tasks
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def _task_totals(self, db: Session) -> Tuple[int, int]:
+        """Live task count and how many of them are completed"""
+        return tuple(db.execute(lambda_stmt(lambda: select(
+            func.count(Task.id),
+            func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0),
+        ))).one())
+    
+    def get_counts(self, db: Session, tenant_id: str) -> Tuple[int, int, int]:
+        """A tenant's live, completed and archived task counters"""
+        try:
+            counts = db.get(TenantTaskCounts, tenant_id)
+            return (counts.total, counts.completed, counts.archived) if counts else (0, 0, 0)
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def has_counts(self, db: Session) -> bool:
+        try:
+            return db.scalars(select(TenantTaskCounts.tenant_id).limit(1)).first() is not None
+        except SQLAlchemyError as e:
+            self._rollback(db)
+            raise e
+    
+    def rebuild_counts(self, db: Session) -> Dict[str, Dict[str, int]]:
+        """Recount every tenant's tasks and replace the counters with the result"""
+        try:
+            counts: Dict[str, Dict[str, int]] = {}
+            
+            def tally(tenant_id: str) -> Dict[str, int]:
+                return counts.setdefault(tenant_id, {"total": 0, "completed": 0, "archived": 0})
+            
+            # Sharded sessions return one group per tenant and shard; sum them
+            for tenant_id, total, completed in db.execute(
+                select(
+                    Task.tenant_id,
+                    func.count(Task.id),
+                    func.coalesce(func.sum(case((Task.completed == True, 1), else_=0)), 0),
+                ).group_by(Task.tenant_id)
+            ):
+                tally(tenant_id)["total"] += total
+                tally(tenant_id)["completed"] += completed
+            for tenant_id, archived in db.execute(
+                select(TaskArchive.tenant_id, func.count(TaskArchive.id)).group_by(TaskArchive.tenant_id)
+            ):
+                tally(tenant_id)["archived"] += archived
+            
+            db.execute(delete(TenantTaskCounts))
+            if counts:
+                db.execute(insert(TenantTaskCounts).values([
+                    {"tenant_id": tenant_id, **tenant_counts} for tenant_id, tenant_counts in sorted(counts.items())
+                ]))
+            self._commit(db)
+            return counts
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
     
-    def get_task_stats(self, db: Session) -> dict:
+    def get_task_stats(self, db: Session, include_archived: bool = False, tenant_id: Optional[str] = None) -> dict:
         try:
-            total = self.count(db)
-            completed = db.query(Task).filter(Task.completed == True).count()
+            if tenant_id is not None:
+                # One counters row rather than a count over the tenant's tasks
+                total, completed, archived = self.get_counts(db, tenant_id)
+            else:
+                total, completed = self._task_totals(db)
+                archived = self.count_archived(db) if include_archived else 0
+            if include_archived:
+                # Only completed tasks are ever archived
+                total += archived
+                completed += archived
             pending = total - completed
             completion_rate = (completed / total * 100) if total > 0 else 0
             
@@ -75,7 +468,7 @@ class TaskRepository(BaseRepository[Task, TaskCreate, TaskUpdate]):
                 "completion_rate": completion_rate
             }
         except SQLAlchemyError as e:
-            db.rollback()
+            self._rollback(db)
             raise e
 
 
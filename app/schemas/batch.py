@@ -0,0 +1,45 @@
+"""
+app/schemas/batch.py - Pydantic schemas for batched task operations
+"""
+from typing import Any, Dict, Literal, Optional
+from pydantic import BaseModel, Field, validator
+
+MAX_BATCH_OPERATIONS = 100
+
+
+class BatchOperation(BaseModel):
+    """A single task operation inside a batch"""
+    op: Literal["create", "get", "update", "toggle", "delete"] = Field(..., description="Operation to perform")
+    task_id: Optional[str] = Field(None, description="Target task identifier (all operations except create)")
+    data: Optional[Dict[str, Any]] = Field(None, description="Request body for create and update")
+    
+    @validator("task_id", always=True)
+    def validate_task_id(cls, v: Optional[str], values: dict) -> Optional[str]:
+        if values.get("op") != "create" and not v:
+            raise ValueError("task_id is required for this operation")
+        return v
+
+
+class BatchRequest(BaseModel):
+    """Schema for a batch of task operations"""
+    mode: Literal["atomic", "best_effort"] = Field(
+        "atomic",
+        description="atomic: all operations commit or none do; best_effort: each operation stands alone"
+    )
+    operations: list[BatchOperation] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_OPERATIONS, description="Operations, executed in order"
+    )
+
+
+class BatchOperationResult(BaseModel):
+    """Outcome of one batch operation"""
+    index: int = Field(..., description="Position of the operation in the request")
+    status: int = Field(..., description="HTTP status code the operation would have returned on its own")
+    body: Optional[Any] = Field(None, description="Response body the operation would have returned")
+
+
+class BatchResponse(BaseModel):
+    """Schema for a batch response"""
+    mode: str = Field(..., description="Execution mode used")
+    committed: bool = Field(..., description="Whether any changes were committed")
+    results: list[BatchOperationResult] = Field(..., description="Per-operation results, in request order")
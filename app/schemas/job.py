@@ -0,0 +1,69 @@
+"""
+app/schemas/job.py - Pydantic schemas for background jobs
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from app.schemas.task import TaskCreate
+
+MAX_IMPORT_TASKS = 100_000
+
+
+class JobCreate(BaseModel):
+    """Schema for submitting a job"""
+    type: str = Field(..., min_length=1, max_length=50, description="Job type, e.g. import_tasks")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Parameters of the job type")
+
+
+class JobResponse(BaseModel):
+    """Schema for a job and its progress"""
+    id: str = Field(..., description="Unique job identifier")
+    type: str = Field(..., description="Job type")
+    status: str = Field(..., description="queued, running, succeeded, failed or cancelled")
+    params: Dict[str, Any] = Field(..., description="Parameters the job was submitted with")
+    result: Optional[Any] = Field(None, description="Outcome of a succeeded job")
+    error: Optional[str] = Field(None, description="Why the job failed")
+    progress_done: int = Field(..., description="Units of work done so far")
+    progress_total: Optional[int] = Field(None, description="Units of work in total, when known")
+    cancel_requested: bool = Field(..., description="Whether cancellation was requested")
+    created_at: datetime = Field(..., description="Submission timestamp")
+    started_at: Optional[datetime] = Field(None, description="When a worker picked the job up")
+    finished_at: Optional[datetime] = Field(None, description="When the job reached a final status")
+    
+    class Config:
+        orm_mode = True
+        from_attributes = True
+
+
+class JobList(BaseModel):
+    """Schema for a list of jobs, newest first"""
+    jobs: List[JobResponse] = Field(..., description="Jobs")
+
+
+class ImportTasksParams(BaseModel):
+    """Parameters of ``import_tasks``"""
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=MAX_IMPORT_TASKS, description="Tasks to create")
+
+
+class ExportTasksParams(BaseModel):
+    """Parameters of ``export_tasks``"""
+    include_archived: bool = Field(True, description="Also export archived tasks")
+
+
+class ArchiveTasksParams(BaseModel):
+    """Parameters of ``archive_tasks``"""
+    after_days: Optional[int] = Field(None, ge=0, description="Archive tasks completed this many days ago")
+
+
+class RebuildAnalyticsParams(BaseModel):
+    """Parameters of ``rebuild_analytics``"""
+    batch_size: int = Field(1000, ge=1, le=10_000, description="Tasks read per batch")
+
+
+class RebuildTaskCountsParams(BaseModel):
+    """Parameters of ``rebuild_task_counts`` (none)"""
+
+
+class BackupDatabaseParams(BaseModel):
+    """Parameters of ``backup_database`` (none)"""
@@ -1,8 +1,8 @@
 """
 app/schemas/task.py - Pydantic schemas for request/response validation
 """
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Literal, Optional
 from pydantic import BaseModel, Field, validator
 
 
@@ -54,6 +54,7 @@ class TaskResponse(TaskBase):
     
     class Config:
         orm_mode = True
+        from_attributes = True
         json_encoders = {datetime: lambda v: v.isoformat()}
 
 
@@ -65,6 +66,12 @@ class TaskList(BaseModel):
     pending: int = Field(..., description="Number of pending tasks")
 
 
+class TaskMultiGet(BaseModel):
+    """Schema for a multi-get response"""
+    tasks: list[TaskResponse] = Field(..., description="Found tasks, in the order they were requested")
+    missing: list[str] = Field(..., description="Requested IDs with no task")
+
+
 class TaskStats(BaseModel):
     """Schema for task statistics"""
     total_tasks: int = Field(..., description="Total number of tasks")
@@ -77,6 +84,25 @@ class TaskStats(BaseModel):
         return round(v, 2)
 
 
+class TaskAnalyticsBucket(BaseModel):
+    """Schema for one day or week of task analytics"""
+    period_start: date = Field(..., description="First UTC day of the period")
+    created: int = Field(..., description="Tasks created in the period")
+    completed: int = Field(..., description="Tasks completed in the period")
+    median_time_to_complete_seconds: Optional[float] = Field(
+        None, description="Approximate median seconds from creation to completion"
+    )
+
+
+class TaskAnalytics(BaseModel):
+    """Schema for task analytics over a date range"""
+    granularity: Literal["day", "week"] = Field(..., description="Bucket size")
+    start: date = Field(..., description="First UTC day covered")
+    end: date = Field(..., description="Last UTC day covered")
+    buckets: list[TaskAnalyticsBucket] = Field(..., description="Periods with activity, oldest first")
+    totals: TaskAnalyticsBucket = Field(..., description="The whole range as one period")
+
+
 class TaskToggleResponse(BaseModel):
     """Schema for task toggle response"""
     id: str = Field(..., description="Task identifier")
@@ -88,3 +114,17 @@ class TaskDeleteResponse(BaseModel):
     """Schema for task deletion response"""
     id: str = Field(..., description="Deleted task identifier")
     message: str = Field(..., description="Success message")
+
+
+class TaskTombstone(BaseModel):
+    """Schema for a task deleted since the sync cursor"""
+    id: str = Field(..., description="Deleted task identifier")
+    deleted_at: datetime = Field(..., description="Task deletion timestamp")
+
+
+class TaskChangeFeed(BaseModel):
+    """Schema for the task delta-sync feed"""
+    changes: list[TaskResponse] = Field(..., description="Tasks created or updated since the cursor")
+    deleted: list[TaskTombstone] = Field(..., description="Tasks deleted since the cursor")
+    cursor: str = Field(..., description="Cursor to pass as 'since' on the next call")
+    has_more: bool = Field(..., description="Whether more changes are waiting past this page")
@@ -0,0 +1,113 @@
+"""
+app/server.py - Production launcher: uvicorn sized and tuned from Settings
+
+    python -m app.server
+
+Worker processes are sized from the CPUs this process may use and the
+connections the database allows; uvloop and httptools are used when they
+are installed. The effective configuration is printed before starting.
+"""
+import importlib.util
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+
+from app.core.config import Settings, get_settings
+
+APP = "app.main:app"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on, honouring affinity masks (e.g. containers)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        return os.cpu_count() or 1
+
+
+def connections_per_worker(config: Settings) -> int:
+    """Most connections one worker process opens to each database"""
+    return config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+
+
+def size_workers(config: Settings, cpus: Optional[int] = None) -> Tuple[int, str]:
+    """Worker process count and why it was chosen"""
+    if config.RELOAD:
+        return 1, "RELOAD runs a single worker"
+    if config.WORKERS > 0:
+        return config.WORKERS, "WORKERS"
+    if config.REPOSITORY_BACKEND == "memory":
+        return 1, "the memory repository backend lives in one process"
+    if config.EVENT_BACKEND == "local":
+        return 1, "EVENT_BACKEND=local delivers events within one process"
+
+    cpus = cpus or available_cpus()
+    if config.DATABASE_URL.startswith("sqlite"):
+        return cpus, f"one per CPU, {cpus} available"
+    by_connections = max(1, config.DATABASE_MAX_CONNECTIONS // connections_per_worker(config))
+    if by_connections < cpus:
+        return by_connections, (
+            f"DATABASE_MAX_CONNECTIONS={config.DATABASE_MAX_CONNECTIONS} / "
+            f"{connections_per_worker(config)} connections per worker"
+        )
+    return cpus, f"one per CPU, {cpus} available"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(config: Settings, cpus: Optional[int] = None) -> Dict[str, Any]:
+    """Keyword arguments for :func:`uvicorn.run`"""
+    workers, _ = size_workers(config, cpus)
+    return {
+        "host": config.HOST,
+        "port": config.PORT,
+        "workers": workers,
+        "reload": config.RELOAD,
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "backlog": config.BACKLOG,
+        "timeout_keep_alive": config.KEEP_ALIVE_SECONDS,
+        "timeout_graceful_shutdown": config.GRACEFUL_SHUTDOWN_SECONDS or None,
+        "log_level": config.LOG_LEVEL.lower(),
+        "access_log": True,
+    }
+
+
+def describe(config: Settings, options: Dict[str, Any], cpus: Optional[int] = None) -> List[str]:
+    """Human-readable summary of the effective server configuration"""
+    _, reason = size_workers(config, cpus)
+    lines = [
+        f"{config.APP_NAME} {config.APP_VERSION} ({config.ENVIRONMENT}) on {options['host']}:{options['port']}",
+        f"  workers:           {options['workers']} ({reason})",
+        f"  event loop / http: {options['loop']} / {options['http']}",
+        f"  threadpool:        {config.THREADPOOL_SIZE} threads per worker",
+        f"  db pool:           {config.DB_POOL_SIZE} + {config.DB_MAX_OVERFLOW} overflow per worker "
+        f"(timeout {config.DB_POOL_TIMEOUT:g}s)",
+        f"  keep-alive:        {options['timeout_keep_alive']}s, backlog {options['backlog']}",
+    ]
+    shutdown = options["timeout_graceful_shutdown"]
+    lines.append(f"  graceful shutdown: {f'{shutdown}s' if shutdown else 'no limit'}")
+    if config.ADMISSION_CONTROL_ENABLED and config.ADMISSION_MAX_IN_FLIGHT > config.THREADPOOL_SIZE:
+        lines.append(
+            f"  warning: ADMISSION_MAX_IN_FLIGHT={config.ADMISSION_MAX_IN_FLIGHT} exceeds THREADPOOL_SIZE; "
+            "admitted requests will queue for threads"
+        )
+    if config.EVENT_BACKEND == "local" and options["workers"] > 1:
+        lines.append(
+            "  warning: EVENT_BACKEND=local only delivers events to subscribers of the worker that made the change"
+        )
+    return lines
+
+
+def main() -> None:
+    config = get_settings()
+    options = server_options(config)
+    print("\n".join(describe(config, options)), flush=True)
+    uvicorn.run(APP, **options)
+
+
+if __name__ == "__main__":
+    main()
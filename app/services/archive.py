@@ -0,0 +1,116 @@
+"""
+app/services/archive.py - Background archival of long-completed tasks
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, unit_of_work
+from app.core.exceptions import DatabaseError
+from app.core.metrics import metrics
+from app.repositories.job_cursor import job_cursor_repository
+from app.repositories.protocol import ArchiveKey, TaskRepositoryProtocol
+from app.services.task import task_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CURSOR = "task_archive"
+
+archived_tasks = metrics.counter("tasks_archived_total", "Tasks moved to the archive")
+
+
+def _dump_key(key: Optional[ArchiveKey]) -> Optional[str]:
+    return json.dumps([key[0], key[1].isoformat(), key[2]]) if key else None
+
+
+def _load_key(position: Optional[str]) -> Optional[ArchiveKey]:
+    if not position:
+        return None
+    key = json.loads(position)
+    if len(key) != 3:
+        # Saved before tasks had tenants; start the pass over
+        return None
+    tenant_id, updated_at, task_id = key
+    return tenant_id, datetime.fromisoformat(updated_at), task_id
+
+
+class TaskArchiver:
+    """Moves tasks completed more than ``after_days`` ago into ``tasks_archive``.
+
+    Each batch commits together with the archiver's cursor, so a pass that is
+    interrupted resumes after the last archived task. A finished pass clears
+    the cursor and the next one starts from the oldest task again. Batches
+    are separated by ``pause`` seconds to leave room for request traffic.
+    """
+
+    def __init__(
+        self,
+        repository: TaskRepositoryProtocol,
+        session_factory: Callable[[], Session],
+        after_days: int = 30,
+        batch_size: int = 500,
+        pause: float = 0.5,
+    ):
+        self.repository = repository
+        self.session_factory = session_factory
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def archive_batch(self) -> int:
+        """Archive one batch; returns how many tasks moved"""
+        completed_before = datetime.now(timezone.utc) - timedelta(days=self.after_days)
+        try:
+            with self.session_factory() as db, unit_of_work(db):
+                after = _load_key(job_cursor_repository.get_position(db, ARCHIVE_CURSOR))
+                moved, last = self.repository.archive_completed(db, completed_before, after, self.batch_size)
+                # A short batch ends the pass
+                job_cursor_repository.set_position(
+                    db, ARCHIVE_CURSOR, _dump_key(last) if moved == self.batch_size else None
+                )
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while archiving tasks: {e}")
+            raise DatabaseError("Failed to archive tasks")
+        archived_tasks.inc(moved)
+        return moved
+
+    def run_pass(self, max_batches: Optional[int] = None) -> int:
+        """Archive batches until none are left (or ``max_batches`` ran)"""
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = self.archive_batch()
+            total += moved
+            batches += 1
+            if moved < self.batch_size:
+                break
+            time.sleep(self.pause)
+        if total:
+            logger.info(f"Archived {total} completed tasks")
+        return total
+
+    async def run_forever(self, interval: float) -> None:
+        """Run a pass every ``interval`` seconds without blocking the event loop"""
+        while True:
+            try:
+                while await asyncio.to_thread(self.archive_batch) == self.batch_size:
+                    await asyncio.sleep(self.pause)
+            except DatabaseError as e:
+                logger.warning(f"Archive pass stopped: {e.message}")
+            await asyncio.sleep(interval)
+
+
+task_archiver = TaskArchiver(
+    task_service.repository,
+    SessionLocal,
+    after_days=settings.ARCHIVE_AFTER_DAYS,
+    batch_size=settings.ARCHIVE_BATCH_SIZE,
+    pause=settings.ARCHIVE_BATCH_PAUSE_SECONDS,
+)
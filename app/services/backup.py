@@ -0,0 +1,268 @@
+"""
+app/services/backup.py - Online backups of the SQLite database
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+
+from app.core.config import get_settings
+from app.core.database import engine
+from app.core.exceptions import BackupError
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Called with (pages copied, total pages) after every step
+Progress = Callable[[int, int], None]
+
+database_backups = metrics.counter(
+    "database_backups_total", "Database backups and restores by outcome", ("operation", "outcome")
+)
+
+
+class _TooManyRestarts(Exception):
+    """Raised from the progress callback to stop a copy that keeps restarting"""
+
+
+def _database_path(engine: Engine) -> Optional[str]:
+    database = engine.url.database
+    return None if not database or database == ":memory:" else database
+
+
+class DatabaseBackup:
+    """Copies the live SQLite database to and from backup files with SQLite's
+    online backup API.
+
+    A backup copies ``pages_per_step`` pages at a time and sleeps ``pause``
+    seconds between steps. The source is only read-locked during a step, so
+    writers wait at most one step. A write through another connection makes
+    SQLite restart the copy, so every backup is a consistent snapshot.
+
+    Under steady writes the copy could restart forever. A step after which
+    the remaining page count has not gone down is counted as a restart, so
+    in-place updates count as well as writes that grow the file. After
+    ``max_restarts`` restarts it is stopped and done again in one step
+    (``pages=-1``), which holds the read lock for the whole copy: writers
+    wait for it once, but the backup finishes. That is preferred over
+    ``VACUUM INTO``, which also blocks writers for the whole copy and
+    reports no progress.
+
+    Backups are written as ``<database>-<UTC timestamp>.db`` in ``directory``,
+    via a ``.partial`` file renamed when complete; only the newest ``keep``
+    are kept (0 keeps all).
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        directory: str,
+        pages_per_step: int = 256,
+        pause: float = 0.01,
+        keep: int = 7,
+        max_restarts: int = 3,
+    ):
+        if pages_per_step < 1:
+            raise ValueError("pages_per_step must be at least 1")
+        if max_restarts < 0:
+            raise ValueError("max_restarts must not be negative")
+        self.engine = engine
+        self.directory = directory
+        self.pages_per_step = pages_per_step
+        self.pause = pause
+        self.keep = keep
+        self.max_restarts = max_restarts
+        self.last_backup: Dict[str, float] = {}
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "sqlite"
+
+    @property
+    def prefix(self) -> str:
+        path = _database_path(self.engine)
+        return os.path.splitext(os.path.basename(path))[0] if path else "database"
+
+    def _check_supported(self) -> None:
+        if not self.supported:
+            raise BackupError(
+                f"Online backups need a SQLite database, not {self.engine.dialect.name}; "
+                "use the database's own tools (e.g. pg_dump)"
+            )
+
+    def _copy(self, source: sqlite3.Connection, target: sqlite3.Connection, pause: float,
+              progress: Optional[Progress]) -> Dict[str, int]:
+        """Copy ``source`` into ``target`` step by step, or in one step after
+        ``max_restarts`` restarts; returns pages copied, restarts and whether
+        the single step was needed"""
+        state = {"pages": 0, "restarts": 0, "remaining": None}
+
+        def step(status: int, remaining: int, total: int) -> None:
+            # Every step of an uninterrupted copy brings the remaining count
+            # down. A write restarts the copy whether or not it grows the file,
+            # so a step that did not bring it down is counted as a restart.
+            if state["remaining"] is not None and remaining >= state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > self.max_restarts:
+                    raise _TooManyRestarts()
+            state["remaining"], state["pages"] = remaining, total
+            if progress is not None:
+                progress(total - remaining, total)
+
+        try:
+            source.backup(target, pages=self.pages_per_step, progress=step, sleep=pause)
+            single_step = False
+        except _TooManyRestarts:
+            logger.warning(
+                f"Backup copy restarted more than {self.max_restarts} times under concurrent writes; "
+                "copying in one step"
+            )
+            state["remaining"] = None
+            source.backup(target, pages=-1, progress=step)
+            single_step = True
+        return {"pages": state["pages"], "restarts": state["restarts"], "single_step": single_step}
+
+    def backup(self, progress: Optional[Progress] = None) -> Dict[str, Any]:
+        """Write a new backup and prune old ones; returns where it went and how long it took"""
+        self._check_supported()
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        path = os.path.join(self.directory, f"{self.prefix}-{timestamp}.db")
+        partial = f"{path}.partial"
+        started = time.monotonic()
+        try:
+            raw = self.engine.raw_connection()
+            try:
+                with closing(sqlite3.connect(partial)) as target:
+                    copied = self._copy(raw.driver_connection, target, self.pause, progress)
+            finally:
+                raw.close()
+            os.replace(partial, path)
+        except sqlite3.Error as e:
+            database_backups.inc(operation="backup", outcome="failed")
+            logger.error(f"Database backup failed: {e}")
+            raise BackupError(f"Database backup failed: {e}")
+        except BaseException:
+            database_backups.inc(operation="backup", outcome="failed")
+            raise
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+        duration = time.monotonic() - started
+        size = os.path.getsize(path)
+        database_backups.inc(operation="backup", outcome="succeeded")
+        self.last_backup = {"timestamp": time.time(), "duration_seconds": duration, "bytes": size}
+        logger.info(
+            f"Backed up the database to {path}: {copied['pages']} pages, {size} bytes in {duration:.2f}s"
+            + (f" ({copied['restarts']} restarts after concurrent writes)" if copied["restarts"] else "")
+        )
+        return {
+            "file": path,
+            "pages": copied["pages"],
+            "bytes": size,
+            "restarts": copied["restarts"],
+            "single_step": copied["single_step"],
+            "duration_seconds": round(duration, 3),
+            "pruned": self.prune(),
+        }
+
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Completed backups in ``directory``, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        backups = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.startswith(f"{self.prefix}-") and name.endswith(".db"):
+                stat = os.stat(os.path.join(self.directory, name))
+                backups.append({
+                    "name": name,
+                    "bytes": stat.st_size,
+                    "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                })
+        return backups
+
+    def prune(self) -> int:
+        """Delete all but the newest ``keep`` backups; returns how many were deleted"""
+        if self.keep <= 0:
+            return 0
+        stale = self.list_backups()[self.keep:]
+        for backup in stale:
+            os.remove(os.path.join(self.directory, backup["name"]))
+        return len(stale)
+
+    def resolve(self, name_or_path: str) -> str:
+        """A backup file given by path, or by name within ``directory``"""
+        if os.path.exists(name_or_path):
+            return name_or_path
+        path = os.path.join(self.directory, os.path.basename(name_or_path))
+        if not os.path.exists(path):
+            raise BackupError(f"Backup {name_or_path} not found")
+        return path
+
+    def restore(self, name_or_path: str, progress: Optional[Progress] = None) -> Dict[str, Any]:
+        """Replace the database's contents with a backup.
+
+        The backup is integrity-checked first. The database stays locked
+        while it is overwritten, so run this with the application stopped.
+        """
+        self._check_supported()
+        path = self.resolve(name_or_path)
+        started = time.monotonic()
+        try:
+            with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as source:
+                check = source.execute("PRAGMA quick_check").fetchone()[0]
+                if check != "ok":
+                    raise BackupError(f"Backup {path} is damaged: {check}")
+                if source.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks'").fetchone() is None:
+                    raise BackupError(f"{path} is not a task database backup")
+                raw = self.engine.raw_connection()
+                try:
+                    copied = self._copy(source, raw.driver_connection, 0, progress)
+                finally:
+                    raw.close()
+        except sqlite3.Error as e:
+            database_backups.inc(operation="restore", outcome="failed")
+            logger.error(f"Database restore from {path} failed: {e}")
+            raise BackupError(f"Database restore failed: {e}")
+        except BaseException:
+            database_backups.inc(operation="restore", outcome="failed")
+            raise
+        # Pooled connections may hold schema and pages of the old contents
+        self.engine.dispose()
+
+        duration = time.monotonic() - started
+        database_backups.inc(operation="restore", outcome="succeeded")
+        logger.info(f"Restored the database from {path}: {copied['pages']} pages in {duration:.2f}s")
+        return {"file": path, "pages": copied["pages"], "duration_seconds": round(duration, 3)}
+
+    async def run_forever(self, interval: float) -> None:
+        """Back up every ``interval`` seconds without blocking the event loop"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.backup)
+            except (BackupError, OSError) as e:
+                logger.warning(f"Scheduled database backup failed: {e}")
+
+
+database_backup = DatabaseBackup(
+    engine,
+    settings.BACKUP_DIR,
+    pages_per_step=settings.BACKUP_PAGES_PER_STEP,
+    pause=settings.BACKUP_STEP_PAUSE_MS / 1000,
+    keep=settings.BACKUP_KEEP,
+    max_restarts=settings.BACKUP_MAX_RESTARTS,
+)
+
+metrics.gauge(
+    "database_last_backup", "Unix time, duration in seconds and size in bytes of this process's last backup",
+    ("stat",), callback=lambda: {(stat,): value for stat, value in database_backup.last_backup.items()},
+)
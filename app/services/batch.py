@@ -0,0 +1,118 @@
+"""
+app/services/batch.py - Executes many task operations in one session
+"""
+from typing import Any, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+from pydantic import ValidationError
+import logging
+
+from app.schemas.batch import BatchOperation, BatchRequest, BatchOperationResult, BatchResponse
+from app.models.task import DEFAULT_TENANT
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.task import task_service
+from app.core.database import unit_of_work, savepoint
+from app.core.exceptions import TaskManagerException, TaskNotFoundError, TaskValidationError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+_STATUS_BY_ERROR = {
+    TaskNotFoundError: 404,
+    TaskValidationError: 400,
+}
+
+
+class BatchAborted(Exception):
+    """Raised inside an atomic batch to roll back every operation"""
+
+
+class BatchService:
+    """Runs an ordered list of task operations against one session and transaction"""
+    
+    def __init__(self):
+        self.task_service = task_service
+    
+    def _execute(self, db: Session, operation: BatchOperation, tenant_id: str) -> Tuple[int, Any]:
+        service = self.task_service
+        if operation.op == "create":
+            return 201, service.create_task(db, TaskCreate(**(operation.data or {})), tenant_id)
+        if operation.op == "get":
+            return 200, service.get_task_by_id(db, operation.task_id, tenant_id)
+        if operation.op == "update":
+            return 200, service.update_task(db, operation.task_id, TaskUpdate(**(operation.data or {})), tenant_id)
+        if operation.op == "toggle":
+            return 200, service.toggle_task_completion(db, operation.task_id, tenant_id)
+        return 200, service.delete_task(db, operation.task_id, tenant_id)
+    
+    def _run_one(self, db: Session, index: int, operation: BatchOperation, tenant_id: str) -> BatchOperationResult:
+        try:
+            status, body = self._execute(db, operation, tenant_id)
+            return BatchOperationResult(index=index, status=status, body=body)
+        except ValidationError as e:
+            return BatchOperationResult(
+                index=index, status=422,
+                body={"detail": "Validation error", "errors": e.errors(include_url=False, include_context=False), "type": "ValidationError"}
+            )
+        except TaskManagerException as e:
+            return BatchOperationResult(
+                index=index, status=_STATUS_BY_ERROR.get(type(e), 500),
+                body={"detail": e.message, "error_code": e.error_code, "type": "TaskManagerError"}
+            )
+    
+    def execute(self, db: Session, batch: BatchRequest, tenant_id: str = DEFAULT_TENANT) -> BatchResponse:
+        try:
+            if batch.mode == "best_effort":
+                return self._execute_best_effort(db, batch, tenant_id)
+            return self._execute_atomic(db, batch, tenant_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while committing batch: {e}")
+            raise DatabaseError("Failed to commit batch")
+    
+    def _execute_best_effort(self, db: Session, batch: BatchRequest, tenant_id: str) -> BatchResponse:
+        results = []
+        with unit_of_work(db):
+            for index, operation in enumerate(batch.operations):
+                try:
+                    with savepoint(db):
+                        result = self._run_one(db, index, operation, tenant_id)
+                        if result.status >= 400:
+                            raise BatchAborted()
+                except BatchAborted:
+                    pass
+                results.append(result)
+        committed = any(result.status < 400 for result in results)
+        logger.info(f"Best-effort batch ran {len(results)} operations, committed={committed}")
+        return BatchResponse(mode=batch.mode, committed=committed, results=results)
+    
+    def _execute_atomic(self, db: Session, batch: BatchRequest, tenant_id: str) -> BatchResponse:
+        results = []
+        try:
+            with unit_of_work(db):
+                for index, operation in enumerate(batch.operations):
+                    result = self._run_one(db, index, operation, tenant_id)
+                    results.append(result)
+                    if result.status >= 400:
+                        raise BatchAborted()
+            committed = True
+        except BatchAborted:
+            committed = False
+            failed = results[-1]
+            # Earlier operations were rolled back and later ones never ran
+            results = [
+                result if result is failed else BatchOperationResult(
+                    index=result.index, status=424,
+                    body={"detail": "Rolled back because another operation failed", "type": "BatchAborted"}
+                )
+                for result in results
+            ] + [
+                BatchOperationResult(
+                    index=index, status=424,
+                    body={"detail": "Not executed because another operation failed", "type": "BatchAborted"}
+                )
+                for index in range(len(results), len(batch.operations))
+            ]
+            logger.info(f"Atomic batch aborted at operation {failed.index}")
+        return BatchResponse(mode=batch.mode, committed=committed, results=results)
+
+
+batch_service = BatchService()
@@ -0,0 +1,234 @@
+"""
+app/services/idempotency.py - Run writes once per Idempotency-Key and replay their first response
+"""
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import get_settings
+from app.core.exceptions import DatabaseError, IdempotencyKeyInProgressError, IdempotencyKeyReusedError
+from app.core.metrics import metrics
+from app.core.serialization import negotiate_media_type
+from app.repositories.idempotency import idempotency_repository
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# How often (seconds) a retry re-reads a key held by another process
+POLL_INTERVAL = 0.05
+
+# Expired keys are purged at most this often (seconds), this many at a time
+PURGE_INTERVAL = 300
+PURGE_BATCH_SIZE = 1000
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+idempotent_requests = metrics.counter(
+    "idempotent_requests_total",
+    "Writes sent with an Idempotency-Key, by outcome (executed, replayed, conflict)",
+    ("outcome",),
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def fingerprint(request: Request, payload: Any = None) -> str:
+    """Hash of what makes two requests "the same": method, path, body and the
+    media type their response is encoded in, since the stored body is replayed
+    as it is"""
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    digest = hashlib.sha256(f"{request.method} {request.url.path} {media_type}\n".encode())
+    if isinstance(payload, BaseModel):
+        digest.update(payload.model_dump_json().encode())
+    elif payload is not None:
+        digest.update(repr(payload).encode())
+    return digest.hexdigest()
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    media_type: Optional[str]
+    body: bytes
+
+
+class _InFlight:
+    """A request of this process holding a key, for duplicates to wait on"""
+    
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.response: Optional[StoredResponse] = None
+
+
+class IdempotencyService:
+    """Runs a write at most once per tenant and ``Idempotency-Key``.
+    
+    The first request claims the key in the ``idempotency_keys`` table and
+    stores its response; retries get that response back. A duplicate that
+    arrives while the first request is still running waits for it: on an
+    in-process event when both are in this process, otherwise by polling
+    the table. Requests that fail (an exception or a 5xx) give the key up
+    so that a retry runs them again.
+    """
+    
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        wait_timeout: Optional[float] = None,
+        in_flight_timeout: Optional[float] = None,
+    ):
+        self.ttl = timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS if ttl is None else ttl)
+        self.wait_timeout = settings.IDEMPOTENCY_WAIT_SECONDS if wait_timeout is None else wait_timeout
+        self.in_flight_timeout = timedelta(
+            seconds=settings.IDEMPOTENCY_IN_FLIGHT_SECONDS if in_flight_timeout is None else in_flight_timeout
+        )
+        self.repository = idempotency_repository
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Tuple[str, str], _InFlight] = {}
+        self._purged_at = 0.0
+    
+    def run(
+        self,
+        db: Session,
+        tenant_id: str,
+        key: Optional[str],
+        request: Request,
+        payload: Any,
+        operation: Callable[[], Response],
+    ) -> Response:
+        """Return ``operation()``, or the stored response of the first request with ``key``.
+        
+        Without a key the operation simply runs. Raises
+        IdempotencyKeyReusedError if the key came with a different request
+        and IdempotencyKeyInProgressError if the first request is still
+        running after the wait timeout.
+        """
+        if key is None:
+            return operation()
+        request_fingerprint = fingerprint(request, payload)
+        deadline = time.monotonic() + self.wait_timeout
+        ident = (tenant_id, key)
+        while True:
+            with self._lock:
+                leader = self._in_flight.get(ident)
+                if leader is None:
+                    entry = self._in_flight[ident] = _InFlight(request_fingerprint)
+            if leader is None:
+                break
+            # A duplicate in this process: wait for it instead of polling the table
+            if leader.fingerprint != request_fingerprint:
+                idempotent_requests.inc(outcome="conflict")
+                raise IdempotencyKeyReusedError()
+            if not leader.done.wait(max(0.0, deadline - time.monotonic())):
+                idempotent_requests.inc(outcome="conflict")
+                raise IdempotencyKeyInProgressError()
+            if leader.response is not None:
+                idempotent_requests.inc(outcome="replayed")
+                return self._replay(leader.response)
+            # The first attempt failed and gave the key up; go again
+        
+        try:
+            self._purge_expired(db)
+            stored = self._claim(db, tenant_id, key, request_fingerprint, deadline)
+            if stored is not None:
+                entry.response = stored
+                idempotent_requests.inc(outcome="replayed")
+                return self._replay(stored)
+            try:
+                response = operation()
+            except BaseException:
+                self._release(db, tenant_id, key)
+                raise
+            if response.status_code >= 500:
+                self._release(db, tenant_id, key)
+                return response
+            stored = StoredResponse(response.status_code, response.headers.get("content-type"), response.body)
+            self._store(db, tenant_id, key, stored)
+            entry.response = stored
+            idempotent_requests.inc(outcome="executed")
+            return response
+        finally:
+            with self._lock:
+                del self._in_flight[ident]
+            entry.done.set()
+    
+    def _claim(
+        self, db: Session, tenant_id: str, key: str, request_fingerprint: str, deadline: float
+    ) -> Optional[StoredResponse]:
+        """Claim ``key``, or wait for the response of whoever holds it; None once claimed"""
+        try:
+            while True:
+                now = _utcnow()
+                expires_at = now + self.ttl
+                if self.repository.claim(db, tenant_id, key, request_fingerprint, now, expires_at):
+                    return None
+                if self.repository.take_over(
+                    db, tenant_id, key, request_fingerprint, now, expires_at, now - self.in_flight_timeout
+                ):
+                    return None
+                record = self.repository.get_record(db, tenant_id, key)
+                if record is None:
+                    # Released between our claim and the read
+                    continue
+                if record.fingerprint != request_fingerprint:
+                    idempotent_requests.inc(outcome="conflict")
+                    raise IdempotencyKeyReusedError()
+                if record.status_code is not None:
+                    return StoredResponse(record.status_code, record.media_type, record.body)
+                if time.monotonic() >= deadline:
+                    idempotent_requests.inc(outcome="conflict")
+                    raise IdempotencyKeyInProgressError()
+                # End the read transaction so the next poll sees new commits
+                db.commit()
+                time.sleep(POLL_INTERVAL)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error claiming idempotency key: {str(e)}")
+            raise DatabaseError(f"Failed to claim idempotency key: {str(e)}")
+    
+    def _store(self, db: Session, tenant_id: str, key: str, stored: StoredResponse) -> None:
+        try:
+            self.repository.complete(db, tenant_id, key, *stored)
+        except SQLAlchemyError as e:
+            # The write itself succeeded; a retry after this runs it again
+            logger.error(f"Database error storing idempotent response: {str(e)}")
+            self._release(db, tenant_id, key)
+    
+    def _release(self, db: Session, tenant_id: str, key: str) -> None:
+        try:
+            self.repository.release(db, tenant_id, key)
+        except SQLAlchemyError as e:
+            # The claim lapses after the in-flight timeout
+            logger.error(f"Database error releasing idempotency key: {str(e)}")
+    
+    def _purge_expired(self, db: Session) -> None:
+        """Delete a batch of expired keys, at most every PURGE_INTERVAL seconds"""
+        with self._lock:
+            if time.monotonic() - self._purged_at < PURGE_INTERVAL:
+                return
+            self._purged_at = time.monotonic()
+        try:
+            purged = self.repository.purge_expired(db, _utcnow(), PURGE_BATCH_SIZE)
+            if purged:
+                logger.info(f"Purged {purged} expired idempotency keys")
+        except SQLAlchemyError as e:
+            logger.error(f"Database error purging idempotency keys: {str(e)}")
+    
+    @staticmethod
+    def _replay(stored: StoredResponse) -> Response:
+        headers = {REPLAYED_HEADER: "true", "Vary": "Accept"}
+        if stored.media_type:
+            headers["content-type"] = stored.media_type
+        return Response(content=stored.body, status_code=stored.status_code, headers=headers)
+
+
+idempotency_service = IdempotencyService()
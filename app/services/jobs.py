@@ -0,0 +1,504 @@
+"""
+app/services/jobs.py - In-process background jobs for heavy task operations
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal, unit_of_work
+from app.core.exceptions import (
+    DatabaseError, JobForbiddenError, JobNotFoundError, TaskManagerException, TaskValidationError
+)
+from app.core.metrics import metrics
+from app.models.job import JOB_CANCELLED, JOB_FAILED, JOB_SUCCEEDED
+from app.models.task import DEFAULT_TENANT
+from app.repositories.job import job_repository
+from app.schemas.job import (
+    JobCreate, JobResponse, JobList,
+    ImportTasksParams, ExportTasksParams, ArchiveTasksParams, RebuildAnalyticsParams, RebuildTaskCountsParams,
+    BackupDatabaseParams
+)
+from app.schemas.task import TaskCreate, TaskResponse
+from app.services.archive import TaskArchiver
+from app.services.backup import database_backup
+from app.services.task import task_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Progress is written at most this often (seconds) unless a handler forces it
+PROGRESS_INTERVAL = 0.5
+
+# Tasks read per page by export_tasks
+EXPORT_PAGE_SIZE = 1000
+
+jobs_finished = metrics.counter(
+    "jobs_finished_total", "Background jobs finished, by type and status", ("type", "status")
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler once its job has been cancelled"""
+
+
+class JobContext:
+    """What a handler gets to run its job: the validated parameters, a
+    session factory, progress reporting and cancellation checks.
+    
+    Handlers should call :meth:`check_cancelled` between units of work;
+    work committed before a cancellation stays committed.
+    """
+    
+    def __init__(self, job_id: str, params: Dict[str, Any], session_factory: Callable[[], Session],
+                 cancel: threading.Event, tenant_id: str = DEFAULT_TENANT):
+        self.job_id = job_id
+        self.tenant_id = tenant_id
+        self.params = params
+        self.session_factory = session_factory
+        self.done = 0
+        self.total: Optional[int] = None
+        self._cancel = cancel
+        self._reported_at = 0.0
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+    
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled()
+    
+    def progress(self, done: int, total: Optional[int] = None, force: bool = False) -> None:
+        """Record progress; the write also picks up a cancellation requested from another process"""
+        self.done = done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        if not force and now - self._reported_at < PROGRESS_INTERVAL:
+            return
+        self._reported_at = now
+        try:
+            with self.session_factory() as db:
+                if job_repository.record_progress(db, self.job_id, self.done, self.total, _utcnow()):
+                    self._cancel.set()
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to record progress of job {self.job_id}: {e}")
+
+
+class JobType:
+    """A registered handler with its parameter schema, concurrency limit and
+    whether only admins may submit it"""
+    
+    def __init__(
+        self, handler: Callable[[JobContext], Any], params_schema: Type[BaseModel], concurrency: int,
+        admin_only: bool = False,
+    ):
+        self.handler = handler
+        self.params_schema = params_schema
+        self.concurrency = concurrency
+        self.admin_only = admin_only
+
+
+class JobRunner:
+    """Runs queued jobs on a pool of worker threads.
+    
+    Jobs live in the ``jobs`` table: submitting one inserts a queued row and
+    wakes a worker, and workers also poll every ``poll_interval`` seconds for
+    jobs queued elsewhere (another process, or before a restart). A worker
+    only takes a job whose type is below its concurrency limit in this
+    process, and claims it with a conditional UPDATE, so several processes
+    can serve one table.
+    
+    While a job runs its heartbeat is refreshed; a running job whose
+    heartbeat is older than ``stale_after`` seconds belonged to a process
+    that died and is marked failed.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        stale_after: float = 60.0,
+        concurrency: Optional[Dict[str, int]] = None,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.types: Dict[str, JobType] = {}
+        self._concurrency_overrides = dict(concurrency or {})
+        self._active: Dict[str, int] = defaultdict(int)
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._wakeup = threading.Condition()
+        # Bumped on every notify, so a worker that was querying when one was
+        # sent looks again instead of sleeping through it
+        self._signals = 0
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def register(self, job_type: str, params_schema: Type[BaseModel], concurrency: int = 1, admin_only: bool = False):
+        """Decorator registering ``handler(context) -> result`` for ``job_type``.
+        
+        The result must be JSON serializable; it is stored on the job.
+        ``admin_only`` types reach across tenants, so :meth:`submit` takes
+        them only from admins.
+        """
+        def decorator(handler: Callable[[JobContext], Any]) -> Callable[[JobContext], Any]:
+            limit = self._concurrency_overrides.get(job_type, concurrency)
+            self.types[job_type] = JobType(handler, params_schema, max(1, limit), admin_only)
+            return handler
+        return decorator
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+    
+    def active(self) -> Dict[str, int]:
+        """Jobs running in this process, by type"""
+        with self._wakeup:
+            return {job_type: count for job_type, count in self._active.items() if count}
+    
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        self._threads.append(threading.Thread(target=self._keep_alive, name="job-heartbeat", daemon=True))
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop taking jobs and wait up to ``timeout`` seconds for running ones to finish.
+        
+        Queued jobs stay queued for the next start. A job still running when
+        the process exits is failed by the heartbeat check of a later run.
+        """
+        threads, self._threads = self._threads, []
+        with self._wakeup:
+            self._stopped.set()
+            self._signals += 1
+            self._wakeup.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    
+    # Submission and lookup (request threads)
+    
+    def submit(
+        self, db: Session, job_in: JobCreate, tenant_id: str = DEFAULT_TENANT, admin: bool = False
+    ) -> JobResponse:
+        job_type = self.types.get(job_in.type)
+        if job_type is None:
+            known = ", ".join(sorted(self.types))
+            raise TaskValidationError(f"Unknown job type '{job_in.type}'; expected one of {known}")
+        if job_type.admin_only and not admin:
+            raise JobForbiddenError(f"Job type '{job_in.type}' requires the admin token")
+        try:
+            params = job_type.params_schema(**job_in.params)
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()[:5])
+            raise TaskValidationError(f"Invalid parameters for {job_in.type}: {problems}")
+        try:
+            job = job_repository.create(
+                db, obj_in=JobCreate(type=job_in.type, params=params.model_dump(mode="json")), tenant_id=tenant_id
+            )
+            logger.info(f"Queued job {job.id} ({job.type})")
+            response = JobResponse.from_orm(job)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while submitting a {job_in.type} job: {e}")
+            raise DatabaseError("Failed to submit job")
+        with self._wakeup:
+            self._signals += 1
+            self._wakeup.notify()
+        return response
+    
+    def _admin_types(self) -> List[str]:
+        return [name for name, job_type in self.types.items() if job_type.admin_only]
+    
+    def _hidden(self, job, admin: bool) -> bool:
+        """Whether ``job`` is missing or of an admin-only type a non-admin may not see"""
+        return job is None or (not admin and job.type in self._admin_types())
+    
+    def get_job(self, db: Session, job_id: str, tenant_id: str = DEFAULT_TENANT, admin: bool = False) -> JobResponse:
+        """A job and its progress; admin-only jobs are not found by others"""
+        try:
+            job = job_repository.get(db, job_id, tenant_id)
+            if self._hidden(job, admin):
+                raise JobNotFoundError(f"Job with ID {job_id} not found")
+            return JobResponse.from_orm(job)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching job {job_id}: {e}")
+            raise DatabaseError(f"Failed to fetch job {job_id}")
+    
+    def list_jobs(
+        self, db: Session, status: Optional[str] = None, job_type: Optional[str] = None, limit: int = 100,
+        tenant_id: str = DEFAULT_TENANT, admin: bool = False,
+    ) -> JobList:
+        try:
+            jobs = job_repository.get_recent(
+                db, status=status, job_type=job_type, limit=limit, tenant_id=tenant_id,
+                exclude_types=() if admin else self._admin_types(),
+            )
+            return JobList(jobs=[JobResponse.from_orm(job) for job in jobs])
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while listing jobs: {e}")
+            raise DatabaseError("Failed to list jobs")
+    
+    def cancel(self, db: Session, job_id: str, tenant_id: str = DEFAULT_TENANT, admin: bool = False) -> JobResponse:
+        """Cancel a queued job, or ask a running one to stop; finished jobs are left as they are"""
+        try:
+            job = job_repository.get(db, job_id, tenant_id)
+            if self._hidden(job, admin):
+                raise JobNotFoundError(f"Job with ID {job_id} not found")
+            job_repository.request_cancel(db, job_id, _utcnow())
+            db.refresh(job)
+            response = JobResponse.from_orm(job)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while cancelling job {job_id}: {e}")
+            raise DatabaseError(f"Failed to cancel job {job_id}")
+        with self._wakeup:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+        return response
+    
+    # Workers
+    
+    def _claim_next(self) -> Optional[Tuple[str, str, str, Dict[str, Any]]]:
+        """Claim the oldest queued job of a type with a free slot.
+        
+        The slot is reserved under ``_wakeup`` and the table is read and
+        updated outside it, so a slow query holds up neither the other
+        workers nor a submit's notify.
+        """
+        with self._wakeup:
+            open_types = [name for name, job_type in self.types.items() if self._active[name] < job_type.concurrency]
+        if not open_types:
+            return None
+        try:
+            with self.session_factory() as db:
+                for job_id, job_type in job_repository.get_queued(db, open_types, limit=self.workers):
+                    with self._wakeup:
+                        if self._active[job_type] >= self.types[job_type].concurrency:
+                            continue
+                        self._active[job_type] += 1
+                        # Registered before the claim, so a cancel sent meanwhile is not missed
+                        self._cancel_events[job_id] = threading.Event()
+                    job = None
+                    try:
+                        if job_repository.claim(db, job_id, _utcnow()):
+                            job = job_repository.get(db, job_id)
+                    finally:
+                        if job is None:
+                            with self._wakeup:
+                                self._active[job_type] -= 1
+                                self._cancel_events.pop(job_id, None)
+                    if job is not None:
+                        return job_id, job_type, job.tenant_id, job.params
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while claiming a job: {e}")
+        return None
+    
+    def _work(self) -> None:
+        while True:
+            with self._wakeup:
+                if self._stopped.is_set():
+                    return
+                signals = self._signals
+            claimed = self._claim_next()
+            if claimed is not None:
+                self._execute(*claimed)
+                continue
+            with self._wakeup:
+                if self._signals == signals:
+                    self._wakeup.wait(self.poll_interval)
+    
+    def _execute(self, job_id: str, job_type: str, tenant_id: str, params: Dict[str, Any]) -> None:
+        context = JobContext(job_id, params, self.session_factory, self._cancel_events[job_id], tenant_id)
+        status, result, error = JOB_SUCCEEDED, None, None
+        started = time.monotonic()
+        try:
+            context.check_cancelled()
+            result = self.types[job_type].handler(context)
+        except JobCancelled:
+            status = JOB_CANCELLED
+        except TaskManagerException as e:
+            status, error = JOB_FAILED, e.message
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job_type}) failed: {e}", exc_info=True)
+            status, error = JOB_FAILED, str(e) or type(e).__name__
+        logger.info(f"Job {job_id} ({job_type}) {status} after {time.monotonic() - started:.1f}s")
+        
+        try:
+            with self.session_factory() as db:
+                job_repository.finish(db, job_id, status, _utcnow(), (context.done, context.total), result, error)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to record the outcome of job {job_id}: {e}")
+        jobs_finished.inc(type=job_type, status=status)
+        with self._wakeup:
+            self._active[job_type] -= 1
+            self._cancel_events.pop(job_id, None)
+            # A slot of this type just freed up
+            self._signals += 1
+            self._wakeup.notify_all()
+    
+    def _keep_alive(self) -> None:
+        """Refresh the heartbeat of this process's jobs and fail jobs of dead processes"""
+        while True:
+            now = _utcnow()
+            with self._wakeup:
+                running = list(self._cancel_events)
+            try:
+                with self.session_factory() as db:
+                    if running:
+                        job_repository.heartbeat(db, running, now)
+                    failed = job_repository.fail_stale(
+                        db, now - timedelta(seconds=self.stale_after), now,
+                        "Job stopped responding; the process running it probably exited",
+                    )
+                if failed:
+                    logger.warning(f"Marked {failed} abandoned jobs as failed")
+            except SQLAlchemyError as e:
+                logger.error(f"Database error while checking job heartbeats: {e}")
+            if self._stopped.wait(self.stale_after / 4):
+                return
+
+
+job_runner = JobRunner(
+    SessionLocal,
+    workers=settings.JOBS_WORKERS,
+    poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS,
+    stale_after=settings.JOBS_STALE_SECONDS,
+    concurrency=settings.JOBS_CONCURRENCY,
+)
+
+metrics.gauge(
+    "jobs_running", "Background jobs running in this process, by type", ("type",),
+    callback=lambda: {(job_type,): count for job_type, count in job_runner.active().items()},
+)
+
+
+@job_runner.register("import_tasks", ImportTasksParams, concurrency=2)
+def import_tasks(context: JobContext) -> Dict[str, int]:
+    """Create the given tasks, committing every JOBS_IMPORT_CHUNK_SIZE of them"""
+    tasks = context.params["tasks"]
+    chunk_size = settings.JOBS_IMPORT_CHUNK_SIZE
+    imported = 0
+    context.progress(0, len(tasks), force=True)
+    for start in range(0, len(tasks), chunk_size):
+        context.check_cancelled()
+        chunk = tasks[start:start + chunk_size]
+        with context.session_factory() as db, unit_of_work(db):
+            for task in chunk:
+                task_service.create_task(db, TaskCreate(**task), context.tenant_id)
+        imported += len(chunk)
+        context.progress(imported)
+    return {"imported": imported}
+
+
+@job_runner.register("export_tasks", ExportTasksParams, concurrency=2)
+def export_tasks(context: JobContext) -> Dict[str, Any]:
+    """Write the tenant's tasks as JSON lines to a file in JOBS_EXPORT_DIR"""
+    include_archived = context.params["include_archived"]
+    repository = task_service.repository
+    os.makedirs(settings.JOBS_EXPORT_DIR, exist_ok=True)
+    path = os.path.join(settings.JOBS_EXPORT_DIR, f"tasks-{context.job_id}.jsonl")
+    partial = f"{path}.partial"
+    exported = 0
+    try:
+        with context.session_factory() as db, open(partial, "w", encoding="utf-8") as file:
+            total = repository.count(db, context.tenant_id) + (
+                repository.count_archived(db, context.tenant_id) if include_archived else 0
+            )
+            context.progress(0, total, force=True)
+            # Keyset pages on (created_at, id): no OFFSET rescans, and tasks
+            # created or archived meanwhile do not shift the pages still to come
+            for archived in (False, True) if include_archived else (False,):
+                after = None
+                while True:
+                    context.check_cancelled()
+                    page = repository.get_page_after(
+                        db, after, EXPORT_PAGE_SIZE, archived=archived, tenant_id=context.tenant_id
+                    )
+                    file.writelines(TaskResponse.from_orm(task).model_dump_json() + "\n" for task in page)
+                    exported += len(page)
+                    context.progress(exported)
+                    if len(page) < EXPORT_PAGE_SIZE:
+                        break
+                    after = (page[-1].created_at, page[-1].id)
+                    # Keep memory flat however many tasks there are
+                    db.expunge_all()
+        os.replace(partial, path)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while exporting tasks: {e}")
+        raise DatabaseError("Failed to export tasks")
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return {"file": path, "exported": exported}
+
+
+@job_runner.register("archive_tasks", ArchiveTasksParams, admin_only=True)
+def archive_tasks(context: JobContext) -> Dict[str, int]:
+    """Run an archival pass over every tenant now instead of waiting for the periodic one"""
+    after_days = context.params["after_days"]
+    archiver = TaskArchiver(
+        task_service.repository,
+        context.session_factory,
+        after_days=settings.ARCHIVE_AFTER_DAYS if after_days is None else after_days,
+        batch_size=settings.ARCHIVE_BATCH_SIZE,
+        pause=settings.ARCHIVE_BATCH_PAUSE_SECONDS,
+    )
+    archived = 0
+    while True:
+        context.check_cancelled()
+        moved = archiver.archive_batch()
+        archived += moved
+        context.progress(archived)
+        if moved < archiver.batch_size:
+            return {"archived": archived}
+        time.sleep(archiver.pause)
+
+
+@job_runner.register("rebuild_analytics", RebuildAnalyticsParams, admin_only=True)
+def rebuild_analytics(context: JobContext) -> Dict[str, int]:
+    """Recount every tenant's analytics rollups from the task tables"""
+    with context.session_factory() as db:
+        return task_service.rebuild_analytics(db, batch_size=context.params["batch_size"])
+
+
+@job_runner.register("rebuild_task_counts", RebuildTaskCountsParams, admin_only=True)
+def rebuild_task_counts(context: JobContext) -> Dict[str, int]:
+    """Recount every tenant's task counters from the task tables"""
+    with context.session_factory() as db:
+        return {"tenants": task_service.rebuild_task_counts(db)}
+
+
+@job_runner.register("backup_database", BackupDatabaseParams, admin_only=True)
+def backup_database(context: JobContext) -> Dict[str, Any]:
+    """Copy the SQLite database to BACKUP_DIR with the online backup API, reporting pages copied"""
+    def progress(done: int, total: int) -> None:
+        # Raising here abandons the copy and removes the partial file
+        context.check_cancelled()
+        context.progress(done, total)
+    
+    return database_backup.backup(progress)
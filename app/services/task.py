@@ -1,32 +1,125 @@
 """
 app/services/task.py - Task service layer containing business logic
 """
-from typing import List
+import functools
+import inspect
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, TypeVar
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
-from app.models.task import Task
+from app.models.task import Task, DEFAULT_TENANT
+from app.models.task_change import CHANGE_DELETE
 from app.schemas.task import (
-    TaskCreate, TaskUpdate, TaskResponse, TaskList, TaskStats,
-    TaskToggleResponse, TaskDeleteResponse
+    TaskCreate, TaskUpdate, TaskResponse, TaskList, TaskMultiGet, TaskStats,
+    TaskToggleResponse, TaskDeleteResponse, TaskTombstone, TaskChangeFeed,
+    TaskAnalytics, TaskAnalyticsBucket
 )
-from app.repositories.task import task_repository
-from app.core.exceptions import TaskNotFoundError, TaskValidationError, DatabaseError
+from app.repositories.backends import TaskBackend, create_task_backend
+from app.core.config import get_settings
+from app.core.database import SessionLocal, after_commit, commits_deferred
+from app.core.group_commit import GroupCommitter
+from app.core.events import event_hub
+from app.core.exceptions import TaskNotFoundError, TaskValidationError, DatabaseError, RequestCancelledError
+from app.core.serialization import share_encodings
+from app.core.single_flight import SingleFlight
+from app.core.tracing import trace_methods
+from app.utils.histogram import histogram_quantile
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Widest date range one analytics request may cover
+MAX_ANALYTICS_DAYS = 3660
+# Most task IDs one multi-get may ask for
+MAX_MULTI_GET_IDS = 500
 
+F = TypeVar("F", bound=Callable)
+
+
+def _canonical_id(task_id: str) -> str:
+    """Task IDs as stored: lowercase hyphenated UUIDs; anything else stays as is and matches nothing"""
+    try:
+        return str(uuid.UUID(task_id))
+    except ValueError:
+        return task_id
+
+
+def coalesced(method: F) -> F:
+    """Let concurrent identical calls of a read share one execution.
+    
+    Calls match on the method and every argument but the session; the
+    tenant scopes them so writes can invalidate a tenant's reads. Reads
+    inside a unit of work may see its uncommitted writes and always run.
+    The shared result also shares its encoded response bodies.
+    """
+    signature = inspect.signature(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, db: Session, *args, **kwargs):
+        if self.single_flight is None or commits_deferred(db):
+            return method(self, db, *args, **kwargs)
+        bound = signature.bind(self, db, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = {name: value for name, value in bound.arguments.items() if name not in ("self", "db")}
+        key = (arguments.pop("tenant_id"), method.__name__, *sorted(arguments.items()))
+        return self.single_flight.do(key, lambda: share_encodings(method(self, db, *args, **kwargs)))
+    
+    return wrapper
+
+
+@trace_methods
 class TaskService:
-    """Task service containing business logic for task operations"""
+    """Task service containing business logic for task operations.
+    
+    Every operation acts for one tenant and never sees another tenant's tasks.
+    """
+    
+    def __init__(self, backend: Optional[TaskBackend] = None):
+        self.backend = backend or create_task_backend()
+        self.repository = self.backend.tasks
+        self.analytics = self.backend.analytics
+        self.events = event_hub
+        self.single_flight: Optional[SingleFlight] = None
+        if settings.SINGLE_FLIGHT_ENABLED:
+            # Another request's disconnect is no reason to fail this one
+            self.single_flight = SingleFlight(
+                ttl=settings.SINGLE_FLIGHT_CACHE_MS / 1000, retry_on=(RequestCancelledError,)
+            )
+        self.group_commit: Optional[GroupCommitter] = None
+        if settings.GROUP_COMMIT_ENABLED and self.backend.uses_database:
+            self.group_commit = GroupCommitter(
+                SessionLocal,
+                max_batch=settings.GROUP_COMMIT_MAX_BATCH,
+                max_delay=settings.GROUP_COMMIT_MAX_DELAY_MS / 1000,
+            )
     
-    def __init__(self):
-        self.repository = task_repository
+    def _coalesce(self, db: Session) -> bool:
+        """Whether a write should go through the group committer.
+        
+        Writes already inside a unit of work (batches, the committer's own
+        session) run directly as part of it.
+        """
+        return self.group_commit is not None and not commits_deferred(db)
     
-    def get_all_tasks(self, db: Session, skip: int = 0, limit: int = 100) -> TaskList:
+    def _publish(self, db: Session, event_type: str, task_id: str, data: dict, tenant_id: str) -> None:
+        if self.single_flight is not None:
+            after_commit(db, lambda: self.single_flight.invalidate(tenant_id))
+        after_commit(db, lambda: self.events.publish(event_type, task_id, data, tenant_id))
+    
+    @coalesced
+    def get_all_tasks(
+        self, db: Session, skip: int = 0, limit: int = 100, include_archived: bool = False,
+        tenant_id: str = DEFAULT_TENANT,
+    ) -> TaskList:
         try:
-            tasks = self.repository.get_multi(db, skip=skip, limit=limit)
-            stats = self.repository.get_task_stats(db)
+            tasks = self.repository.get_multi(
+                db, skip=skip, limit=limit, include_archived=include_archived, tenant_id=tenant_id
+            )
+            stats = self.repository.get_task_stats(db, include_archived=include_archived, tenant_id=tenant_id)
             
             return TaskList(
                 tasks=[TaskResponse.from_orm(task) for task in tasks],
@@ -38,9 +131,9 @@ class TaskService:
             logger.error(f"Database error while fetching tasks: {e}")
             raise DatabaseError("Failed to fetch tasks")
     
-    def get_task_by_id(self, db: Session, task_id: str) -> TaskResponse:
+    def get_task_by_id(self, db: Session, task_id: str, tenant_id: str = DEFAULT_TENANT) -> TaskResponse:
         try:
-            task = self.repository.get(db, task_id)
+            task = self.repository.get(db, task_id, tenant_id) or self.repository.get_archived(db, task_id, tenant_id)
             if not task:
                 raise TaskNotFoundError(f"Task with ID {task_id} not found")
             return TaskResponse.from_orm(task)
@@ -48,93 +141,295 @@ class TaskService:
             logger.error(f"Database error while fetching task {task_id}: {e}")
             raise DatabaseError(f"Failed to fetch task {task_id}")
     
-    def create_task(self, db: Session, task_data: TaskCreate) -> TaskResponse:
+    def get_tasks_by_ids(self, db: Session, task_ids: List[str], tenant_id: str = DEFAULT_TENANT) -> TaskMultiGet:
+        """Fetch many tasks, live or archived, in the order of ``task_ids``.
+        
+        Repeated IDs (in any spelling of the same UUID) are returned once.
+        """
+        requested: Dict[str, str] = {}
+        for task_id in task_ids:
+            task_id = task_id.strip()
+            if task_id:
+                requested.setdefault(_canonical_id(task_id), task_id)
+        if not requested:
+            raise TaskValidationError("At least one task ID is required")
+        if len(requested) > MAX_MULTI_GET_IDS:
+            raise TaskValidationError(f"At most {MAX_MULTI_GET_IDS} task IDs can be fetched at once")
+        try:
+            found = self.repository.get_many(db, list(requested), tenant_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching {len(requested)} tasks by ID: {e}")
+            raise DatabaseError("Failed to fetch tasks")
+        
+        return TaskMultiGet(
+            tasks=[TaskResponse.from_orm(found[task_id]) for task_id in requested if task_id in found],
+            missing=[spelling for task_id, spelling in requested.items() if task_id not in found],
+        )
+    
+    def create_task(self, db: Session, task_data: TaskCreate, tenant_id: str = DEFAULT_TENANT) -> TaskResponse:
+        if self._coalesce(db):
+            return self.group_commit.submit(lambda session: self.create_task(session, task_data, tenant_id))
         try:
-            task = self.repository.create(db, obj_in=task_data)
+            task = self.repository.create(db, obj_in=task_data, tenant_id=tenant_id)
             logger.info(f"Created new task: {task.id} - {task.title}")
-            return TaskResponse.from_orm(task)
+            response = TaskResponse.from_orm(task)
+            self._publish(db, "task.created", response.id, response.model_dump(mode="json"), tenant_id)
+            return response
         except SQLAlchemyError as e:
             logger.error(f"Database error while creating task: {e}")
             raise DatabaseError("Failed to create task")
     
-    def update_task(self, db: Session, task_id: str, task_data: TaskUpdate) -> TaskResponse:
+    def update_task(
+        self, db: Session, task_id: str, task_data: TaskUpdate, tenant_id: str = DEFAULT_TENANT
+    ) -> TaskResponse:
         try:
-            existing_task = self.repository.get(db, task_id)
+            # Writing to an archived task brings it back into the hot table
+            existing_task = (
+                self.repository.get(db, task_id, tenant_id) or self.repository.restore(db, task_id, tenant_id)
+            )
             if not existing_task:
                 raise TaskNotFoundError(f"Task with ID {task_id} not found")
             
             updated_task = self.repository.update(db, db_obj=existing_task, obj_in=task_data)
             logger.info(f"Updated task: {task_id} - {updated_task.title}")
-            return TaskResponse.from_orm(updated_task)
+            response = TaskResponse.from_orm(updated_task)
+            self._publish(db, "task.updated", task_id, response.model_dump(mode="json"), tenant_id)
+            return response
         except SQLAlchemyError as e:
             logger.error(f"Database error while updating task {task_id}: {e}")
             raise DatabaseError(f"Failed to update task {task_id}")
     
-    def toggle_task_completion(self, db: Session, task_id: str) -> TaskToggleResponse:
+    def toggle_task_completion(self, db: Session, task_id: str, tenant_id: str = DEFAULT_TENANT) -> TaskToggleResponse:
+        if self._coalesce(db):
+            return self.group_commit.submit(lambda session: self.toggle_task_completion(session, task_id, tenant_id))
         try:
-            task = self.repository.toggle_completion(db, task_id)
+            task = self.repository.toggle_completion(db, task_id, tenant_id)
+            if not task and self.repository.restore(db, task_id, tenant_id):
+                task = self.repository.toggle_completion(db, task_id, tenant_id)
             if not task:
                 raise TaskNotFoundError(f"Task with ID {task_id} not found")
             
             status_text = "completed" if task.completed else "marked as pending"
             logger.info(f"Task {task_id} {status_text}")
             
-            return TaskToggleResponse(
+            response = TaskToggleResponse(
                 id=task.id,
                 completed=task.completed,
                 message=f"Task {status_text} successfully"
             )
+            self._publish(db, "task.toggled", task_id, {"id": task.id, "completed": task.completed}, tenant_id)
+            return response
         except SQLAlchemyError as e:
             logger.error(f"Database error while toggling task {task_id}: {e}")
             raise DatabaseError(f"Failed to toggle task {task_id}")
     
-    def delete_task(self, db: Session, task_id: str) -> TaskDeleteResponse:
+    def delete_task(self, db: Session, task_id: str, tenant_id: str = DEFAULT_TENANT) -> TaskDeleteResponse:
         try:
-            deleted_task = self.repository.delete(db, id=task_id)
+            deleted_task = self.repository.delete(db, id=task_id, tenant_id=tenant_id)
+            if not deleted_task and self.repository.restore(db, task_id, tenant_id):
+                deleted_task = self.repository.delete(db, id=task_id, tenant_id=tenant_id)
             if not deleted_task:
                 raise TaskNotFoundError(f"Task with ID {task_id} not found")
             
             logger.info(f"Deleted task: {task_id} - {deleted_task.title}")
+            self._publish(db, "task.deleted", task_id, {"id": task_id}, tenant_id)
             return TaskDeleteResponse(id=task_id, message="Task deleted successfully")
         except SQLAlchemyError as e:
             logger.error(f"Database error while deleting task {task_id}: {e}")
             raise DatabaseError(f"Failed to delete task {task_id}")
     
-    def search_tasks(self, db: Session, query: str) -> List[TaskResponse]:
+    def search_tasks(
+        self, db: Session, query: str, include_archived: bool = False, tenant_id: str = DEFAULT_TENANT
+    ) -> List[TaskResponse]:
         try:
             if not query or len(query.strip()) < 2:
                 raise TaskValidationError("Search query must be at least 2 characters long")
             
-            tasks = self.repository.search_tasks(db, query.strip())
+            tasks = self.repository.search_tasks(
+                db, query.strip(), include_archived=include_archived, tenant_id=tenant_id
+            )
             logger.info(f"Search for '{query}' returned {len(tasks)} results")
             return [TaskResponse.from_orm(task) for task in tasks]
         except SQLAlchemyError as e:
             logger.error(f"Database error while searching tasks: {e}")
             raise DatabaseError("Failed to search tasks")
     
-    def get_task_statistics(self, db: Session) -> TaskStats:
+    @coalesced
+    def get_task_statistics(
+        self, db: Session, include_archived: bool = False, tenant_id: str = DEFAULT_TENANT
+    ) -> TaskStats:
         try:
-            stats = self.repository.get_task_stats(db)
+            stats = self.repository.get_task_stats(db, include_archived=include_archived, tenant_id=tenant_id)
             return TaskStats(**stats)
         except SQLAlchemyError as e:
             logger.error(f"Database error while fetching task statistics: {e}")
             raise DatabaseError("Failed to fetch task statistics")
     
-    def get_completed_tasks(self, db: Session) -> List[TaskResponse]:
+    @coalesced
+    def get_completed_tasks(
+        self, db: Session, include_archived: bool = False, tenant_id: str = DEFAULT_TENANT
+    ) -> List[TaskResponse]:
         try:
-            tasks = self.repository.get_completed_tasks(db)
+            tasks = self.repository.get_completed_tasks(db, include_archived=include_archived, tenant_id=tenant_id)
             return [TaskResponse.from_orm(task) for task in tasks]
         except SQLAlchemyError as e:
             logger.error(f"Database error while fetching completed tasks: {e}")
             raise DatabaseError("Failed to fetch completed tasks")
     
-    def get_pending_tasks(self, db: Session) -> List[TaskResponse]:
+    @coalesced
+    def get_pending_tasks(self, db: Session, tenant_id: str = DEFAULT_TENANT) -> List[TaskResponse]:
         try:
-            tasks = self.repository.get_pending_tasks(db)
+            tasks = self.repository.get_pending_tasks(db, tenant_id=tenant_id)
             return [TaskResponse.from_orm(task) for task in tasks]
         except SQLAlchemyError as e:
             logger.error(f"Database error while fetching pending tasks: {e}")
             raise DatabaseError("Failed to fetch pending tasks")
+    
+    def _parse_change_cursor(self, since: Optional[str]) -> List[int]:
+        width = self.repository.change_feed_width
+        if not since:
+            return [0] * width
+        try:
+            cursor = [int(part) for part in since.split(",")]
+        except ValueError:
+            raise TaskValidationError("Malformed change cursor")
+        if len(cursor) != width or any(seq < 0 for seq in cursor):
+            raise TaskValidationError("Change cursor does not match this deployment; start a full sync")
+        return cursor
+    
+    def get_task_changes(
+        self, db: Session, since: Optional[str] = None, limit: int = 500, tenant_id: str = DEFAULT_TENANT
+    ) -> TaskChangeFeed:
+        cursor = self._parse_change_cursor(since)
+        try:
+            changes, tasks, next_cursor, has_more = self.repository.get_changes(db, cursor, limit, tenant_id)
+            
+            upserted = []
+            deleted = []
+            for change in changes:
+                if change.operation == CHANGE_DELETE:
+                    deleted.append(TaskTombstone(id=change.task_id, deleted_at=change.changed_at))
+                elif change.task_id in tasks:
+                    upserted.append(TaskResponse.from_orm(tasks[change.task_id]))
+            
+            return TaskChangeFeed(
+                changes=upserted,
+                deleted=deleted,
+                cursor=",".join(str(seq) for seq in next_cursor),
+                has_more=has_more
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching task changes: {e}")
+            raise DatabaseError("Failed to fetch task changes")
+    
+    def backfill_change_feed(self, db: Session) -> int:
+        try:
+            backfilled = self.repository.backfill_changes(db)
+            if backfilled:
+                logger.info(f"Backfilled change feed with {backfilled} existing tasks")
+            return backfilled
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while backfilling the change feed: {e}")
+            raise DatabaseError("Failed to backfill the change feed")
+
+    
+    @coalesced
+    def get_task_analytics(
+        self, db: Session, start: Optional[date] = None, end: Optional[date] = None, granularity: str = "day",
+        tenant_id: str = DEFAULT_TENANT,
+    ) -> TaskAnalytics:
+        end = end or datetime.now(timezone.utc).date()
+        start = start or end - timedelta(days=29)
+        if start > end:
+            raise TaskValidationError("Analytics start must not be after end")
+        if (end - start).days >= MAX_ANALYTICS_DAYS:
+            raise TaskValidationError(f"Analytics range cannot exceed {MAX_ANALYTICS_DAYS} days")
+        try:
+            days, histogram = self.analytics.get_range(db, start, end, tenant_id)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while fetching task analytics: {e}")
+            raise DatabaseError("Failed to fetch task analytics")
+        
+        def period(day: date) -> date:
+            return day if granularity == "day" else max(start, day - timedelta(days=day.weekday()))
+        
+        counts: Dict[date, List[int]] = defaultdict(lambda: [0, 0])
+        for day, created, completed in days:
+            counts[period(day)][0] += created
+            counts[period(day)][1] += completed
+        durations: Dict[date, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        overall: Dict[int, int] = defaultdict(int)
+        for day, bucket, count in histogram:
+            durations[period(day)][bucket] += count
+            overall[bucket] += count
+        
+        buckets = [
+            TaskAnalyticsBucket(
+                period_start=period_start,
+                created=created,
+                completed=completed,
+                median_time_to_complete_seconds=histogram_quantile(durations[period_start]),
+            )
+            for period_start, (created, completed) in sorted(counts.items())
+            if created or completed
+        ]
+        return TaskAnalytics(
+            granularity=granularity,
+            start=start,
+            end=end,
+            buckets=buckets,
+            totals=TaskAnalyticsBucket(
+                period_start=start,
+                created=sum(bucket.created for bucket in buckets),
+                completed=sum(bucket.completed for bucket in buckets),
+                median_time_to_complete_seconds=histogram_quantile(overall),
+            ),
+        )
+    
+    def rebuild_analytics(self, db: Session, batch_size: int = 1000) -> Dict[str, int]:
+        try:
+            summary = self.analytics.rebuild(db, batch_size=batch_size)
+            logger.info(f"Rebuilt task analytics: {summary}")
+            return summary
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while rebuilding task analytics: {e}")
+            raise DatabaseError("Failed to rebuild task analytics")
+    
+    def backfill_analytics(self, db: Session) -> bool:
+        """Build the analytics rollups once for tasks that predate them"""
+        try:
+            if not self.analytics.is_empty(db):
+                return False
+            if not (self.repository.count(db) or self.repository.count_archived(db)):
+                return False
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while checking task analytics: {e}")
+            raise DatabaseError("Failed to check task analytics")
+        self.rebuild_analytics(db)
+        return True
+
+    def rebuild_task_counts(self, db: Session) -> int:
+        """Recount every tenant's tasks; returns how many tenants have tasks"""
+        try:
+            counts = self.repository.rebuild_counts(db)
+            logger.info(f"Rebuilt task counters of {len(counts)} tenants")
+            return len(counts)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while rebuilding task counters: {e}")
+            raise DatabaseError("Failed to rebuild task counters")
+    
+    def backfill_task_counts(self, db: Session) -> bool:
+        """Build the per-tenant counters once for tasks that predate them"""
+        try:
+            if self.repository.has_counts(db):
+                return False
+            if not (self.repository.count(db) or self.repository.count_archived(db)):
+                return False
+        except SQLAlchemyError as e:
+            logger.error(f"Database error while checking task counters: {e}")
+            raise DatabaseError("Failed to check task counters")
+        self.rebuild_task_counts(db)
+        return True
 
 
 task_service = TaskService()
@@ -0,0 +1,42 @@
+"""
+app/utils/histogram.py - Log-scale duration histograms for approximate quantiles
+"""
+import math
+from typing import Dict, Optional, Tuple
+
+# Buckets per doubling of the duration; 4 gives bounds about 19% apart
+BUCKETS_PER_OCTAVE = 4
+
+
+def duration_bucket(seconds: float) -> int:
+    """Histogram bucket holding a duration of ``seconds``"""
+    return int(math.floor(math.log2(max(seconds, 0.0) + 1.0) * BUCKETS_PER_OCTAVE))
+
+
+def bucket_bounds(bucket: int) -> Tuple[float, float]:
+    """Smallest and largest duration in seconds that fall into ``bucket``"""
+    return (
+        2 ** (bucket / BUCKETS_PER_OCTAVE) - 1.0,
+        2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE) - 1.0,
+    )
+
+
+def histogram_quantile(counts: Dict[int, int], quantile: float = 0.5) -> Optional[float]:
+    """Estimate a quantile from bucket counts, interpolating inside the bucket.
+
+    Returns None for an empty histogram.
+    """
+    total = sum(count for count in counts.values() if count > 0)
+    if total == 0:
+        return None
+    target = quantile * total
+    seen = 0
+    for bucket in sorted(counts):
+        count = counts[bucket]
+        if count <= 0:
+            continue
+        if seen + count >= target:
+            low, high = bucket_bounds(bucket)
+            return low + (high - low) * (target - seen) / count
+        seen += count
+    return bucket_bounds(max(counts))[1]
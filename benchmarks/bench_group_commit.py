@@ -0,0 +1,95 @@
+"""
+benchmarks/bench_group_commit.py - Write throughput: one commit per request vs group commit
+
+Runs the same storm of concurrent creates and toggles against a SQLite file
+twice: once with every request committing its own transaction and once
+through the group committer, and reports writes per second and the mean
+number of writes per transaction.
+
+    python -m benchmarks.bench_group_commit --threads 32 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.core.group_commit import GroupCommitter, group_commit_batches, group_commit_writes
+from app.schemas.task import TaskCreate
+from app.services.task import TaskService
+
+
+def storm(service: TaskService, session_factory: sessionmaker, threads: int, writes: int, task_ids: List[str]) -> float:
+    """Run ``writes`` operations on each of ``threads`` threads; returns elapsed seconds"""
+    def worker(index: int) -> None:
+        for i in range(writes):
+            with session_factory() as db:
+                if i % 4 == 0:
+                    service.create_task(db, TaskCreate(title=f"Task {index}-{i}"))
+                else:
+                    service.toggle_task_completion(db, task_ids[(index + i) % len(task_ids)])
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def run(label: str, path: str, committer: Optional[Callable[[sessionmaker], GroupCommitter]], args) -> None:
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 60},
+        pool_size=args.threads + 1,
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    service = TaskService()
+    service.group_commit = None
+    with session_factory() as db:
+        task_ids = [service.create_task(db, TaskCreate(title=f"Seed {i}")).id for i in range(args.threads * 4)]
+
+    if committer is not None:
+        service.group_commit = committer(session_factory)
+    batches = group_commit_batches.value()
+    committed = group_commit_writes.value(outcome="committed")
+    elapsed = storm(service, session_factory, args.threads, args.writes, task_ids)
+    if service.group_commit is not None:
+        service.group_commit.stop()
+    engine.dispose()
+
+    total = args.threads * args.writes
+    transactions = group_commit_batches.value() - batches if committer else total
+    if committer:
+        total = group_commit_writes.value(outcome="committed") - committed
+    print(f"{label:<28}{total / elapsed:>12,.0f}{total / max(transactions, 1):>16.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent writers (request threads)")
+    parser.add_argument("--writes", type=int, default=200, help="Writes per thread (1 create : 3 toggles)")
+    parser.add_argument("--max-batch", type=int, default=64, help="Group commit max batch size")
+    parser.add_argument("--max-delay-ms", type=float, default=2.0, help="Group commit max delay")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.writes} writes on a SQLite file\n")
+    print(f"{'path':<28}{'writes/s':>12}{'writes/commit':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        run("commit per request", os.path.join(directory, "direct.db"), None, args)
+        run(
+            f"group commit ({args.max_batch}, {args.max_delay_ms}ms)",
+            os.path.join(directory, "grouped.db"),
+            lambda factory: GroupCommitter(factory, args.max_batch, args.max_delay_ms / 1000),
+            args,
+        )
+
+
+if __name__ == "__main__":
+    main()
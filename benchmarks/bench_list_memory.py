@@ -0,0 +1,75 @@
+"""
+benchmarks/bench_list_memory.py - Bytes allocated per task on the list path
+
+Measures the tracemalloc peak of each stage of ``GET /tasks/?limit=N``
+against an in-memory SQLite database: loading the ORM objects, building
+the TaskList response schemas and encoding JSON, then the whole path as
+the endpoint runs it. Exits non-zero when the whole path allocates more
+than --max-bytes-per-task, so it can gate serialization changes in CI.
+
+    python -m benchmarks.bench_list_memory --tasks 1000 --max-bytes-per-task 4096
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.core.memory import track_peak
+from app.core.serialization import encode_json
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate, TaskList, TaskResponse
+from app.services.task import task_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks listed (the limit)")
+    parser.add_argument("--max-bytes-per-task", type=int, default=None, help="Fail above this end-to-end peak")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as db:
+        for i in range(args.tasks):
+            description = "Review the quarterly report and send feedback to the team" if i % 2 else ""
+            task_repository.create(db, obj_in=TaskCreate(title=f"Task number {i}", description=description))
+
+    def orm(db):
+        return task_repository.get_multi(db, limit=args.tasks)
+
+    def schemas(db):
+        tasks = orm(db)
+        return TaskList(
+            tasks=[TaskResponse.from_orm(task) for task in tasks], total=len(tasks), completed=0, pending=0
+        )
+
+    def encoded(db):
+        return encode_json(schemas(db))
+
+    def endpoint(db):
+        return encode_json(task_service.get_all_tasks(db, limit=args.tasks))
+
+    print(f"{args.tasks} tasks, tracemalloc peak per stage (cumulative)\n")
+    print(f"{'stage':<22}{'peak KiB':>12}{'bytes/task':>12}")
+    per_task = 0.0
+    for label, stage in [
+        ("ORM objects", orm), ("+ response schemas", schemas), ("+ JSON", encoded), ("endpoint path", endpoint)
+    ]:
+        with session_factory() as db:
+            stage(db)  # warm the statement and schema caches
+        with session_factory() as db, track_peak() as measurement:
+            stage(db)
+        per_task = measurement.peak_bytes / args.tasks
+        print(f"{label:<22}{measurement.peak_bytes / 1024:>12,.0f}{per_task:>12,.0f}")
+
+    if args.max_bytes_per_task is not None and per_task > args.max_bytes_per_task:
+        print(f"\nFAIL: {per_task:,.0f} bytes per task exceeds {args.max_bytes_per_task:,}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
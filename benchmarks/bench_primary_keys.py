@@ -0,0 +1,121 @@
+"""
+benchmarks/bench_primary_keys.py - Insert throughput and index size: UUID4 strings vs UUIDv7 bytes
+
+Builds the legacy tasks schema (random UUID4 in a VARCHAR(36) primary key
+plus its redundant index) and the current one (UUIDv7 in a 16-byte primary
+key) in separate SQLite files, inserts the same number of rows into each and
+reports throughput and on-disk size per table and index.
+
+    python -m benchmarks.bench_primary_keys --rows 10000000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Tuple
+
+from app.utils.ids import uuid7
+
+LEGACY_SCHEMA = """
+CREATE TABLE tasks (
+    id VARCHAR(36) NOT NULL PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    completed BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+CREATE INDEX ix_tasks_id ON tasks (id);
+CREATE INDEX ix_tasks_title ON tasks (title);
+CREATE INDEX ix_tasks_completed ON tasks (completed);
+"""
+
+COMPACT_SCHEMA = """
+CREATE TABLE tasks (
+    id BLOB NOT NULL PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT,
+    completed BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+);
+CREATE INDEX ix_tasks_title ON tasks (title);
+CREATE INDEX ix_tasks_completed ON tasks (completed);
+"""
+
+VARIANTS: Dict[str, Tuple[str, Callable[[], object]]] = {
+    "uuid4 VARCHAR(36)": (LEGACY_SCHEMA, lambda: str(uuid.uuid4())),
+    "uuid7 BLOB(16)": (COMPACT_SCHEMA, lambda: uuid7().bytes),
+}
+
+
+def run_variant(path: str, schema: str, make_id: Callable[[], object], rows: int, batch_size: int) -> dict:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    
+    now = datetime.utcnow().isoformat(sep=" ")
+    inserted = 0
+    tail_start = rows - max(rows // 10, batch_size)
+    tail_elapsed = 0.0
+    started = time.perf_counter()
+    while inserted < rows:
+        count = min(batch_size, rows - inserted)
+        batch = [(make_id(), f"Task {inserted + i}", "", (inserted + i) % 3 == 0, now, now) for i in range(count)]
+        batch_started = time.perf_counter()
+        conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        if inserted >= tail_start:
+            tail_elapsed += time.perf_counter() - batch_started
+        inserted += count
+    elapsed = time.perf_counter() - started
+    
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    conn.close()
+    return {
+        "rows_per_second": rows / elapsed,
+        "tail_rows_per_second": (rows - tail_start) / tail_elapsed if tail_elapsed else 0.0,
+        "sizes": sizes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows inserted per variant")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per transaction")
+    parser.add_argument("--dir", default=None, help="Directory for the benchmark databases")
+    args = parser.parse_args()
+    
+    workdir = args.dir or tempfile.mkdtemp(prefix="bench_pk_")
+    print(f"Inserting {args.rows:,} rows per variant into {workdir}\n")
+    
+    results = {}
+    for name, (schema, make_id) in VARIANTS.items():
+        path = os.path.join(workdir, name.split()[0] + ".db")
+        if os.path.exists(path):
+            os.remove(path)
+        results[name] = run_variant(path, schema, make_id, args.rows, args.batch_size)
+    
+    print(f"{'variant':<20}{'rows/s':>12}{'last 10% rows/s':>18}{'table MiB':>12}{'index MiB':>12}")
+    for name, result in results.items():
+        sizes = result["sizes"]
+        table_size = sizes.get("tasks", 0)
+        index_size = sum(size for index, size in sizes.items() if index.startswith(("ix_", "sqlite_autoindex")))
+        print(
+            f"{name:<20}{result['rows_per_second']:>12,.0f}{result['tail_rows_per_second']:>18,.0f}"
+            f"{table_size / 2**20:>12.1f}{index_size / 2**20:>12.1f}"
+        )
+    
+    print("\nPer-structure size (MiB):")
+    for name, result in results.items():
+        details = ", ".join(f"{index}={size / 2**20:.1f}" for index, size in sorted(result["sizes"].items()))
+        print(f"  {name}: {details}")
+
+
+if __name__ == "__main__":
+    main()
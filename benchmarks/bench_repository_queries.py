@@ -0,0 +1,95 @@
+"""
+benchmarks/bench_repository_queries.py - Per-call overhead of legacy Query vs 2.0 select() repositories
+
+Runs the get, list and toggle paths against an in-memory SQLite database,
+where SQL execution is cheap and per-call time is dominated by Python work
+(statement construction, compilation and ORM loading). Each call uses a
+fresh session, as a request would. The legacy variants reproduce the
+``db.query(...)`` code the repositories used before.
+
+    python -m benchmarks.bench_repository_queries --calls 2000
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base, compiled_cache_lookups, instrument_engine
+from app.models.task import Task
+from app.models.task_change import TaskChange, CHANGE_UPSERT
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate
+
+
+def legacy_get(db: Session, task_id: str) -> Task:
+    return db.query(Task).filter(Task.id == task_id).first()
+
+
+def legacy_list(db: Session, task_id: str) -> List[Task]:
+    return db.query(Task).offset(0).limit(100).all()
+
+
+def legacy_toggle(db: Session, task_id: str) -> Task:
+    task = legacy_get(db, task_id)
+    task.toggle_completion()
+    db.add(task)
+    db.query(TaskChange).filter(TaskChange.task_id == task.id).delete(synchronize_session=False)
+    db.add(TaskChange(task_id=task.id, operation=CHANGE_UPSERT))
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+PATHS = {
+    "get": (legacy_get, lambda db, task_id: task_repository.get(db, task_id)),
+    "list": (legacy_list, lambda db, task_id: task_repository.get_multi(db, skip=0, limit=100)),
+    "toggle": (legacy_toggle, lambda db, task_id: task_repository.toggle_completion(db, task_id)),
+}
+
+
+def time_calls(session_factory: sessionmaker, call: Callable, task_ids: List[str], calls: int) -> float:
+    """Mean seconds per call, each in its own session"""
+    started = time.perf_counter()
+    for i in range(calls):
+        with session_factory() as db:
+            call(db, task_ids[i % len(task_ids)])
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500, help="Tasks in the table")
+    parser.add_argument("--calls", type=int, default=2000, help="Calls timed per path and variant")
+    args = parser.parse_args()
+
+    engine = instrument_engine(create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    ))
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as db:
+        task_ids = [
+            task_repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id
+            for i in range(args.tasks)
+        ]
+
+    print(f"{args.tasks} tasks, {args.calls} calls per path, fresh session per call\n")
+    print(f"{'path':<8}{'legacy us':>12}{'select() us':>14}{'speedup':>10}")
+    for name, (legacy, current) in PATHS.items():
+        # One warm-up round fills the compiled cache for both variants
+        for call in (legacy, current):
+            time_calls(session_factory, call, task_ids, 10)
+        before = time_calls(session_factory, legacy, task_ids, args.calls)
+        after = time_calls(session_factory, current, task_ids, args.calls)
+        print(f"{name:<8}{before * 1e6:>12.1f}{after * 1e6:>14.1f}{before / after:>9.2f}x")
+
+    hits = compiled_cache_lookups.value(result="hit")
+    misses = compiled_cache_lookups.value(result="miss")
+    print(f"\ncompiled cache: {hits:.0f} hits, {misses:.0f} misses ({hits / (hits + misses):.1%} hit rate)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+benchmarks/bench_wire_formats.py - Payload size and encode time per response format
+
+Encodes a TaskList page with every available media type and content-coding,
+the same way the API does, and reports the payload size and mean encode time.
+
+    python -m benchmarks.bench_wire_formats --tasks 1000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.core.compression import COMPRESSORS
+from app.core.serialization import ENCODERS
+from app.schemas.task import TaskList, TaskResponse
+from app.utils.ids import uuid7
+
+
+def build_page(size: int) -> TaskList:
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    tasks = [
+        TaskResponse(
+            id=str(uuid7()),
+            title=f"Task number {i}",
+            description="Review the quarterly report and send feedback to the team" if i % 2 else "",
+            completed=i % 3 == 0,
+            created_at=started + timedelta(minutes=i),
+            updated_at=started + timedelta(minutes=i, seconds=30),
+        )
+        for i in range(size)
+    ]
+    return TaskList(tasks=tasks, total=size, completed=sum(task.completed for task in tasks), pending=0)
+
+
+def mean_seconds(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks per page")
+    parser.add_argument("--repeat", type=int, default=50, help="Encodings timed per format")
+    args = parser.parse_args()
+    
+    page = build_page(args.tasks)
+    print(f"TaskList page with {args.tasks} tasks, mean of {args.repeat} runs\n")
+    print(f"{'media type':<22}{'coding':<10}{'bytes':>10}{'encode ms':>12}{'total ms':>12}")
+    for media_type, encode in ENCODERS.items():
+        body = encode(page)
+        encode_ms = mean_seconds(lambda: encode(page), args.repeat) * 1000
+        print(f"{media_type:<22}{'identity':<10}{len(body):>10,}{encode_ms:>12.2f}{encode_ms:>12.2f}")
+        for coding, compress in COMPRESSORS.items():
+            compressed = compress(body)
+            compress_ms = mean_seconds(lambda: compress(body), args.repeat) * 1000
+            print(f"{'':<22}{coding:<10}{len(compressed):>10,}{compress_ms:>12.2f}{encode_ms + compress_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,7 @@ os.environ["DEBUG"] = "True"
 
 from app.main import app
 from app.core.database import get_db, Base
+from app.api.deps import get_database_session
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test_task_manager.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -53,9 +54,28 @@ def db_session(db_engine) -> Generator[Session, None, None]:
 
 
 @pytest.fixture(scope="function")
-def client() -> Generator[TestClient, None, None]:
+def client(db_session: Session) -> Generator[TestClient, None, None]:
+    def override_get_database_session():
+        yield db_session
+    
+    app.dependency_overrides[get_database_session] = override_get_database_session
     with TestClient(app) as test_client:
         yield test_client
+    app.dependency_overrides.pop(get_database_session, None)
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """A fresh SQLite file database with every table, usable from several threads"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(file_engine):
+    return sessionmaker(bind=file_engine, autoflush=False)
 
 
 @pytest.fixture
@@ -0,0 +1,123 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import (
+    EXPORT, READ, SCAN, SEARCH, WRITE,
+    AdmissionController, AdmissionMiddleware, classify,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_controller(**overrides):
+    options = dict(limits={}, max_in_flight=1, queue_size=10, queue_timeout=1.0)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestClassify:
+
+    def test_route_classes(self):
+        assert classify("GET", "/api/v1/tasks/0190c3a4-0000-7000-8000-000000000000") == READ
+        assert classify("GET", "/api/v1/tasks/") == SCAN
+        assert classify("GET", "/api/v1/tasks/stats/") == SCAN
+        assert classify("GET", "/api/v1/tasks/search/") == SEARCH
+        assert classify("GET", "/api/v1/tasks/changes") == EXPORT
+        assert classify("PATCH", "/api/v1/tasks/abc/toggle") == WRITE
+        assert classify("POST", "/api/v1/batch") == WRITE
+
+    def test_analytics_is_a_scan_and_a_multi_get_is_a_read(self):
+        assert classify("GET", "/api/v1/tasks/analytics") == SCAN
+        assert classify("GET", "/api/v1/tasks/", b"ids=a,b&limit=10") == READ
+        assert classify("GET", "/api/v1/tasks", b"ids=a") == READ
+        assert classify("GET", "/api/v1/tasks/", b"ids=&limit=10") == SCAN
+
+    def test_streams_and_health_bypass(self):
+        assert classify("GET", "/api/v1/tasks/stream") is None
+        assert classify("GET", "/health") is None
+        assert classify("OPTIONS", "/api/v1/tasks/") is None
+
+
+class TestAdmissionController:
+
+    def test_point_reads_are_admitted_before_scans(self):
+        async def scenario():
+            controller = make_controller()
+            order = []
+
+            async def request(route_class):
+                assert await controller.acquire(route_class) is None
+                order.append(route_class)
+                await asyncio.sleep(0)
+                controller.release(route_class)
+
+            await controller.acquire(WRITE)
+            waiting = [asyncio.create_task(request(cls)) for cls in (SCAN, EXPORT, READ)]
+            await asyncio.sleep(0)
+            assert controller.queued()[SCAN] == 1
+            controller.release(WRITE)
+            await asyncio.gather(*waiting)
+            return order
+
+        assert run(scenario()) == [READ, SCAN, EXPORT]
+
+    def test_class_limit_leaves_room_for_other_classes(self):
+        async def scenario():
+            controller = make_controller(limits={SEARCH: 1}, max_in_flight=4, queue_timeout=0.01)
+            assert await controller.acquire(SEARCH) is None
+            return await controller.acquire(SEARCH), await controller.acquire(READ)
+
+        assert run(scenario()) == ("timeout", None)
+
+    def test_full_queue_sheds_lowest_priority_waiter(self):
+        async def scenario():
+            controller = make_controller(queue_size=1)
+            await controller.acquire(WRITE)
+            scan = asyncio.create_task(controller.acquire(SCAN))
+            await asyncio.sleep(0)
+            read = asyncio.create_task(controller.acquire(READ))
+            rejected = await controller.acquire(EXPORT)
+            shed = await scan
+            controller.release(WRITE)
+            return rejected, shed, await read, controller.in_flight[READ]
+
+        assert run(scenario()) == ("queue_full", "shed", None, 1)
+
+
+class TestAdmissionMiddleware:
+
+    def test_saturated_route_class_gets_503_with_retry_after(self):
+        controller = make_controller(limits={SEARCH: 0}, max_in_flight=4, queue_timeout=0.01)
+        app = FastAPI()
+        app.add_middleware(AdmissionMiddleware, controller=controller, retry_after=3)
+
+        @app.get("/api/v1/tasks/search/")
+        def search():
+            return []
+
+        @app.get("/api/v1/tasks/{task_id}")
+        def get_task(task_id: str):
+            return {"id": task_id}
+
+        client = TestClient(app)
+        response = client.get("/api/v1/tasks/search/")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+        assert response.json()["type"] == "Overloaded"
+        assert client.get("/api/v1/tasks/abc").status_code == 200
+        assert controller.total_in_flight == 0
+
+    def test_metrics_endpoint_reports_admission(self, client):
+        client.get("/api/v1/tasks/")
+        body = client.get("/metrics").json()
+
+        admitted = {
+            entry["labels"]["route_class"]: entry["value"]
+            for entry in body["admission_admitted_total"]["values"]
+        }
+        assert admitted["scan"] >= 1
+        assert body["admission_queue_depth"]["type"] == "gauge"
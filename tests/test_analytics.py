@@ -0,0 +1,162 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.exceptions import TaskValidationError
+from app.models.task import Task
+from app.models.task_analytics import TaskCompletionHistogram, TaskDailyRollup
+from app.repositories.analytics import analytics_repository
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.task import task_service
+from app.utils.histogram import bucket_bounds, duration_bucket, histogram_quantile
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+def rollups(db):
+    days = [(row.day, row.created, row.completed) for row in db.scalars(select(TaskDailyRollup))]
+    histogram = sorted(
+        (row.day, row.bucket, row.count) for row in db.scalars(select(TaskCompletionHistogram)) if row.count
+    )
+    return sorted(days), histogram
+
+
+class TestHistogram:
+    
+    def test_bucket_bounds_contain_duration(self):
+        for seconds in (0, 0.5, 1, 59, 3600, 86400 * 30):
+            low, high = bucket_bounds(duration_bucket(seconds))
+            assert low <= seconds < high
+    
+    def test_median_is_within_bucket_resolution(self):
+        counts = {}
+        for seconds in [60] * 5 + [3600] * 10 + [86400] * 5:
+            counts[duration_bucket(seconds)] = counts.get(duration_bucket(seconds), 0) + 1
+        median = histogram_quantile(counts)
+        assert 3600 / 1.2 < median < 3600 * 1.2
+        assert histogram_quantile({}) is None
+
+
+class TestIncrementalRollups:
+    
+    def test_create_toggle_delete_update_counts(self, db):
+        today = datetime.now(timezone.utc).date()
+        first = task_repository.create(db, obj_in=TaskCreate(title="First"))
+        second = task_repository.create(db, obj_in=TaskCreate(title="Second"))
+        task_repository.toggle_completion(db, first.id)
+        assert rollups(db)[0] == [(today, 2, 1)]
+        
+        task_repository.toggle_completion(db, first.id)
+        assert rollups(db) == ([(today, 2, 0)], [])
+        
+        task_repository.toggle_completion(db, second.id)
+        task_repository.delete(db, id=second.id)
+        assert rollups(db) == ([(today, 1, 0)], [])
+        
+        task_repository.update(db, db_obj=first, obj_in=TaskUpdate(title="Renamed"))
+        assert rollups(db)[0] == [(today, 1, 0)]
+        task_repository.update(db, db_obj=first, obj_in=TaskUpdate(completed=True))
+        assert rollups(db)[0] == [(today, 1, 1)]
+        task_repository.update(db, db_obj=first, obj_in=TaskUpdate(completed=True))
+        assert rollups(db)[0] == [(today, 1, 1)]
+    
+    def test_create_and_delete_count_on_the_task_creation_day(self, db, monkeypatch):
+        tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+        
+        class Clock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return tomorrow
+        
+        # The rollup clock reads the other side of midnight from created_at
+        monkeypatch.setattr("app.repositories.analytics.datetime", Clock)
+        task = task_repository.create(db, obj_in=TaskCreate(title="Late night"))
+        created_on = task.created_at.date()
+        task_repository.toggle_completion(db, task.id)
+        task_repository.delete(db, id=task.id)
+        
+        assert rollups(db) == ([(created_on, 0, 0), (tomorrow.date(), 0, 0)], [])
+    
+    def test_rebuild_matches_incremental_rollups(self, db):
+        ids = [task_repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id for i in range(6)]
+        for task_id in ids[:4]:
+            task_repository.toggle_completion(db, task_id)
+        task_repository.delete(db, id=ids[0])
+        incremental = rollups(db)
+        
+        summary = analytics_repository.rebuild(db)
+        assert summary == {"days": 1, "tasks": 5, "completed": 3}
+        assert rollups(db) == incremental
+    
+    def test_rebuild_backfills_tasks_that_predate_rollups(self, db):
+        created = datetime(2024, 3, 4, 12, tzinfo=timezone.utc)
+        task = task_repository.create(db, obj_in=TaskCreate(title="Old"))
+        db.execute(
+            update(Task).where(Task.id == task.id)
+            .values(created_at=created, updated_at=created + timedelta(hours=2), completed=True)
+        )
+        db.commit()
+        
+        task_service.rebuild_analytics(db)
+        analytics = task_service.get_task_analytics(db, start=date(2024, 3, 1), end=date(2024, 3, 10))
+        assert [(b.period_start, b.created, b.completed) for b in analytics.buckets] == [(date(2024, 3, 4), 1, 1)]
+        assert 7200 / 1.2 < analytics.totals.median_time_to_complete_seconds < 7200 * 1.2
+
+
+class TestAnalyticsService:
+    
+    def seed(self, db):
+        db.add_all([
+            TaskDailyRollup(day=date(2024, 1, 1), created=3, completed=1),  # Monday
+            TaskDailyRollup(day=date(2024, 1, 3), created=2, completed=2),
+            TaskDailyRollup(day=date(2024, 1, 8), created=1, completed=0),  # next Monday
+            TaskCompletionHistogram(day=date(2024, 1, 1), bucket=duration_bucket(60), count=1),
+            TaskCompletionHistogram(day=date(2024, 1, 3), bucket=duration_bucket(600), count=2),
+        ])
+        db.commit()
+    
+    def test_weekly_buckets_group_iso_weeks(self, db):
+        self.seed(db)
+        analytics = task_service.get_task_analytics(db, date(2024, 1, 1), date(2024, 1, 14), "week")
+        
+        assert [(b.period_start, b.created, b.completed) for b in analytics.buckets] == [
+            (date(2024, 1, 1), 5, 3),
+            (date(2024, 1, 8), 1, 0),
+        ]
+        assert 600 / 1.2 < analytics.buckets[0].median_time_to_complete_seconds < 600 * 1.2
+        assert analytics.buckets[1].median_time_to_complete_seconds is None
+        assert (analytics.totals.created, analytics.totals.completed) == (6, 3)
+    
+    def test_daily_buckets_respect_range(self, db):
+        self.seed(db)
+        analytics = task_service.get_task_analytics(db, date(2024, 1, 2), date(2024, 1, 7))
+        assert [b.period_start for b in analytics.buckets] == [date(2024, 1, 3)]
+    
+    def test_start_after_end_is_rejected(self, db):
+        with pytest.raises(TaskValidationError):
+            task_service.get_task_analytics(db, date(2024, 2, 1), date(2024, 1, 1))
+
+
+class TestAnalyticsEndpoint:
+    
+    def test_reports_todays_activity(self, client):
+        task_id = client.post("/api/v1/tasks/", json={"title": "Analyse me"}).json()["id"]
+        client.patch(f"/api/v1/tasks/{task_id}/toggle")
+        
+        response = client.get("/api/v1/tasks/analytics", params={"granularity": "week"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["granularity"] == "week"
+        assert body["totals"]["created"] >= 1
+        assert body["totals"]["completed"] >= 1
+        assert body["totals"]["median_time_to_complete_seconds"] is not None
+    
+    def test_invalid_range_is_bad_request(self, client):
+        response = client.get("/api/v1/tasks/analytics", params={"start": "2024-02-01", "end": "2024-01-01"})
+        assert response.status_code == 400
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.repositories.job_cursor import job_cursor_repository
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate
+from app.services.archive import ARCHIVE_CURSOR, TaskArchiver
+from app.services.task import task_service
+
+LONG_AGO = datetime.now(timezone.utc) - timedelta(days=60)
+
+
+def complete_long_ago(db, task_ids):
+    # Complete through the repository so the tenant counters see it, then backdate
+    for task_id in task_ids:
+        task_repository.toggle_completion(db, task_id)
+    db.execute(update(Task).where(Task.id.in_(task_ids)).values(updated_at=LONG_AGO))
+    db.commit()
+
+
+@pytest.fixture
+def old_tasks(session_factory):
+    with session_factory() as db:
+        ids = [task_repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id for i in range(5)]
+        complete_long_ago(db, ids[:3])
+    return ids
+
+
+class TestTaskArchiver:
+    
+    def test_archives_only_long_completed_tasks(self, session_factory, old_tasks):
+        archiver = TaskArchiver(task_repository, session_factory, after_days=30, batch_size=2, pause=0)
+        
+        assert archiver.run_pass() == 3
+        with session_factory() as db:
+            assert task_repository.count(db) == 2
+            assert task_repository.count_archived(db) == 3
+            assert job_cursor_repository.get_position(db, ARCHIVE_CURSOR) is None
+    
+    def test_interrupted_pass_resumes_from_cursor(self, session_factory, old_tasks):
+        archiver = TaskArchiver(task_repository, session_factory, after_days=30, batch_size=2, pause=0)
+        
+        assert archiver.run_pass(max_batches=1) == 2
+        with session_factory() as db:
+            assert job_cursor_repository.get_position(db, ARCHIVE_CURSOR) is not None
+        assert archiver.run_pass() == 1
+    
+    def test_archived_task_stays_reachable_and_writable(self, session_factory, old_tasks):
+        TaskArchiver(task_repository, session_factory, after_days=30, batch_size=10, pause=0).run_pass()
+        
+        with session_factory() as db:
+            assert task_service.get_task_by_id(db, old_tasks[0]).completed is True
+            assert task_service.toggle_task_completion(db, old_tasks[0]).completed is False
+        with session_factory() as db:
+            assert db.get(TaskArchive, old_tasks[0]) is None
+            assert db.get(Task, old_tasks[0]).completed is False
+
+
+class TestArchiveEndpoints:
+    
+    def test_include_archived_flag(self, client, db_session, sample_task):
+        complete_long_ago(db_session, [sample_task.id])
+        task_repository.archive_completed(
+            db_session, datetime.now(timezone.utc) - timedelta(days=30), None, 10
+        )
+        
+        assert client.get("/api/v1/tasks/").json()["tasks"] == []
+        listed = client.get("/api/v1/tasks/", params={"include_archived": True}).json()
+        assert [task["id"] for task in listed["tasks"]] == [sample_task.id]
+        assert listed["completed"] == 1
+        assert client.get("/api/v1/tasks/completed/", params={"include_archived": True}).json()[0]["id"] == sample_task.id
+        assert client.get(f"/api/v1/tasks/{sample_task.id}").status_code == 200
@@ -0,0 +1,178 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import create_mock_engine, text
+
+from app.api.v1.endpoints import admin as admin_endpoint
+from app.core.config import get_settings
+from app.core.exceptions import BackupError
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate
+from app.services.backup import DatabaseBackup, database_backups
+
+
+def add_tasks(session_factory, count, prefix="Task"):
+    with session_factory() as db:
+        for i in range(count):
+            task_repository.create(db, obj_in=TaskCreate(title=f"{prefix} {i}", description="x" * 200))
+
+
+def count_tasks(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT count(*) FROM tasks").fetchone()[0]
+
+
+class TestDatabaseBackup:
+
+    def test_backup_copies_in_steps_and_reports_progress(self, file_engine, session_factory, tmp_path):
+        add_tasks(session_factory, 200)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pages_per_step=4, pause=0)
+        steps = []
+        before = database_backups.value(operation="backup", outcome="succeeded")
+
+        result = backups.backup(lambda done, total: steps.append((done, total)))
+
+        assert count_tasks(result["file"]) == 200
+        assert len(steps) > 1 and steps[-1] == (result["pages"], result["pages"])
+        assert result["bytes"] > 0 and result["duration_seconds"] >= 0
+        assert [entry["name"] for entry in backups.list_backups()] == [result["file"].rsplit("/", 1)[1]]
+        assert database_backups.value(operation="backup", outcome="succeeded") == before + 1
+
+    def test_writes_during_a_backup_are_not_blocked_and_leave_a_consistent_copy(
+        self, file_engine, session_factory, tmp_path
+    ):
+        add_tasks(session_factory, 300)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pages_per_step=2, pause=0.005)
+        written = threading.Event()
+
+        def write_once(done, total):
+            if not written.is_set():
+                written.set()
+                # Another connection commits while the backup is part way through
+                add_tasks(session_factory, 10, prefix="Concurrent")
+
+        result = backups.backup(write_once)
+
+        assert written.is_set()
+        assert result["restarts"] >= 1
+        assert count_tasks(result["file"]) == 310
+
+    def test_copy_restarted_too_often_finishes_in_one_step(self, file_engine, session_factory, tmp_path):
+        add_tasks(session_factory, 300)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pages_per_step=2, pause=0, max_restarts=2)
+        written = [0]
+
+        def write_every_step(done, total):
+            # Another connection commits after every step, so the copy never gets through
+            if done < total:
+                written[0] += 1
+                add_tasks(session_factory, 1, prefix=f"Concurrent {written[0]}")
+
+        result = backups.backup(write_every_step)
+
+        assert result["single_step"] is True
+        assert result["restarts"] == 3
+        assert count_tasks(result["file"]) == 300 + written[0]
+
+    def test_copy_restarted_by_updates_in_place_finishes_in_one_step(self, file_engine, session_factory, tmp_path):
+        add_tasks(session_factory, 300)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pages_per_step=2, pause=0, max_restarts=2)
+        written = [0]
+
+        def update_every_step(done, total):
+            # Updating an existing row restarts the copy without growing the file
+            if done < total:
+                written[0] += 1
+                with session_factory() as db:
+                    db.execute(text("UPDATE tasks SET description = :description WHERE title = 'Task 0'"),
+                               {"description": str(written[0]).rjust(200, "y")})
+                    db.commit()
+
+        result = backups.backup(update_every_step)
+
+        assert result["single_step"] is True
+        assert result["restarts"] == 3
+        assert written[0] < 100
+        assert count_tasks(result["file"]) == 300
+
+    def test_failed_or_cancelled_backup_leaves_no_file(self, file_engine, session_factory, tmp_path):
+        add_tasks(session_factory, 100)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pages_per_step=2, pause=0)
+
+        def cancel(done, total):
+            raise RuntimeError("cancelled")
+
+        with pytest.raises(RuntimeError):
+            backups.backup(cancel)
+        assert list((tmp_path / "backups").iterdir()) == []
+
+    def test_only_the_newest_backups_are_kept(self, file_engine, tmp_path):
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), keep=2, pause=0)
+        files = [backups.backup()["file"] for _ in range(3)]
+
+        assert [entry["name"] for entry in backups.list_backups()] == [
+            files[2].rsplit("/", 1)[1], files[1].rsplit("/", 1)[1]
+        ]
+
+    def test_restore_replaces_the_database_with_the_backup(self, file_engine, session_factory, tmp_path):
+        add_tasks(session_factory, 5)
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pause=0)
+        name = backups.backup()["file"].rsplit("/", 1)[1]
+        add_tasks(session_factory, 5, prefix="After")
+
+        result = backups.restore(name)
+
+        assert result["pages"] > 0
+        with file_engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM tasks")).scalar() == 5
+
+    def test_restore_rejects_missing_damaged_and_foreign_files(self, file_engine, tmp_path):
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"))
+        with pytest.raises(BackupError):
+            backups.restore("missing.db")
+
+        damaged = tmp_path / "damaged.db"
+        damaged.write_bytes(b"not a database" * 100)
+        with pytest.raises(BackupError):
+            backups.restore(str(damaged))
+
+        foreign = tmp_path / "foreign.db"
+        with sqlite3.connect(foreign) as conn:
+            conn.execute("CREATE TABLE notes (body TEXT)")
+        with pytest.raises(BackupError):
+            backups.restore(str(foreign))
+
+    def test_other_databases_are_refused(self):
+        backups = DatabaseBackup(create_mock_engine("postgresql://localhost/tasks", print), "backups")
+        assert not backups.supported
+        with pytest.raises(BackupError):
+            backups.backup()
+
+
+class TestBackupEndpoints:
+
+    @pytest.fixture
+    def backups(self, monkeypatch, file_engine, tmp_path):
+        backups = DatabaseBackup(file_engine, str(tmp_path / "backups"), pause=0)
+        monkeypatch.setattr(admin_endpoint, "database_backup", backups)
+        return backups
+
+    @pytest.fixture
+    def admin(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "admin")
+        return {"X-Admin-Token": "admin"}
+
+    def test_backups_are_admin_only(self, client):
+        assert client.get("/api/v1/admin/backups").status_code == 403
+        assert client.post("/api/v1/admin/backups").status_code == 403
+        assert client.post("/api/v1/jobs", json={"type": "backup_database"}).status_code == 403
+
+    def test_start_a_backup_job_and_list_backups(self, client, admin, backups):
+        response = client.post("/api/v1/admin/backups", headers=admin)
+        assert response.status_code == 202
+        assert (response.json()["type"], response.json()["status"]) == ("backup_database", "queued")
+
+        backups.backup()
+        listed = client.get("/api/v1/admin/backups", headers=admin).json()
+        assert len(listed["backups"]) == 1
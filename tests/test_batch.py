@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+
+
+class TestBatchEndpoint:
+    
+    def test_atomic_batch_commits_all(self, client: TestClient, sample_task):
+        response = client.post("/api/v1/batch", json={
+            "operations": [
+                {"op": "create", "data": {"title": "Batched"}},
+                {"op": "toggle", "task_id": sample_task.id},
+                {"op": "get", "task_id": sample_task.id},
+            ]
+        })
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["committed"] is True
+        assert [result["status"] for result in data["results"]] == [201, 200, 200]
+        assert data["results"][2]["body"]["completed"] is True
+        
+        created_id = data["results"][0]["body"]["id"]
+        assert client.get(f"/api/v1/tasks/{created_id}").status_code == 200
+    
+    def test_atomic_batch_rolls_back_on_failure(self, client: TestClient):
+        response = client.post("/api/v1/batch", json={
+            "mode": "atomic",
+            "operations": [
+                {"op": "create", "data": {"title": "Never persisted"}},
+                {"op": "toggle", "task_id": "missing-task"},
+                {"op": "create", "data": {"title": "Never executed"}},
+            ]
+        })
+        
+        data = response.json()
+        assert data["committed"] is False
+        assert [result["status"] for result in data["results"]] == [424, 404, 424]
+        
+        search = client.get("/api/v1/tasks/search/", params={"q": "Never"}).json()
+        assert search == []
+    
+    def test_best_effort_keeps_successful_operations(self, client: TestClient):
+        response = client.post("/api/v1/batch", json={
+            "mode": "best_effort",
+            "operations": [
+                {"op": "create", "data": {"title": "Kept one"}},
+                {"op": "delete", "task_id": "missing-task"},
+                {"op": "create", "data": {"title": "   "}},
+                {"op": "create", "data": {"title": "Kept two"}},
+            ]
+        })
+        
+        data = response.json()
+        assert data["committed"] is True
+        assert [result["status"] for result in data["results"]] == [201, 404, 422, 201]
+        
+        titles = {task["title"] for task in client.get("/api/v1/tasks/search/", params={"q": "Kept"}).json()}
+        assert titles == {"Kept one", "Kept two"}
+    
+    def test_operation_requires_task_id(self, client: TestClient):
+        response = client.post("/api/v1/batch", json={"operations": [{"op": "toggle"}]})
+        assert response.status_code == 422
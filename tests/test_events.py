@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.events import EventHub, LocalPubSub, event_hub
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestEventHub:
+    
+    def test_broadcast_to_all_subscribers(self):
+        async def scenario():
+            hub = EventHub(LocalPubSub(), queue_size=10, heartbeat_seconds=0)
+            await hub.start()
+            first, second = hub.subscribe(), hub.subscribe()
+            hub.publish("task.created", "abc", {"id": "abc"})
+            events = [await asyncio.wait_for(sub.next_event(), 1) for sub in (first, second)]
+            await hub.stop()
+            return events
+        
+        first, second = run(scenario())
+        assert first is second
+        assert first.type == "task.created"
+        assert json.loads(first.message)["task_id"] == "abc"
+        assert first.sse.startswith(b"id: 1\nevent: task.created\ndata: ")
+    
+    def test_slow_subscriber_is_dropped(self):
+        async def scenario():
+            hub = EventHub(LocalPubSub(), queue_size=2, heartbeat_seconds=0)
+            await hub.start()
+            slow = hub.subscribe()
+            for i in range(3):
+                hub.publish("task.updated", str(i))
+            await asyncio.sleep(0)
+            result = (slow.dropped, await slow.next_event(), len(hub.subscribers), hub.dropped_subscribers)
+            await hub.stop()
+            return result
+        
+        assert run(scenario()) == (True, None, 0, 1)
+    
+    def test_publish_from_worker_thread(self):
+        async def scenario():
+            hub = EventHub(LocalPubSub(), queue_size=10, heartbeat_seconds=0)
+            await hub.start()
+            subscription = hub.subscribe()
+            await asyncio.to_thread(hub.publish, "task.deleted", "xyz")
+            event = await asyncio.wait_for(subscription.next_event(), 1)
+            await hub.stop()
+            return event
+        
+        assert run(scenario()).type == "task.deleted"
+
+
+class TestTaskEventStream:
+    
+    def test_service_writes_publish_events(self, client: TestClient):
+        subscription = event_hub.subscribe()
+        try:
+            created = client.post("/api/v1/tasks/", json={"title": "Streamed"}).json()
+            client.patch(f"/api/v1/tasks/{created['id']}/toggle")
+            client.delete(f"/api/v1/tasks/{created['id']}")
+            
+            async def collect():
+                return [await asyncio.wait_for(subscription.next_event(), 1) for _ in range(3)]
+            
+            events = client.portal.call(collect)
+        finally:
+            event_hub.unsubscribe(subscription)
+        
+        assert [event.type for event in events] == ["task.created", "task.toggled", "task.deleted"]
+        assert all(json.loads(event.message)["task_id"] == created["id"] for event in events)
+    
+    def test_websocket_receives_events(self, client: TestClient):
+        with client.websocket_connect("/api/v1/tasks/stream") as websocket:
+            client.post("/api/v1/tasks/", json={"title": "Over the socket"})
+            message = json.loads(websocket.receive_text())
+        
+        assert message["type"] == "task.created"
+        assert message["data"]["title"] == "Over the socket"
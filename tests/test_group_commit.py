@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+from app.core.exceptions import TaskNotFoundError
+from app.core.group_commit import GroupCommitter, group_commit_batches
+from app.models.task import Task
+from app.schemas.task import TaskCreate
+from app.services.task import TaskService
+
+
+@pytest.fixture
+def service(session_factory):
+    service = TaskService()
+    service.group_commit = GroupCommitter(session_factory, max_batch=8, max_delay=0.2)
+    yield service, session_factory
+    service.group_commit.stop()
+
+
+def run_concurrently(count, target):
+    results = [None] * count
+    
+    def worker(index):
+        try:
+            results[index] = target(index)
+        except Exception as e:
+            results[index] = e
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_creates_share_a_transaction(service):
+    service, session_factory = service
+    batches = group_commit_batches.value()
+    
+    with session_factory() as db:
+        created = run_concurrently(8, lambda i: service.create_task(db, TaskCreate(title=f"Task {i}")))
+    
+    assert sorted(task.title for task in created) == [f"Task {i}" for i in range(8)]
+    assert group_commit_batches.value() - batches < 8
+    with session_factory() as db:
+        assert db.query(Task).count() == 8
+
+
+def test_failed_write_does_not_affect_the_rest_of_its_batch(service):
+    service, session_factory = service
+    with session_factory() as db:
+        task = service.create_task(db, TaskCreate(title="Toggle me"))
+        ids = [task.id, "missing-task", task.id]
+        results = run_concurrently(3, lambda i: service.toggle_task_completion(db, ids[i]))
+    
+    assert sum(isinstance(result, TaskNotFoundError) for result in results) == 1
+    toggled = [result for result in results if not isinstance(result, Exception)]
+    assert sorted(result.completed for result in toggled) == [False, True]
+    with session_factory() as db:
+        assert db.get(Task, task.id).completed is False
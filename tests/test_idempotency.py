@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Response
+from sqlalchemy import update
+from starlette.requests import Request
+
+from app.core.exceptions import IdempotencyKeyInProgressError
+from app.models.idempotency_key import IdempotencyKey
+from app.models.task import Task
+from app.repositories.idempotency import idempotency_repository
+from app.services.idempotency import IdempotencyService, fingerprint
+
+TASKS = "/api/v1/tasks/"
+
+
+def key(value):
+    return {"Idempotency-Key": value}
+
+
+def fake_request(path="/api/v1/tasks/"):
+    return Request({"type": "http", "method": "POST", "path": path, "headers": [], "query_string": b""})
+
+
+class TestIdempotentEndpoints:
+    
+    def test_retried_create_returns_the_first_response(self, client, db_session):
+        first = client.post(TASKS, json={"title": "Once"}, headers=key("create-1"))
+        second = client.post(TASKS, json={"title": "Once"}, headers=key("create-1"))
+        
+        assert (first.status_code, second.status_code) == (201, 201)
+        assert second.json() == first.json()
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert db_session.query(Task).filter(Task.title == "Once").count() == 1
+    
+    def test_retried_toggle_does_not_flip_back(self, client):
+        task_id = client.post(TASKS, json={"title": "Flip"}).json()["id"]
+        
+        for _ in range(2):
+            response = client.patch(f"{TASKS}{task_id}/toggle", headers=key("toggle-1"))
+            assert response.json()["completed"] is True
+        assert client.get(f"{TASKS}{task_id}").json()["completed"] is True
+    
+    def test_key_reused_for_a_different_request_is_rejected(self, client):
+        assert client.post(TASKS, json={"title": "A"}, headers=key("reused")).status_code == 201
+        assert client.post(TASKS, json={"title": "B"}, headers=key("reused")).status_code == 422
+    
+    def test_key_reused_with_a_different_response_format_is_rejected(self, client):
+        body = {"title": "Packed"}
+        packed = client.post(TASKS, json=body, headers={**key("format"), "Accept": "application/msgpack"})
+        assert packed.status_code == 201
+        assert client.post(TASKS, json=body, headers=key("format")).status_code == 422
+        replayed = client.post(TASKS, json=body, headers={**key("format"), "Accept": "application/x-msgpack"})
+        assert replayed.headers["content-type"] == "application/msgpack"
+    
+    def test_keys_are_scoped_to_tenants(self, client):
+        acme = client.post(TASKS, json={"title": "Shared"}, headers={**key("k"), "X-Tenant-ID": "acme"})
+        globex = client.post(TASKS, json={"title": "Shared"}, headers={**key("k"), "X-Tenant-ID": "globex"})
+        
+        assert acme.json()["id"] != globex.json()["id"]
+        assert "Idempotent-Replayed" not in globex.headers
+    
+    def test_failed_writes_release_the_key(self, client):
+        missing = client.patch(f"{TASKS}does-not-exist/toggle", headers=key("toggle-missing"))
+        assert missing.status_code == 404
+        assert "Idempotent-Replayed" not in missing.headers
+        
+        batch = {"operations": [{"op": "create", "data": {"title": "Batched"}}]}
+        first = client.post("/api/v1/batch", json=batch, headers=key("batch-1"))
+        second = client.post("/api/v1/batch", json=batch, headers=key("batch-1"))
+        assert second.json() == first.json()
+    
+    @pytest.mark.parametrize("value", ["", "has space", "x" * 256])
+    def test_invalid_key_is_rejected(self, client, value):
+        assert client.post(TASKS, json={"title": "Bad key"}, headers=key(value)).status_code == 400
+
+
+class TestIdempotencyService:
+    
+    def test_concurrent_duplicates_run_once(self, session_factory):
+        service = IdempotencyService(ttl=60, wait_timeout=5, in_flight_timeout=60)
+        calls, responses = [], []
+        
+        def operation():
+            calls.append(1)
+            time.sleep(0.2)
+            return Response(content=b"created", status_code=201)
+        
+        def send(separate_process):
+            if separate_process:
+                # A service of its own only sees the claim in the table
+                send_with = IdempotencyService(ttl=60, wait_timeout=5, in_flight_timeout=60)
+            else:
+                send_with = service
+            with session_factory() as db:
+                responses.append(send_with.run(db, "acme", "k", fake_request(), {"title": "x"}, operation))
+        
+        threads = [threading.Thread(target=send, args=(i == 3,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert [(r.status_code, r.body) for r in responses] == [(201, b"created")] * 4
+        assert sum("idempotent-replayed" in r.headers for r in responses) == 3
+    
+    def test_duplicate_of_a_slow_request_times_out(self, session_factory):
+        service = IdempotencyService(ttl=60, wait_timeout=0.2, in_flight_timeout=60)
+        now = datetime.now(timezone.utc)
+        with session_factory() as db:
+            idempotency_repository.claim(db, "acme", "k", fingerprint(fake_request()), now, now + timedelta(minutes=1))
+            
+            with pytest.raises(IdempotencyKeyInProgressError):
+                service.run(db, "acme", "k", fake_request(), None, lambda: Response(status_code=201))
+    
+    def test_expired_and_abandoned_keys_run_again(self, session_factory):
+        service = IdempotencyService(ttl=60, wait_timeout=1, in_flight_timeout=30)
+        long_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
+        with session_factory() as db:
+            run = lambda body: service.run(db, "acme", "k", fake_request(), None, lambda: Response(body, 201))
+            assert run(b"first").body == b"first"
+            assert run(b"second").body == b"first"
+            
+            db.execute(update(IdempotencyKey).values(expires_at=long_ago))
+            db.commit()
+            assert run(b"third").body == b"third"
+            
+            db.execute(update(IdempotencyKey).values(status_code=None, created_at=long_ago))
+            db.commit()
+            assert run(b"fourth").body == b"fourth"
+            
+            db.execute(update(IdempotencyKey).values(expires_at=long_ago))
+            db.commit()
+            assert idempotency_repository.purge_expired(db, datetime.now(timezone.utc), 100) == 1
+    
+    def test_server_errors_are_not_stored(self, session_factory):
+        service = IdempotencyService(ttl=60, wait_timeout=1, in_flight_timeout=60)
+        with session_factory() as db:
+            run = lambda code: service.run(db, "acme", "k", fake_request(), None, lambda: Response(status_code=code))
+            assert run(503).status_code == 503
+            assert run(200).status_code == 200
+            assert run(503).status_code == 200
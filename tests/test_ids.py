@@ -0,0 +1,54 @@
+import sqlite3
+import uuid
+
+from sqlalchemy.orm import sessionmaker
+
+from app.cli.migrate_task_ids import legacy_tables, migrate
+from app.core.database import build_engine
+from app.repositories.task import task_repository
+from app.utils.ids import uuid7
+
+
+def test_uuid7_is_time_ordered():
+    ids = [uuid7() for _ in range(2000)]
+    
+    assert all(value.version == 7 for value in ids)
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_task_ids_stay_canonical_strings(client, sample_task):
+    assert str(uuid.UUID(sample_task.id)) == sample_task.id
+    assert uuid.UUID(sample_task.id).version == 7
+    assert client.get(f"/api/v1/tasks/{sample_task.id.upper()}").json()["id"] == sample_task.id
+    assert client.get("/api/v1/tasks/not-a-uuid").status_code == 404
+
+
+def test_migrate_legacy_string_ids(tmp_path):
+    path = tmp_path / "legacy.db"
+    legacy_id = str(uuid.uuid4())
+    conn = sqlite3.connect(path)
+    conn.executescript(f"""
+        CREATE TABLE tasks (
+            id VARCHAR(36) NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL, description TEXT,
+            completed BOOLEAN NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+        );
+        CREATE INDEX ix_tasks_id ON tasks (id);
+        CREATE INDEX ix_tasks_title ON tasks (title);
+        INSERT INTO tasks VALUES ('{legacy_id}', 'Legacy', '', 0, '2025-01-01 00:00:00', '2025-01-01 00:00:00');
+    """)
+    conn.close()
+    
+    url = f"sqlite:///{path}"
+    engine = build_engine(url)
+    assert legacy_tables(engine) == ["tasks"]
+    
+    assert migrate(url) == {"tasks": 1}
+    assert legacy_tables(engine) == []
+    assert migrate(url) == {}
+    
+    db = sessionmaker(bind=engine)()
+    task = task_repository.get(db, legacy_id)
+    assert task.title == "Legacy" and task.id == legacy_id
+    db.close()
+    engine.dispose()
@@ -0,0 +1,196 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.api.deps import get_database_session
+from app.api.v1.endpoints import jobs as jobs_endpoint
+from app.api.v1.router import api_router
+from app.core.config import get_settings
+from app.models.job import Job, JOB_FAILED, JOB_RUNNING, FINISHED_STATUSES
+from app.repositories.job import job_repository
+from app.repositories.task import task_repository
+from app.services.jobs import JobRunner, job_runner
+
+
+class NoParams(BaseModel):
+    pass
+
+
+@pytest.fixture
+def runner(session_factory):
+    runner = JobRunner(session_factory, workers=3, poll_interval=0.05, stale_after=60)
+    runner.types.update(job_runner.types)
+    yield runner
+    runner.stop(timeout=5)
+
+
+@pytest.fixture
+def client(session_factory, runner, monkeypatch):
+    def session():
+        with session_factory() as db:
+            yield db
+    
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    app.dependency_overrides[get_database_session] = session
+    monkeypatch.setattr(jobs_endpoint, "job_runner", runner)
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "admin")
+    return {"X-Admin-Token": "admin"}
+
+
+def wait_for(client, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/jobs/{job_id}").json()
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def submit(client, job_type, **params):
+    response = client.post("/api/v1/jobs", json={"type": job_type, "params": params})
+    assert response.status_code == 202, response.text
+    return response.json()
+
+
+class TestJobEndpoints:
+    
+    def test_import_runs_in_the_background(self, client, runner, session_factory, monkeypatch):
+        monkeypatch.setattr(get_settings(), "JOBS_IMPORT_CHUNK_SIZE", 4)
+        runner.start()
+        job = submit(client, "import_tasks", tasks=[{"title": f"Imported {i}"} for i in range(10)])
+        assert job["status"] == "queued"
+        
+        job = wait_for(client, job["id"])
+        assert job["status"] == "succeeded"
+        assert job["result"] == {"imported": 10}
+        assert (job["progress_done"], job["progress_total"]) == (10, 10)
+        with session_factory() as db:
+            assert task_repository.count(db) == 10
+        
+        listed = client.get("/api/v1/jobs", params={"type": "import_tasks"}).json()["jobs"]
+        assert [listed_job["id"] for listed_job in listed] == [job["id"]]
+    
+    def test_export_writes_json_lines(self, client, runner, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "JOBS_EXPORT_DIR", str(tmp_path / "exports"))
+        runner.start()
+        wait_for(client, submit(client, "import_tasks", tasks=[{"title": "One"}, {"title": "Two"}])["id"])
+        
+        job = wait_for(client, submit(client, "export_tasks")["id"])
+        assert job["result"]["exported"] == 2
+        with open(job["result"]["file"]) as file:
+            assert sorted(json.loads(line)["title"] for line in file) == ["One", "Two"]
+    
+    @pytest.mark.parametrize("body", [
+        {"type": "no_such_job"},
+        {"type": "import_tasks", "params": {"tasks": []}},
+        {"type": "rebuild_analytics", "params": {"batch_size": 0}},
+    ])
+    def test_rejects_unknown_types_and_invalid_params(self, client, admin, body):
+        assert client.post("/api/v1/jobs", json=body, headers=admin).status_code == 400
+    
+    @pytest.mark.parametrize("job_type", ["archive_tasks", "rebuild_analytics", "rebuild_task_counts"])
+    def test_maintenance_jobs_need_the_admin_token(self, client, admin, job_type):
+        assert client.post("/api/v1/jobs", json={"type": job_type}).status_code == 403
+        wrong = client.post("/api/v1/jobs", json={"type": job_type}, headers={"X-Admin-Token": "nope"})
+        assert wrong.status_code == 403
+        assert client.post("/api/v1/jobs", json={"type": job_type}, headers=admin).status_code == 202
+    
+    def test_admin_jobs_are_hidden_from_other_clients(self, client, admin):
+        job = client.post("/api/v1/jobs", json={"type": "backup_database"}, headers=admin).json()
+        visible = client.post("/api/v1/jobs", json={"type": "export_tasks"}).json()
+        
+        assert client.get(f"/api/v1/jobs/{job['id']}").status_code == 404
+        assert client.post(f"/api/v1/jobs/{job['id']}/cancel").status_code == 404
+        assert [listed["id"] for listed in client.get("/api/v1/jobs").json()["jobs"]] == [visible["id"]]
+        
+        assert client.get(f"/api/v1/jobs/{job['id']}", headers=admin).json()["status"] == "queued"
+        listed = client.get("/api/v1/jobs", headers=admin).json()["jobs"]
+        assert {listed_job["id"] for listed_job in listed} == {job["id"], visible["id"]}
+        assert client.post(f"/api/v1/jobs/{job['id']}/cancel", headers=admin).json()["status"] == "cancelled"
+    
+    def test_unknown_job_is_404(self, client):
+        assert client.get("/api/v1/jobs/missing").status_code == 404
+        assert client.post("/api/v1/jobs/missing/cancel").status_code == 404
+
+
+class TestJobRunner:
+    
+    def test_concurrency_limit_per_type(self, client, runner):
+        release = threading.Event()
+        running, peak, lock = [0], [0], threading.Lock()
+        
+        @runner.register("blocking", NoParams, concurrency=1)
+        def blocking(context):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            release.wait(5)
+            with lock:
+                running[0] -= 1
+        
+        runner.start()
+        first, second = submit(client, "blocking")["id"], submit(client, "blocking")["id"]
+        time.sleep(0.3)
+        statuses = {client.get(f"/api/v1/jobs/{job_id}").json()["status"] for job_id in (first, second)}
+        assert statuses == {"running", "queued"}
+        
+        release.set()
+        assert wait_for(client, first)["status"] == wait_for(client, second)["status"] == "succeeded"
+        assert peak[0] == 1
+    
+    def test_cancel_running_and_queued_jobs(self, client, runner):
+        started = threading.Event()
+        ran = []
+        
+        @runner.register("cancellable", NoParams, concurrency=1)
+        def cancellable(context):
+            ran.append(context.job_id)
+            started.set()
+            for step in range(500):
+                context.check_cancelled()
+                context.progress(step, 500)
+                time.sleep(0.01)
+        
+        runner.start()
+        running, queued = submit(client, "cancellable")["id"], submit(client, "cancellable")["id"]
+        assert started.wait(5)
+        
+        assert client.post(f"/api/v1/jobs/{queued}/cancel").json()["status"] == "cancelled"
+        assert client.post(f"/api/v1/jobs/{running}/cancel").json()["cancel_requested"] is True
+        assert wait_for(client, running)["status"] == "cancelled"
+        assert ran == [running]
+    
+    def test_handler_errors_fail_the_job(self, client, runner):
+        @runner.register("broken", NoParams)
+        def broken(context):
+            raise RuntimeError("boom")
+        
+        runner.start()
+        job = wait_for(client, submit(client, "broken")["id"])
+        assert (job["status"], job["error"]) == ("failed", "boom")
+    
+    def test_abandoned_running_job_is_failed(self, session_factory, runner):
+        long_ago = datetime.now(timezone.utc) - timedelta(minutes=5)
+        with session_factory() as db:
+            db.add(Job(type="rebuild_analytics", status=JOB_RUNNING, started_at=long_ago, heartbeat_at=long_ago))
+            db.commit()
+        
+        runner.start()
+        time.sleep(0.3)
+        with session_factory() as db:
+            [job] = job_repository.get_recent(db)
+            assert job.status == JOB_FAILED
+            assert job.finished_at is not None
@@ -0,0 +1,116 @@
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.memory import MemoryMiddleware, MemoryTracker, memory_tracker, track_peak
+from app.core.serialization import encode_json
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate
+from app.services.task import task_service
+
+LISTED_TASKS = 500
+# Peak bytes allocated per listed task by the list path (ORM objects,
+# response schemas and JSON); about 2.5 KiB today
+MAX_BYTES_PER_TASK = 4096
+
+
+@pytest.fixture
+def session_factory(session_factory):
+    with session_factory() as db:
+        for i in range(LISTED_TASKS):
+            task_repository.create(db, obj_in=TaskCreate(title=f"Task number {i}", description="Some details" * (i % 3)))
+    return session_factory
+
+
+@pytest.fixture
+def tracking():
+    tracker = MemoryTracker(frames=5)
+    tracker.start()
+    yield tracker
+    tracker.stop()
+
+
+class TestTrackPeak:
+    
+    def test_measures_temporary_allocations(self):
+        with track_peak() as measurement:
+            buffer = bytearray(1024 * 1024)
+            del buffer
+        assert measurement.peak_bytes >= 1024 * 1024
+        assert not tracemalloc.is_tracing()
+    
+    def test_list_path_bytes_per_task(self, session_factory):
+        def list_tasks():
+            with session_factory() as db:
+                return encode_json(task_service.get_all_tasks(db, limit=LISTED_TASKS))
+        
+        list_tasks()  # warm statement and schema caches
+        with track_peak() as measurement:
+            body = list_tasks()
+        assert body.count(b'"id"') == LISTED_TASKS
+        assert measurement.peak_bytes / LISTED_TASKS < MAX_BYTES_PER_TASK
+
+
+class TestMemoryMiddleware:
+    
+    def make_client(self, tracker):
+        app = FastAPI()
+        
+        @app.get("/items/{item_id}")
+        def item(item_id: int):
+            return {"payload": "x" * 100_000, "id": item_id}
+        
+        app.add_middleware(MemoryMiddleware, tracker=tracker, token="snap")
+        return TestClient(app)
+    
+    def test_reports_peak_per_route(self, tracking):
+        client = self.make_client(tracking)
+        response = client.get("/items/1")
+        client.get("/items/2")
+        client.get("/nowhere")
+        
+        assert int(response.headers["X-Memory-Peak-Bytes"]) >= 100_000
+        stats = tracking.route_stats()
+        assert stats["GET /items/{item_id}"]["requests"] == 2
+        assert stats["GET /items/{item_id}"]["max_peak_bytes"] >= 100_000
+        assert "GET <unmatched>" in stats
+    
+    def test_snapshot_diff_needs_token(self, tracking):
+        client = self.make_client(tracking)
+        client.get("/items/1", headers={"X-Memory-Snapshot": "wrong"})
+        assert not tracking.diffs
+        
+        client.get("/items/1", headers={"X-Memory-Snapshot": "snap"})
+        [sites] = tracking.diffs.values()
+        assert sites and {"site", "size_bytes", "size_diff_bytes"} <= set(sites[0])
+    
+    def test_passes_through_when_not_tracing(self):
+        client = self.make_client(MemoryTracker())
+        assert "X-Memory-Peak-Bytes" not in client.get("/items/1").headers
+
+
+class TestAdminMemoryEndpoints:
+    
+    @pytest.fixture
+    def admin(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "admin")
+        return {"X-Admin-Token": "admin"}
+    
+    def test_not_found_without_tracemalloc(self, client, admin):
+        assert client.get("/api/v1/admin/memory/top", headers=admin).status_code == 404
+    
+    def test_top_allocations(self, client, admin):
+        memory_tracker.start()
+        try:
+            response = client.get("/api/v1/admin/memory/top", params={"limit": 5}, headers=admin)
+            report = client.get("/api/v1/admin/memory", headers=admin)
+        finally:
+            memory_tracker.stop()
+        assert response.status_code == 200
+        allocations = response.json()["allocations"]
+        assert 0 < len(allocations) <= 5
+        assert allocations[0]["size_bytes"] >= allocations[-1]["size_bytes"]
+        assert report.json() == {"routes": {}, "snapshot_diffs": {}}
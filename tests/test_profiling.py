@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+from app.core.config import get_settings
+from app.core.profiling import ProfileStore, ProfilingMiddleware, StackSampler, profile_store, to_speedscope
+
+TESTS_ROOT = str(Path(__file__).resolve().parent)
+
+
+def busy_loop(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def bystander_loop(seconds: float) -> int:
+    return busy_loop(seconds)
+
+
+def profiled_app(store: ProfileStore, **options) -> TestClient:
+    app = FastAPI()
+    
+    @app.get("/work")
+    def work():
+        busy_loop(0.05)
+        return {"ok": True}
+    
+    app.add_middleware(ProfilingMiddleware, store=store, interval=0.001, **options)
+    return TestClient(app)
+
+
+class TestStackSampler:
+    
+    def test_samples_code_under_root(self):
+        sampler = StackSampler(interval=0.001, root=TESTS_ROOT)
+        sampler.start()
+        busy_loop(0.05)
+        stacks = sampler.stop()
+        
+        busy = [stack for stack in stacks if "busy_loop (tests/test_profiling.py" in stack]
+        assert busy
+        assert all("test_samples_code_under_root" in stack for stack in busy)
+    
+    def test_request_sampler_keeps_only_the_requests_threads(self):
+        async def request():
+            sampler = StackSampler(interval=0.001, root=TESTS_ROOT, request=sys._getframe())
+            token = profiling._profiled.set(sampler)
+            sampler.start()
+            try:
+                await anyio.to_thread.run_sync(busy_loop, 0.1)
+            finally:
+                profiling._profiled.reset(token)
+            return sampler.stop()
+        
+        bystander = threading.Thread(target=bystander_loop, args=(0.2,))
+        bystander.start()
+        stacks = anyio.run(request)
+        bystander.join()
+        
+        assert any("busy_loop (tests/test_profiling.py" in stack for stack in stacks)
+        assert not any("bystander_loop" in stack for stack in stacks)
+
+
+class TestProfileStore:
+    
+    def test_save_list_load_and_prune(self, tmp_path):
+        store = ProfileStore(str(tmp_path), max_profiles=2)
+        names = []
+        for i in range(3):
+            name = store.new_name("GET", f"/api/v1/tasks/{i}")
+            store.save(name, Counter({"a;b": 2, "a;c": 1}))
+            names.append(name)
+            time.sleep(0.01)
+        
+        listed = [profile["name"] for profile in store.list()]
+        assert len(listed) == 2 and names[0] not in listed
+        assert store.load(names[-1]).splitlines() == ["a;b 2", "a;c 1"]
+        assert store.load("../secrets.folded") is None
+        assert store.load(names[0]) is None
+    
+    def test_speedscope_shares_frames(self):
+        profile = to_speedscope("p", "a;b 2\na;c 1\n")
+        assert [frame["name"] for frame in profile["shared"]["frames"]] == ["a", "b", "c"]
+        assert profile["profiles"][0]["samples"] == [[0, 1], [0, 2]]
+        assert profile["profiles"][0]["weights"] == [2, 1]
+
+
+class TestProfilingMiddleware:
+    
+    def test_only_authorized_header_triggers_profile(self, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        client = profiled_app(store, token="s3cret")
+        
+        assert "X-Profile-Id" not in client.get("/work").headers
+        assert "X-Profile-Id" not in client.get("/work", headers={"X-Profile": "wrong"}).headers
+        
+        response = client.get("/work", headers={"X-Profile": "s3cret"})
+        assert response.status_code == 200
+        name = response.headers["X-Profile-Id"]
+        assert [profile["name"] for profile in store.list()] == [name]
+    
+    def test_sample_rate_profiles_every_request(self, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        client = profiled_app(store, sample_rate=1.0)
+        for _ in range(2):
+            client.get("/work")
+        assert len(store.list()) == 2
+
+
+class TestAdminProfileEndpoints:
+    
+    @pytest.fixture
+    def admin(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "admin")
+        monkeypatch.setattr(profile_store, "directory", tmp_path)
+        profile_store.save("20240101T000000-abc-GET-tasks.folded", Counter({"main;handler": 3}))
+        return {"X-Admin-Token": "admin"}
+    
+    def test_requires_admin_token(self, client, admin):
+        assert client.get("/api/v1/admin/profiles").status_code == 403
+        assert client.get("/api/v1/admin/profiles", headers={"X-Admin-Token": "nope"}).status_code == 403
+    
+    def test_list_and_download(self, client, admin):
+        profiles = client.get("/api/v1/admin/profiles", headers=admin).json()["profiles"]
+        name = profiles[0]["name"]
+        
+        collapsed = client.get(f"/api/v1/admin/profiles/{name}", headers=admin)
+        assert collapsed.text == "main;handler 3\n"
+        speedscope = client.get(f"/api/v1/admin/profiles/{name}", params={"format": "speedscope"}, headers=admin)
+        assert speedscope.json()["profiles"][0]["weights"] == [3]
+        assert client.get("/api/v1/admin/profiles/missing.folded", headers=admin).status_code == 404
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, create_mock_engine
+
+from app.core.database import compiled_cache_lookups, instrument_engine
+from app.models.task_change import TaskChange
+from app.repositories.task import CHANGE_SETTLE_SECONDS, settled_changes, task_repository
+from app.schemas.task import TaskCreate
+
+
+@pytest.fixture
+def session(file_engine, session_factory):
+    instrument_engine(file_engine)
+    with session_factory() as db:
+        yield db
+
+
+def test_cached_statements_bind_fresh_values(session):
+    for title in ("alpha one", "alpha two", "beta"):
+        task_repository.create(session, obj_in=TaskCreate(title=title))
+    
+    assert len(task_repository.search_tasks(session, "alpha")) == 2
+    assert len(task_repository.search_tasks(session, "beta")) == 1
+    assert len(task_repository.get_multi(session, skip=0, limit=2)) == 2
+    assert len(task_repository.get_multi(session, skip=2, limit=2)) == 1
+
+
+def test_repeated_reads_hit_the_compiled_cache(session):
+    task = task_repository.create(session, obj_in=TaskCreate(title="Cached"))
+    task_repository.get_multi(session)
+    hits = compiled_cache_lookups.value(result="hit")
+    
+    for _ in range(3):
+        session.expire_all()
+        task_repository.get_multi(session)
+        task_repository.toggle_completion(session, task.id)
+    
+    assert compiled_cache_lookups.value(result="hit") > hits + 6
+    assert task_repository.get(session, task.id).completed is True
+
+
+def test_recent_changes_are_held_back_where_commits_can_reorder():
+    now = datetime.now(timezone.utc)
+    changes = [
+        TaskChange(seq=1, changed_at=now - timedelta(seconds=CHANGE_SETTLE_SECONDS + 1)),
+        TaskChange(seq=2, changed_at=now),
+        TaskChange(seq=3, changed_at=now - timedelta(seconds=CHANGE_SETTLE_SECONDS + 1)),
+    ]
+    postgres = create_mock_engine("postgresql://localhost/tasks", print)
+    
+    assert [change.seq for change in settled_changes(changes, postgres)] == [1]
+    assert settled_changes(changes, create_engine("sqlite://")) == changes
@@ -0,0 +1,272 @@
+"""Behaviour every task storage backend must share; each test runs once per backend"""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.database import savepoint, unit_of_work
+from app.models.task_change import CHANGE_DELETE, CHANGE_UPSERT
+from app.repositories.backends import available_backends, create_task_backend
+from app.repositories.protocol import AnalyticsRepositoryProtocol, TaskRepositoryProtocol
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.task import TaskService
+
+
+@pytest.fixture(params=available_backends())
+def backend(request):
+    return create_task_backend(request.param)
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def tasks(backend):
+    return backend.tasks
+
+
+def create(tasks, db, title, tenant_id="acme", description=""):
+    return tasks.create(db, obj_in=TaskCreate(title=title, description=description), tenant_id=tenant_id).id
+
+
+def ids(records):
+    return [record.id for record in records]
+
+
+def ids_of(changes):
+    return [change.task_id for change in changes]
+
+
+def archive_all_completed(tasks, db, limit=100, after=None):
+    return tasks.archive_completed(db, datetime.now(timezone.utc) + timedelta(days=1), after, limit)
+
+
+class TestRepositoryConformance:
+    
+    def test_backend_implements_the_protocols(self, backend):
+        assert isinstance(backend.tasks, TaskRepositoryProtocol)
+        assert isinstance(backend.analytics, AnalyticsRepositoryProtocol)
+    
+    def test_reads_are_scoped_to_the_tenant(self, tasks, db):
+        task_id = create(tasks, db, "Acme task")
+        create(tasks, db, "Globex task", tenant_id="globex")
+        
+        assert tasks.get(db, task_id, "acme").title == "Acme task"
+        assert tasks.get(db, task_id, "globex") is None
+        assert tasks.get(db, task_id).tenant_id == "acme"
+        assert (tasks.count(db, "acme"), tasks.count(db, "globex"), tasks.count(db)) == (1, 1, 2)
+        assert tasks.get_by_title(db, "Globex task", "acme") is None
+        assert tasks.delete(db, id=task_id, tenant_id="globex") is None
+    
+    def test_get_many_finds_live_and_archived_tasks_in_chunks(self, tasks, db, monkeypatch):
+        monkeypatch.setattr("app.repositories.task.IN_CLAUSE_CHUNK_SIZE", 2)
+        created = [create(tasks, db, f"Task {i}") for i in range(5)]
+        other = create(tasks, db, "Globex task", tenant_id="globex")
+        tasks.toggle_completion(db, created[1], "acme")
+        archive_all_completed(tasks, db)
+        
+        found = tasks.get_many(db, created + [other, "missing"], "acme")
+        
+        assert sorted(found) == sorted(created)
+        assert found[created[1]].completed is True
+        assert tasks.get_many(db, [other], "acme") == {}
+        assert list(tasks.get_many(db, [other])) == [other]
+    
+    def test_pages_in_creation_order_and_continues_into_the_archive(self, tasks, db):
+        created = [create(tasks, db, f"Task {i}") for i in range(5)]
+        for task_id in created[:2]:
+            tasks.toggle_completion(db, task_id, "acme")
+        assert archive_all_completed(tasks, db)[0] == 2
+        
+        live = created[2:]
+        assert ids(tasks.get_multi(db, skip=0, limit=10, tenant_id="acme")) == live
+        assert ids(tasks.get_multi(db, skip=1, limit=1, tenant_id="acme")) == live[1:2]
+        assert ids(tasks.get_multi(db, skip=2, limit=3, include_archived=True, tenant_id="acme")) == [
+            live[2], *created[:2]
+        ]
+        assert ids(tasks.get_multi(db, skip=4, limit=3, include_archived=True, tenant_id="acme")) == created[1:2]
+    
+    def test_keyset_pages_resume_after_the_last_task(self, tasks, db):
+        created = [create(tasks, db, f"Task {i}") for i in range(5)]
+        create(tasks, db, "Other", tenant_id="globex")
+        tasks.toggle_completion(db, created[0], "acme")
+        archive_all_completed(tasks, db)
+        
+        def pages(archived):
+            seen, after = [], None
+            while True:
+                page = tasks.get_page_after(db, after, 2, archived=archived, tenant_id="acme")
+                seen += ids(page)
+                if len(page) < 2:
+                    return seen
+                after = (page[-1].created_at, page[-1].id)
+                if not seen[2:]:
+                    # A task created mid-export lands after the cursor, not on a page already read
+                    created.append(create(tasks, db, "Late"))
+        
+        assert pages(archived=False) == created[1:]
+        assert pages(archived=True) == created[:1]
+    
+    def test_updates_move_tasks_between_completion_states(self, tasks, db):
+        first, second, third = (create(tasks, db, title) for title in ("One", "Two", "Three"))
+        assert tasks.toggle_completion(db, first, "acme").completed is True
+        tasks.update(db, db_obj=tasks.get(db, second), obj_in=TaskUpdate(completed=True, title="Two!"))
+        tasks.update(db, db_obj=tasks.get(db, first), obj_in=TaskUpdate(completed=False))
+        
+        assert tasks.get(db, second).title == "Two!"
+        assert ids(tasks.get_completed_tasks(db, tenant_id="acme")) == [second]
+        assert ids(tasks.get_pending_tasks(db, tenant_id="acme")) == [first, third]
+        assert tasks.toggle_completion(db, "missing", "acme") is None
+        stats = tasks.get_task_stats(db, tenant_id="acme")
+        assert (stats["total_tasks"], stats["completed_tasks"], stats["pending_tasks"]) == (3, 1, 2)
+        assert tasks.get_counts(db, "acme") == (3, 1, 0)
+    
+    def test_search_is_case_insensitive_and_can_include_the_archive(self, tasks, db):
+        done = create(tasks, db, "Write REPORT")
+        live = create(tasks, db, "Review", description="the quarterly report")
+        create(tasks, db, "Unrelated")
+        create(tasks, db, "Another report", tenant_id="globex")
+        tasks.toggle_completion(db, done, "acme")
+        archive_all_completed(tasks, db)
+        
+        assert ids(tasks.search_tasks(db, "report", tenant_id="acme")) == [live]
+        assert ids(tasks.search_tasks(db, "Report", include_archived=True, tenant_id="acme")) == [live, done]
+    
+    def test_change_feed_keeps_the_latest_change_per_task(self, tasks, db):
+        kept = create(tasks, db, "Kept")
+        deleted = create(tasks, db, "Deleted")
+        create(tasks, db, "Other tenant", tenant_id="globex")
+        tasks.toggle_completion(db, kept, "acme")
+        tasks.delete(db, id=deleted, tenant_id="acme")
+        
+        changes, changed, cursor, has_more = tasks.get_changes(db, [0], 10, "acme")
+        assert [(change.task_id, change.operation) for change in changes] == [
+            (kept, CHANGE_UPSERT), (deleted, CHANGE_DELETE)
+        ]
+        assert list(changed) == [kept] and changed[kept].completed is True
+        assert has_more is False
+        
+        page, _, page_cursor, has_more = tasks.get_changes(db, [0], 1, "acme")
+        assert ids_of(page) == [kept] and has_more is True
+        assert ids_of(tasks.get_changes(db, page_cursor, 10, "acme")[0]) == [deleted]
+        assert tasks.get_changes(db, cursor, 10, "acme")[0] == []
+        assert tasks.backfill_changes(db) == 0
+    
+    def test_archive_resumes_from_its_key_and_restores(self, tasks, db):
+        for tenant_id in ("acme", "globex"):
+            for i in range(2):
+                tasks.toggle_completion(db, create(tasks, db, f"Task {i}", tenant_id=tenant_id), tenant_id)
+        
+        moved, after = archive_all_completed(tasks, db, limit=2)
+        assert (moved, after[0]) == (2, "acme")
+        moved, after = archive_all_completed(tasks, db, limit=2, after=after)
+        assert (moved, after[0]) == (2, "globex")
+        assert archive_all_completed(tasks, db)[0] == 0
+        assert (tasks.count(db), tasks.count_archived(db), tasks.count_archived(db, "acme")) == (0, 4, 2)
+        
+        archived_id = after[2]
+        assert tasks.get(db, archived_id) is None
+        assert tasks.get_archived(db, archived_id, "acme") is None
+        assert tasks.restore(db, archived_id, "globex").id == archived_id
+        db.commit()
+        assert tasks.get(db, archived_id, "globex").completed is True
+        assert tasks.get_counts(db, "globex") == (1, 1, 1)
+        stats = tasks.get_task_stats(db, include_archived=True, tenant_id="globex")
+        assert (stats["total_tasks"], stats["completed_tasks"]) == (2, 2)
+        
+        assert tasks.rebuild_counts(db) == {
+            "acme": {"total": 0, "completed": 0, "archived": 2},
+            "globex": {"total": 1, "completed": 1, "archived": 1},
+        }
+        assert tasks.has_counts(db)
+    
+    def test_analytics_follow_writes_and_survive_a_rebuild(self, backend, db):
+        tasks, analytics = backend.tasks, backend.analytics
+        assert analytics.is_empty(db)
+        first, second, _ = (create(tasks, db, title) for title in ("One", "Two", "Three"))
+        tasks.toggle_completion(db, first, "acme")
+        tasks.toggle_completion(db, second, "acme")
+        tasks.delete(db, id=second, tenant_id="acme")
+        create(tasks, db, "Elsewhere", tenant_id="globex")
+        
+        today = datetime.now(timezone.utc).date()
+        window = (today - timedelta(days=1), today + timedelta(days=1))
+        
+        def snapshot(tenant_id):
+            days, histogram = analytics.get_range(db, *window, tenant_id)
+            return [tuple(row) for row in days], sum(row[2] for row in histogram)
+        
+        assert snapshot("acme") == ([(today, 2, 1)], 1)
+        assert snapshot(None) == ([(today, 3, 1)], 1)
+        assert analytics.get_range(db, date(2000, 1, 1), date(2000, 1, 2), "acme") == ([], [])
+        
+        assert analytics.rebuild(db) == {"days": 1, "tasks": 3, "completed": 1}
+        assert snapshot("acme") == ([(today, 2, 1)], 1)
+        assert not analytics.is_empty(db)
+    
+    def test_rolled_back_unit_of_work_leaves_no_trace(self, backend, db):
+        tasks = backend.tasks
+        kept = create(tasks, db, "Kept")
+        before = (tasks.get_counts(db, "acme"), len(tasks.get_changes(db, [0], 10, "acme")[0]))
+        
+        with pytest.raises(RuntimeError):
+            with unit_of_work(db):
+                create(tasks, db, "Discarded")
+                tasks.toggle_completion(db, kept, "acme")
+                raise RuntimeError("abort")
+        
+        assert ids(tasks.get_multi(db, tenant_id="acme")) == [kept]
+        assert tasks.get(db, kept).completed is False
+        assert (tasks.get_counts(db, "acme"), len(tasks.get_changes(db, [0], 10, "acme")[0])) == before
+        
+        with unit_of_work(db):
+            create(tasks, db, "Committed")
+            with pytest.raises(RuntimeError):
+                with savepoint(db):
+                    tasks.delete(db, id=kept, tenant_id="acme")
+                    raise RuntimeError("abort")
+        assert [task.title for task in tasks.get_multi(db, tenant_id="acme")] == ["Kept", "Committed"]
+        assert tasks.get_counts(db, "acme") == (2, 0, 0)
+
+
+class TestMemoryBackend:
+    
+    def test_snapshot_round_trip(self, tmp_path, db):
+        backend = create_task_backend("memory")
+        tasks = backend.tasks
+        done = create(tasks, db, "Done")
+        create(tasks, db, "Pending", tenant_id="globex")
+        tasks.toggle_completion(db, done, "acme")
+        archive_all_completed(tasks, db)
+        path = str(tmp_path / "snapshots" / "tasks.json")
+        assert tasks.store.save_snapshot(path) == 2
+        
+        restored = create_task_backend("memory")
+        assert restored.tasks.store.load_snapshot(path)
+        again = restored.tasks
+        assert again.get_archived(db, done, "acme").title == "Done"
+        assert [task.title for task in again.get_pending_tasks(db)] == ["Pending"]
+        assert again.get_counts(db, "acme") == (0, 0, 1)
+        assert again.get_changes(db, [0], 10)[2] == tasks.get_changes(db, [0], 10)[2]
+        assert restored.analytics.get_range(db, date.min, date.max) == backend.analytics.get_range(
+            db, date.min, date.max
+        )
+        # Sequences continue after the snapshot's
+        create(again, db, "New")
+        assert again.get_changes(db, [0], 10)[2][0] > tasks.get_changes(db, [0], 10)[2][0]
+    
+    def test_task_service_runs_on_the_memory_backend(self, db):
+        service = TaskService(create_task_backend("memory"))
+        created = service.create_task(db, TaskCreate(title="Preview"), "acme")
+        service.toggle_task_completion(db, created.id, "acme")
+        
+        assert service.group_commit is None
+        assert service.get_task_by_id(db, created.id, "acme").completed is True
+        assert service.get_all_tasks(db, tenant_id="acme").completed == 1
+        assert service.get_task_analytics(db, tenant_id="acme").totals.completed == 1
+    
+    def test_unknown_backend_is_rejected(self):
+        with pytest.raises(ValueError, match="available: memory, sqlalchemy"):
+            create_task_backend("cassandra")
@@ -0,0 +1,66 @@
+import importlib.util
+
+import pytest
+
+from app.core.config import Settings
+from app.server import describe, server_options, size_workers
+
+POSTGRES = "postgresql://app@db/tasks"
+SHARED_EVENTS = "pubsub.redis:RedisPubSub"
+
+
+def make_settings(**overrides):
+    options = dict(
+        DATABASE_URL=POSTGRES, REPOSITORY_BACKEND="sqlalchemy", EVENT_BACKEND=SHARED_EVENTS, RELOAD=False, WORKERS=0
+    )
+    options.update(overrides)
+    return Settings(**options)
+
+
+class TestWorkerSizing:
+
+    def test_one_worker_per_cpu_within_the_connection_budget(self):
+        assert size_workers(make_settings(DATABASE_MAX_CONNECTIONS=100), cpus=4)[0] == 4
+        # 15 connections per worker leave room for 3 workers out of 50
+        assert size_workers(make_settings(DATABASE_MAX_CONNECTIONS=50), cpus=8)[0] == 3
+        assert size_workers(make_settings(DATABASE_MAX_CONNECTIONS=5), cpus=8)[0] == 1
+
+    def test_sqlite_is_not_capped_by_connections(self):
+        config = make_settings(DATABASE_URL="sqlite:///./tasks.db", DATABASE_MAX_CONNECTIONS=1)
+        assert size_workers(config, cpus=4)[0] == 4
+
+    @pytest.mark.parametrize("overrides, workers", [
+        ({"WORKERS": 6}, 6),
+        ({"RELOAD": True}, 1),
+        ({"REPOSITORY_BACKEND": "memory"}, 1),
+        ({"EVENT_BACKEND": "local"}, 1),
+    ])
+    def test_overrides_and_single_process_modes(self, overrides, workers):
+        assert size_workers(make_settings(**overrides), cpus=8)[0] == workers
+
+
+class TestServerOptions:
+
+    def test_uses_fast_loop_and_parser_only_when_installed(self, monkeypatch):
+        monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+        options = server_options(make_settings(KEEP_ALIVE_SECONDS=15, BACKLOG=4096), cpus=2)
+
+        assert (options["loop"], options["http"]) == ("asyncio", "h11")
+        assert (options["workers"], options["timeout_keep_alive"], options["backlog"]) == (2, 15, 4096)
+        assert options["timeout_graceful_shutdown"] == 30
+
+        monkeypatch.setattr(importlib.util, "find_spec", lambda name: object())
+        options = server_options(make_settings(), cpus=2)
+        assert (options["loop"], options["http"]) == ("uvloop", "httptools")
+
+    def test_describe_reports_the_effective_configuration(self):
+        config = make_settings(DATABASE_MAX_CONNECTIONS=30, THREADPOOL_SIZE=16, ADMISSION_MAX_IN_FLIGHT=32)
+        summary = "\n".join(describe(config, server_options(config, cpus=8), cpus=8))
+
+        assert "workers:           2 (DATABASE_MAX_CONNECTIONS=30 / 15 connections per worker)" in summary
+        assert "threadpool:        16 threads per worker" in summary
+        assert "warning: ADMISSION_MAX_IN_FLIGHT=32 exceeds THREADPOOL_SIZE" in summary
+        assert "EVENT_BACKEND=local" not in summary
+
+        config = make_settings(EVENT_BACKEND="local", WORKERS=4)
+        assert "warning: EVENT_BACKEND=local only delivers" in "\n".join(describe(config, server_options(config)))
@@ -0,0 +1,143 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.horizontal_shard import set_shard_id
+
+from app.core.database import Base, build_engine, sharded_tables
+from app.core.sharding import ShardRouter, create_sharded_sessionmaker
+from app.models.task import Task
+from app.repositories.sharded import ShardedTaskRepository
+from app.schemas.task import TaskCreate
+
+
+def make_sessionmaker(tmp_path, shard_count):
+    primary = build_engine(f"sqlite:///{tmp_path}/primary.db")
+    Base.metadata.create_all(bind=primary)
+    urls = [f"sqlite:///{tmp_path}/shard_{i}.db" for i in range(shard_count)]
+    router = ShardRouter(shard_count)
+    shards = {shard_id: build_engine(url) for shard_id, url in zip(router.shard_ids, urls)}
+    for shard_engine in shards.values():
+        Base.metadata.create_all(bind=shard_engine, tables=sharded_tables())
+    return router, urls, create_sharded_sessionmaker(router, primary, shards)
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    router, urls, factory = make_sessionmaker(tmp_path, 2)
+    repository = ShardedTaskRepository(router)
+    db = factory()
+    yield router, urls, repository, db
+    db.close()
+
+
+class TestShardedTaskRepository:
+    
+    def test_tasks_spread_over_shards(self, sharded):
+        router, _, repository, db = sharded
+        for i in range(20):
+            repository.create(db, obj_in=TaskCreate(title=f"Task {i}"))
+        
+        per_shard = {
+            shard_id: db.execute(select(Task).options(set_shard_id(shard_id))).scalars().all()
+            for shard_id in router.shard_ids
+        }
+        assert sum(len(tasks) for tasks in per_shard.values()) == 20
+        for shard_id, tasks in per_shard.items():
+            assert tasks
+            assert all(router.shard_for_key(task.id) == shard_id for task in tasks)
+    
+    def test_point_read_and_toggle(self, sharded):
+        _, _, repository, db = sharded
+        task = repository.create(db, obj_in=TaskCreate(title="Point read"))
+        db.expunge_all()
+        
+        assert repository.get(db, task.id).title == "Point read"
+        assert repository.toggle_completion(db, task.id).completed is True
+        assert repository.delete(db, id=task.id) is not None
+        assert repository.get(db, task.id) is None
+    
+    def test_paginated_merge_is_ordered(self, sharded):
+        _, _, repository, db = sharded
+        for i in range(15):
+            repository.create(db, obj_in=TaskCreate(title=f"Task {i}"))
+        
+        everything = repository.get_multi(db, skip=0, limit=100)
+        keys = [(task.created_at, task.id) for task in everything]
+        assert keys == sorted(keys)
+        
+        page = repository.get_multi(db, skip=5, limit=5)
+        assert [task.id for task in page] == [task.id for task in everything[5:10]]
+        
+        after = (everything[4].created_at, everything[4].id)
+        assert [task.id for task in repository.get_page_after(db, after, 5)] == [task.id for task in everything[5:10]]
+    
+    def test_stats_and_search_gather_all_shards(self, sharded):
+        _, _, repository, db = sharded
+        ids = [repository.create(db, obj_in=TaskCreate(title=f"Report {i}")).id for i in range(8)]
+        for task_id in ids[:3]:
+            repository.toggle_completion(db, task_id)
+        
+        stats = repository.get_task_stats(db)
+        assert stats["total_tasks"] == 8
+        assert stats["completed_tasks"] == 3
+        assert repository.count(db) == 8
+        assert len(repository.search_tasks(db, "Report")) == 8
+        assert len(repository.get_pending_tasks(db)) == 5
+    
+    def test_change_feed_cursor_spans_shards(self, sharded):
+        router, _, repository, db = sharded
+        ids = [repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id for i in range(6)]
+        
+        cursor = [0] * repository.change_feed_width
+        seen = []
+        while True:
+            changes, tasks, cursor, has_more = repository.get_changes(db, cursor, limit=4)
+            seen.extend(change.task_id for change in changes)
+            if not has_more:
+                break
+        assert len(cursor) == len(router.shard_ids)
+        assert sorted(seen) == sorted(ids)
+        
+        repository.delete(db, id=ids[0])
+        changes, tasks, cursor, _ = repository.get_changes(db, cursor, limit=4)
+        assert [(change.task_id, change.operation) for change in changes] == [(ids[0], "delete")]
+    
+    def test_archive_spans_shards(self, sharded):
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy import update
+        
+        _, _, repository, db = sharded
+        ids = [repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id for i in range(10)]
+        long_ago = datetime.now(timezone.utc) - timedelta(days=60)
+        db.execute(update(Task).where(Task.id.in_(ids[:6])).values(completed=True, updated_at=long_ago))
+        db.commit()
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+        moved, after = repository.archive_completed(db, cutoff, None, 4)
+        assert moved == 4
+        assert repository.archive_completed(db, cutoff, after, 4)[0] == 2
+        
+        assert repository.count(db) == 4
+        assert all(repository.get_archived(db, task_id) is not None for task_id in ids[:6])
+        assert len(repository.get_multi(db, limit=20, include_archived=True)) == 10
+        assert repository.get_task_stats(db, include_archived=True)["completed_tasks"] == 6
+
+
+def test_rebalance_to_more_shards(tmp_path):
+    from app.cli.rebalance_shards import rebalance
+    
+    router, urls, factory = make_sessionmaker(tmp_path, 2)
+    db = factory()
+    repository = ShardedTaskRepository(router)
+    ids = [repository.create(db, obj_in=TaskCreate(title=f"Task {i}")).id for i in range(30)]
+    db.close()
+    
+    new_urls = urls + [f"sqlite:///{tmp_path}/shard_2.db"]
+    moved = rebalance(urls, new_urls, batch_size=7)
+    assert moved["tasks"] > 0
+    
+    new_router, _, new_factory = make_sessionmaker(tmp_path, 3)
+    db = new_factory()
+    new_repository = ShardedTaskRepository(new_router)
+    assert new_repository.count(db) == 30
+    assert all(new_repository.get(db, task_id) is not None for task_id in ids)
+    db.close()
@@ -0,0 +1,158 @@
+import threading
+import time
+
+from starlette.requests import Request
+
+from app.core import serialization
+from app.core.exceptions import RequestCancelledError
+from app.core.single_flight import SingleFlight, single_flight_calls
+from app.repositories.backends import create_task_backend
+from app.schemas.task import TaskCreate, TaskResponse
+from app.services.task import TaskService
+
+
+def run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def call(index):
+        barrier.wait()
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(calls, result, delay=0.2):
+    def run():
+        calls.append(1)
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return run
+
+
+class TestSingleFlight:
+
+    def test_concurrent_identical_calls_share_one_execution(self):
+        flight, calls, result = SingleFlight(), [], {"total": 3}
+        before = single_flight_calls.value(method="stats", outcome="coalesced")
+
+        results = run_concurrently(8, lambda: flight.do(("acme", "stats"), slow(calls, result)))
+
+        assert len(calls) == 1
+        assert all(shared is result for shared in results)
+        assert single_flight_calls.value(method="stats", outcome="coalesced") == before + 7
+        # Nothing is kept without a micro-cache
+        flight.do(("acme", "stats"), slow(calls, result, delay=0))
+        assert len(calls) == 2
+
+    def test_different_arguments_and_scopes_run_separately(self):
+        flight, calls = SingleFlight(), []
+        keys = iter([("acme", "list", 0), ("acme", "list", 100), ("globex", "list", 0)])
+
+        run_concurrently(3, lambda: flight.do(next(keys), slow(calls, [], delay=0.05)))
+
+        assert len(calls) == 3
+
+    def test_errors_are_shared_unless_they_belong_to_the_leader(self):
+        flight, calls = SingleFlight(retry_on=(RequestCancelledError,)), []
+        results = run_concurrently(4, lambda: flight.do(("acme", "stats"), slow(calls, ValueError("boom"))))
+        assert len(calls) == 1 and all(isinstance(error, ValueError) for error in results)
+
+        calls.clear()
+        outcomes = iter([RequestCancelledError(), "fresh"] + ["fresh"] * 4)
+
+        def leader_cancelled():
+            calls.append(1)
+            time.sleep(0.1)
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        results = run_concurrently(4, lambda: flight.do(("acme", "stats"), leader_cancelled))
+        assert sum(isinstance(result, RequestCancelledError) for result in results) == 1
+        assert results.count("fresh") == 3
+        assert len(calls) == 2
+
+    def test_micro_cache_expires_and_is_invalidated_per_scope(self):
+        flight, calls = SingleFlight(ttl=0.1), []
+        call = lambda scope: flight.do((scope, "stats"), slow(calls, scope, delay=0))
+
+        call("acme"), call("acme"), call("globex")
+        assert len(calls) == 2
+
+        flight.invalidate("acme")
+        call("acme"), call("globex")
+        assert len(calls) == 3
+
+        time.sleep(0.15)
+        call("globex")
+        assert len(calls) == 4
+
+
+class TestTaskServiceCoalescing:
+
+    def test_concurrent_stats_reads_query_once(self, session_factory, monkeypatch):
+        service = TaskService(create_task_backend("sqlalchemy"))
+        with session_factory() as db:
+            service.create_task(db, TaskCreate(title="Dashboard"), "acme")
+
+        calls = []
+        get_task_stats = service.repository.get_task_stats
+
+        def counted_stats(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.2)
+            return get_task_stats(*args, **kwargs)
+
+        monkeypatch.setattr(service.repository, "get_task_stats", counted_stats)
+
+        def read_stats():
+            with session_factory() as db:
+                return service.get_task_statistics(db, tenant_id="acme")
+
+        results = run_concurrently(6, read_stats)
+        assert len(calls) == 1
+        assert [stats.total_tasks for stats in results] == [1] * 6
+
+    def test_writes_invalidate_cached_reads(self, session_factory):
+        service = TaskService(create_task_backend("memory"))
+        service.single_flight = SingleFlight(ttl=60)
+        with session_factory() as db:
+            assert service.get_all_tasks(db, tenant_id="acme").total == 0
+            created = service.create_task(db, TaskCreate(title="Fresh"), "acme")
+            assert service.get_all_tasks(db, tenant_id="acme").total == 1
+
+            service.toggle_task_completion(db, created.id, "acme")
+            assert service.get_task_statistics(db, tenant_id="acme").completed_tasks == 1
+            assert service.get_all_tasks(db, tenant_id="globex").total == 0
+
+    def test_coalesced_results_are_encoded_once_per_media_type(self, session_factory, monkeypatch):
+        service = TaskService(create_task_backend("memory"))
+        service.single_flight = SingleFlight(ttl=60)
+        with session_factory() as db:
+            service.create_task(db, TaskCreate(title="Encoded"), "acme")
+            first, second = (service.get_pending_tasks(db, tenant_id="acme") for _ in range(2))
+        assert first is second
+
+        encoded = []
+        encode_json = serialization.ENCODERS[serialization.JSON]
+        monkeypatch.setitem(
+            serialization.ENCODERS, serialization.JSON, lambda content: encoded.append(1) or encode_json(content)
+        )
+        route = type("Route", (), {"response_model": list[TaskResponse]})()
+        request = Request({"type": "http", "method": "GET", "headers": [], "route": route})
+
+        bodies = {serialization.negotiated_response(request, result).body for result in (first, second)}
+        assert len(bodies) == 1 and b"Encoded" in bodies.pop()
+        assert len(encoded) == 1
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+import warnings
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import SADeprecationWarning
+
+from app.core.exceptions import RequestCancelledError, StatementTimeoutError
+from app.core.timeouts import (
+    StatementTimeoutMiddleware, cancelled_requests, guard_engine, statement_budget, statement_timeouts,
+)
+from app.main import request_cancelled_exception_handler
+from app.services.task import task_service
+
+# Counts to 100 million: far longer than any timeout below
+SLOW_QUERY = text(
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT count(*) FROM c"
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = guard_engine(create_engine(
+        f"sqlite:///{tmp_path / 'timeouts.db'}", connect_args={"check_same_thread": False}
+    ))
+    yield engine
+    engine.dispose()
+
+
+class TestStatementBudget:
+
+    def test_slow_statement_is_interrupted_at_the_timeout(self, engine):
+        before = statement_timeouts.value(route_class="search")
+        started = time.monotonic()
+        with engine.connect() as conn:
+            with statement_budget(0.05, "search"):
+                with pytest.raises(StatementTimeoutError):
+                    conn.execute(SLOW_QUERY).scalar()
+                assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert conn.execute(text("SELECT 2")).scalar() == 2
+
+        assert time.monotonic() - started < 5
+        assert statement_timeouts.value(route_class="search") == before + 1
+
+    def test_cancel_stops_the_running_statement_and_later_ones(self, engine):
+        budgets, errors = [], []
+        started = threading.Event()
+
+        def run():
+            with statement_budget(None, "scan") as budget, engine.connect() as conn:
+                budgets.append(budget)
+                started.set()
+                for _ in range(2):
+                    try:
+                        conn.execute(SLOW_QUERY).scalar()
+                    except RequestCancelledError as e:
+                        errors.append(e)
+
+        worker = threading.Thread(target=run)
+        worker.start()
+        started.wait()
+        time.sleep(0.1)
+        budgets[0].cancel()
+        worker.join(timeout=5)
+
+        assert not worker.is_alive()
+        assert len(errors) == 2
+
+    def test_pool_listeners_use_the_current_event_signatures(self):
+        # The pool swallows errors raised from reset listeners, so record
+        # the warnings instead of turning them into exceptions.
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", SADeprecationWarning)
+            engine = guard_engine(create_engine("sqlite://"))
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT 1")).scalar() == 1
+            engine.dispose()
+        assert not [w for w in caught if issubclass(w.category, SADeprecationWarning)]
+
+
+class TestStatementTimeoutMiddleware:
+
+    def test_client_disconnect_cancels_the_request(self, engine):
+        app = FastAPI()
+        app.add_exception_handler(RequestCancelledError, request_cancelled_exception_handler)
+
+        @app.get("/api/v1/tasks/search/")
+        def search():
+            with engine.connect() as conn:
+                return conn.execute(SLOW_QUERY).scalar()
+
+        middleware = StatementTimeoutMiddleware(app, timeouts={"search": 30.0})
+        scope = {
+            "type": "http", "method": "GET", "path": "/api/v1/tasks/search/", "raw_path": b"/api/v1/tasks/search/",
+            "query_string": b"", "headers": [], "scheme": "http", "http_version": "1.1",
+            "server": ("test", 80), "client": ("test", 1234), "root_path": "",
+        }
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}, {"type": "http.disconnect"}])
+        sent = []
+
+        async def receive():
+            message = next(messages)
+            if message["type"] == "http.disconnect":
+                await asyncio.sleep(0.1)
+            return message
+
+        async def send(message):
+            sent.append(message)
+
+        before = cancelled_requests.value(route_class="search")
+        started = time.monotonic()
+        asyncio.run(middleware(scope, receive, send))
+
+        assert time.monotonic() - started < 5
+        assert sent[0]["status"] == 499
+        assert cancelled_requests.value(route_class="search") == before + 1
+
+    def test_timeout_is_answered_with_504(self, client, monkeypatch):
+        def slow_search(*args, **kwargs):
+            raise StatementTimeoutError(5.0)
+
+        monkeypatch.setattr(task_service, "search_tasks", slow_search)
+        response = client.get("/api/v1/tasks/search/", params={"q": "report"})
+
+        assert response.status_code == 504
+        assert response.json()["error_code"] == "STATEMENT_TIMEOUT"
+        assert client.get("/api/v1/tasks/").status_code == 200
@@ -62,6 +62,62 @@ class TestTaskEndpoints:
         assert get_response.status_code == 404
 
 
+class TestTaskMultiGet:
+    
+    def test_returns_tasks_in_requested_order_and_lists_missing_ids(self, client: TestClient):
+        created = [client.post("/api/v1/tasks/", json={"title": f"Task {i}"}).json()["id"] for i in range(3)]
+        unknown = "00000000-0000-4000-8000-000000000000"
+        requested = [created[2], unknown, created[0].upper(), "not-a-uuid", created[2]]
+        
+        response = client.get("/api/v1/tasks/", params={"ids": ",".join(requested)})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [task["id"] for task in data["tasks"]] == [created[2], created[0]]
+        assert data["missing"] == [unknown, "not-a-uuid"]
+    
+    def test_rejects_empty_and_oversized_requests(self, client: TestClient):
+        assert client.get("/api/v1/tasks/", params={"ids": " , "}).status_code == 400
+        too_many = ",".join(f"00000000-0000-4000-8000-{i:012d}" for i in range(501))
+        assert client.get("/api/v1/tasks/", params={"ids": too_many}).status_code == 400
+
+
+class TestTaskChangeFeed:
+    
+    def test_full_sync_then_delta(self, client: TestClient, sample_task):
+        full = client.get("/api/v1/tasks/changes")
+        assert full.status_code == 200
+        data = full.json()
+        assert sample_task.id in [task["id"] for task in data["changes"]]
+        cursor = data["cursor"]
+        
+        created = client.post("/api/v1/tasks/", json={"title": "Delta task"}).json()
+        client.patch(f"/api/v1/tasks/{sample_task.id}/toggle")
+        client.delete(f"/api/v1/tasks/{created['id']}")
+        
+        delta = client.get("/api/v1/tasks/changes", params={"since": cursor}).json()
+        assert [task["id"] for task in delta["changes"]] == [sample_task.id]
+        assert delta["changes"][0]["completed"] is True
+        assert [tombstone["id"] for tombstone in delta["deleted"]] == [created["id"]]
+        
+        caught_up = client.get("/api/v1/tasks/changes", params={"since": delta["cursor"]}).json()
+        assert caught_up["changes"] == [] and caught_up["deleted"] == []
+    
+    def test_paging_with_limit(self, client: TestClient):
+        cursor = client.get("/api/v1/tasks/changes").json()["cursor"]
+        for i in range(3):
+            client.post("/api/v1/tasks/", json={"title": f"Paged {i}"})
+        
+        page = client.get("/api/v1/tasks/changes", params={"since": cursor, "limit": 2}).json()
+        assert len(page["changes"]) == 2 and page["has_more"] is True
+        rest = client.get("/api/v1/tasks/changes", params={"since": page["cursor"], "limit": 2}).json()
+        assert len(rest["changes"]) == 1 and rest["has_more"] is False
+    
+    def test_malformed_cursor(self, client: TestClient):
+        response = client.get("/api/v1/tasks/changes", params={"since": "abc"})
+        assert response.status_code == 400
+
+
 class TestRootEndpoints:
     
     def test_read_root(self, client: TestClient):
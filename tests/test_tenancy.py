@@ -0,0 +1,171 @@
+import asyncio
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import inspect, update
+
+from app.cli.migrate_tenants import migrate, untenanted_tables
+from app.core.config import get_settings
+from app.core.database import build_engine
+from app.core.events import EventHub, LocalPubSub
+from app.models.task import Task, DEFAULT_TENANT
+from app.repositories.task import task_repository
+from app.schemas.task import TaskCreate
+
+ACME = {"X-Tenant-ID": "acme"}
+GLOBEX = {"X-Tenant-ID": "globex"}
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+def create(client, headers, title):
+    response = client.post("/api/v1/tasks/", json={"title": title}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+class TestTenantIsolation:
+    
+    def test_tenants_only_see_their_own_tasks(self, client):
+        acme_id = create(client, ACME, "Acme report")
+        globex_id = create(client, GLOBEX, "Globex report")
+        client.patch(f"/api/v1/tasks/{acme_id}/toggle", headers=ACME)
+        
+        listed = client.get("/api/v1/tasks/", headers=ACME).json()
+        assert [task["id"] for task in listed["tasks"]] == [acme_id]
+        assert (listed["total"], listed["completed"]) == (1, 1)
+        assert [task["id"] for task in client.get("/api/v1/tasks/search/?q=report", headers=GLOBEX).json()] == [
+            globex_id
+        ]
+        assert client.get("/api/v1/tasks/stats/", headers=GLOBEX).json()["completed_tasks"] == 0
+        default_ids = {task["id"] for task in client.get("/api/v1/tasks/", params={"limit": 1000}).json()["tasks"]}
+        assert not default_ids & {acme_id, globex_id}
+        
+        changes = client.get("/api/v1/tasks/changes", headers=GLOBEX).json()
+        assert [task["id"] for task in changes["changes"]] == [globex_id]
+        analytics = client.get("/api/v1/tasks/analytics", headers=ACME).json()
+        assert (analytics["totals"]["created"], analytics["totals"]["completed"]) == (1, 1)
+    
+    def test_other_tenants_tasks_are_not_found(self, client):
+        acme_id = create(client, ACME, "Private")
+        
+        assert client.get(f"/api/v1/tasks/{acme_id}", headers=GLOBEX).status_code == 404
+        assert client.put(f"/api/v1/tasks/{acme_id}", json={"title": "Mine"}, headers=GLOBEX).status_code == 404
+        assert client.patch(f"/api/v1/tasks/{acme_id}/toggle", headers=GLOBEX).status_code == 404
+        assert client.delete(f"/api/v1/tasks/{acme_id}", headers=GLOBEX).status_code == 404
+        assert client.get(f"/api/v1/tasks/{acme_id}", headers=ACME).json()["title"] == "Private"
+    
+    def test_batches_and_jobs_are_scoped(self, client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "ADMIN_TOKEN", "admin")
+        acme_id = create(client, ACME, "Batched")
+        batch = client.post("/api/v1/batch", json={"operations": [{"op": "get", "task_id": acme_id}]}, headers=GLOBEX)
+        assert batch.json()["results"][0]["status"] == 404
+        
+        admin = {"X-Admin-Token": "admin"}
+        job = client.post("/api/v1/jobs", json={"type": "rebuild_task_counts"}, headers={**ACME, **admin}).json()
+        assert client.get(f"/api/v1/jobs/{job['id']}", headers={**GLOBEX, **admin}).status_code == 404
+        listed = client.get("/api/v1/jobs", headers={**ACME, **admin}).json()["jobs"]
+        assert [listed_job["id"] for listed_job in listed] == [job["id"]]
+    
+    @pytest.mark.parametrize("tenant", ["", "-leading-dash", "has space", "x" * 65])
+    def test_invalid_tenant_header_is_rejected(self, client, tenant):
+        assert client.get("/api/v1/tasks/", headers={"X-Tenant-ID": tenant}).status_code == 400
+    
+    def test_tenant_header_can_be_required(self, client, monkeypatch):
+        monkeypatch.setattr(get_settings(), "TENANT_REQUIRED", True)
+        
+        assert client.get("/api/v1/tasks/").status_code == 400
+        assert client.get("/api/v1/tasks/", headers=ACME).status_code == 200
+
+
+class TestTenantCounters:
+    
+    def test_counters_follow_writes_and_match_a_rebuild(self, db):
+        ids = [task_repository.create(db, obj_in=TaskCreate(title=f"Task {i}"), tenant_id="acme").id for i in range(4)]
+        task_repository.create(db, obj_in=TaskCreate(title="Other"), tenant_id="globex")
+        for task_id in ids[:3]:
+            task_repository.toggle_completion(db, task_id)
+        task_repository.delete(db, id=ids[3], tenant_id="acme")
+        db.execute(update(Task).where(Task.id.in_(ids[:2])).values(updated_at=datetime(2020, 1, 1)))
+        db.commit()
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+        assert task_repository.archive_completed(db, cutoff, None, 10)[0] == 2
+        task_repository.restore(db, ids[0], "acme")
+        db.commit()
+        
+        assert task_repository.get_counts(db, "acme") == (2, 2, 1)
+        assert task_repository.get_counts(db, "globex") == (1, 0, 0)
+        stats = task_repository.get_task_stats(db, include_archived=True, tenant_id="acme")
+        assert (stats["total_tasks"], stats["completed_tasks"]) == (3, 3)
+        
+        counts = task_repository.rebuild_counts(db)
+        assert counts["acme"] == {"total": 2, "completed": 2, "archived": 1}
+        assert task_repository.get_counts(db, "acme") == (2, 2, 1)
+    
+    def test_archive_cursor_moves_through_tenants(self, db):
+        for tenant_id in ("acme", "globex"):
+            for i in range(3):
+                task = task_repository.create(db, obj_in=TaskCreate(title=f"Task {i}"), tenant_id=tenant_id)
+                task_repository.toggle_completion(db, task.id)
+        db.execute(update(Task).values(updated_at=datetime(2020, 1, 1)))
+        db.commit()
+        
+        cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+        moved, after = task_repository.archive_completed(db, cutoff, None, 4)
+        assert (moved, after[0]) == (4, "globex")
+        assert task_repository.archive_completed(db, cutoff, after, 4)[0] == 2
+        assert task_repository.count(db) == 0
+
+
+def test_events_reach_only_the_tenants_subscribers():
+    async def scenario():
+        hub = EventHub(LocalPubSub(), queue_size=10, heartbeat_seconds=0)
+        await hub.start()
+        acme, globex, everyone = hub.subscribe("acme"), hub.subscribe("globex"), hub.subscribe()
+        hub.publish("task.created", "abc", {"id": "abc"}, "acme")
+        event = await asyncio.wait_for(acme.next_event(), 1)
+        delivered = (globex.queue.qsize(), everyone.queue.qsize())
+        await hub.stop()
+        return event, delivered
+    
+    event, delivered = asyncio.run(scenario())
+    assert json.loads(event.message)["tenant_id"] == "acme"
+    assert delivered == (0, 1)
+
+
+def test_migrate_assigns_existing_rows_to_a_tenant(tmp_path):
+    path = tmp_path / "pre_tenancy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE tasks (
+            id BLOB NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL, description TEXT,
+            completed BOOLEAN NOT NULL, created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL
+        );
+        CREATE INDEX ix_tasks_title ON tasks (title);
+        INSERT INTO tasks VALUES (x'0192', 'Old', '', 1, '2025-01-01 00:00:00', '2025-01-01 00:00:00');
+        CREATE TABLE task_daily_rollups (
+            day DATE NOT NULL PRIMARY KEY, created INTEGER NOT NULL, completed INTEGER NOT NULL
+        );
+        INSERT INTO task_daily_rollups VALUES ('2025-01-01', 1, 1);
+    """)
+    conn.close()
+    
+    url = f"sqlite:///{path}"
+    assert migrate(url) == {"tasks": 1, "task_daily_rollups": 1}
+    assert migrate(url) == {}
+    
+    engine = build_engine(url)
+    assert untenanted_tables(engine) == []
+    inspector = inspect(engine)
+    assert all(index["column_names"][0] == "tenant_id" for index in inspector.get_indexes("tasks"))
+    assert inspector.get_pk_constraint("task_daily_rollups")["constrained_columns"] == ["tenant_id", "day"]
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT tenant_id, title FROM tasks").all() == [(DEFAULT_TENANT, "Old")]
+    engine.dispose()
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_database_session
+from app.api.v1.router import api_router
+from app.core.database import instrument_engine
+from app.core.tracing import (
+    FileSpanExporter, InMemorySpanExporter, KIND_CLIENT, KIND_SERVER, Tracer, TracingMiddleware,
+    parse_traceparent, to_otlp,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def traced_client(file_engine, session_factory):
+    instrument_engine(file_engine)
+    
+    def session():
+        with session_factory() as db:
+            yield db
+    
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    app.dependency_overrides[get_database_session] = session
+    tracer = Tracer(InMemorySpanExporter(), "test")
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    return TestClient(app), tracer.exporter
+
+
+def by_parent(spans):
+    children = {}
+    for span in spans:
+        children.setdefault(span.parent_span_id, []).append(span)
+    return children
+
+
+class TestTraceparent:
+    
+    def test_parses_valid_header(self):
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+    
+    @pytest.mark.parametrize("value", [
+        None, "", "garbage", f"ff-{TRACE_ID}-{PARENT_ID}-01",
+        f"00-{'0' * 32}-{PARENT_ID}-01", f"00-{TRACE_ID}-{'0' * 16}-01",
+    ])
+    def test_rejects_invalid_header(self, value):
+        assert parse_traceparent(value) is None
+
+
+class TestRequestTracing:
+    
+    def test_spans_cover_service_repository_and_sql(self, traced_client):
+        client, exporter = traced_client
+        client.post("/api/v1/tasks/", json={"title": "Traced"})
+        exporter.clear()
+        
+        response = client.get("/api/v1/tasks/")
+        assert response.status_code == 200
+        
+        [spans] = exporter.traces()
+        root = spans[0]
+        assert root.kind == KIND_SERVER
+        assert root.name == "GET /api/v1/tasks/"
+        assert root.attributes["http.response.status_code"] == 200
+        assert response.headers["traceresponse"] == root.traceparent
+        
+        children = by_parent(spans)
+        [service] = children[root.span_id]
+        assert service.name == "TaskService.get_all_tasks"
+        repository_calls = [span.name for span in children[service.span_id]]
+        assert "TaskRepository.get_multi" in repository_calls
+        sql = [span for span in spans if span.kind == KIND_CLIENT]
+        assert sql and all(span.attributes["db.system"] == "sqlite" for span in sql)
+        assert any(span.attributes["db.operation"] == "SELECT" for span in sql)
+        assert all(span.end_ns >= span.start_ns for span in spans)
+    
+    def test_continues_incoming_trace(self, traced_client):
+        client, exporter = traced_client
+        response = client.get("/api/v1/tasks/missing", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"})
+        assert response.status_code == 404
+        
+        [spans] = exporter.traces()
+        assert {span.trace_id for span in spans} == {TRACE_ID}
+        assert spans[0].parent_span_id == PARENT_ID
+        assert spans[0].name == "GET /api/v1/tasks/{task_id}"
+        assert response.headers["traceresponse"].startswith(f"00-{TRACE_ID}-")
+    
+    def test_unsampled_parent_records_nothing(self, traced_client):
+        client, exporter = traced_client
+        response = client.get("/api/v1/tasks/", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+        assert response.status_code == 200
+        assert "traceresponse" not in response.headers
+        assert exporter.traces() == []
+
+
+class TestOtlpExport:
+    
+    def test_file_exporter_writes_otlp_json_lines(self, tmp_path):
+        path = tmp_path / "traces" / "spans.jsonl"
+        tracer = Tracer(FileSpanExporter(str(path), "task-manager"), "task-manager")
+        root = tracer.start_trace("GET /", attributes={"http.response.status_code": 200, "ok": True})
+        child = root.child("work", attributes={"ratio": 0.5})
+        child.end()
+        tracer.finish_trace(root)
+        
+        [line] = path.read_text().splitlines()
+        payload = json.loads(line)
+        assert payload == to_otlp([root, child], "task-manager")
+        resource = payload["resourceSpans"][0]
+        assert resource["resource"]["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "task-manager"}}
+        ]
+        encoded_root, encoded_child = resource["scopeSpans"][0]["spans"]
+        assert encoded_child["parentSpanId"] == encoded_root["spanId"]
+        assert "parentSpanId" not in encoded_root
+        assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in encoded_root["attributes"]
+        assert {"key": "ok", "value": {"boolValue": True}} in encoded_root["attributes"]
+        assert encoded_child["attributes"] == [{"key": "ratio", "value": {"doubleValue": 0.5}}]
@@ -0,0 +1,75 @@
+import cbor2
+import msgpack
+from fastapi.testclient import TestClient
+
+from app.core.compression import choose_encoding
+from app.core.serialization import negotiate_media_type
+from app.schemas.task import TaskList, TaskResponse, TaskStats
+from app.services.task import task_service
+
+
+class TestNegotiation:
+    
+    def test_media_type_preferences(self):
+        assert negotiate_media_type(None) == "application/json"
+        assert negotiate_media_type("*/*") == "application/json"
+        assert negotiate_media_type("application/x-msgpack") == "application/msgpack"
+        assert negotiate_media_type("application/json;q=0.5, application/cbor") == "application/cbor"
+        assert negotiate_media_type("text/html") is None
+    
+    def test_encoding_preferences(self):
+        assert choose_encoding(None) is None
+        assert choose_encoding("gzip") == "gzip"
+        assert choose_encoding("gzip, br, zstd") == "zstd"
+        assert choose_encoding("br;q=1.0, zstd;q=0.5") == "br"
+        assert choose_encoding("identity") is None
+
+
+class TestEncodedResponses:
+    
+    def test_binary_formats_match_json(self, client: TestClient, sample_task):
+        as_json = client.get(f"/api/v1/tasks/{sample_task.id}").json()
+        
+        packed = client.get(f"/api/v1/tasks/{sample_task.id}", headers={"Accept": "application/msgpack"})
+        assert packed.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(packed.content) == as_json
+        
+        cbor = client.get(f"/api/v1/tasks/{sample_task.id}", headers={"Accept": "application/cbor"})
+        assert cbor.headers["content-type"] == "application/cbor"
+        assert cbor2.loads(cbor.content) == as_json
+    
+    def test_list_endpoint_in_msgpack(self, client: TestClient, sample_task):
+        response = client.get("/api/v1/tasks/", headers={"Accept": "application/msgpack"})
+        data = msgpack.unpackb(response.content)
+        assert sample_task.id in [task["id"] for task in data["tasks"]]
+    
+    def test_encoded_keys_match_the_response_model(self, client: TestClient, sample_task):
+        stats = msgpack.unpackb(client.get("/api/v1/tasks/stats/", headers={"Accept": "application/msgpack"}).content)
+        assert set(stats) == set(TaskStats.model_fields)
+        
+        listed = client.get("/api/v1/tasks/").json()
+        assert set(listed) == set(TaskList.model_fields)
+        assert set(listed["tasks"][0]) == set(TaskResponse.model_fields)
+    
+    def test_payloads_are_filtered_through_the_response_model(self, client: TestClient, sample_task, monkeypatch):
+        stats = {"total_tasks": 1, "completed_tasks": 0, "pending_tasks": 1, "completion_rate": 0.0}
+        monkeypatch.setattr(task_service, "get_task_statistics", lambda *args, **kwargs: {**stats, "secret": "x"})
+        
+        response = client.get("/api/v1/tasks/stats/", headers={"Accept": "application/cbor"})
+        assert cbor2.loads(response.content) == stats
+    
+    def test_unsupported_media_type(self, client: TestClient):
+        response = client.get("/api/v1/tasks/", headers={"Accept": "text/csv"})
+        assert response.status_code == 406
+    
+    def test_large_responses_are_compressed(self, client: TestClient):
+        for i in range(20):
+            client.post("/api/v1/tasks/", json={"title": f"Compressible {i}", "description": "x" * 100})
+        
+        response = client.get("/api/v1/tasks/", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["tasks"]) >= 20
+        
+        small = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers